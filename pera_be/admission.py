@@ -0,0 +1,419 @@
+"""
+Admission control for calls to external services (Azure Speech, Cohere).
+
+Each service gets a Limiter with a per-process concurrency limit and,
+optionally, a cluster-wide one shared by every process through Postgres
+advisory locks. A call that finds the limits full waits in a bounded queue
+for up to ADMISSION_MAX_WAIT seconds; past that, or if the queue is full, it
+fails fast with ServiceUnavailable so the view can answer 503 with
+Retry-After instead of tying up a worker. A circuit breaker per service
+rejects calls outright for a while once too many recent ones failed or were
+slower than the service's `slow_call` seconds.
+
+Limits are configured per service in the ADMISSION_LIMITS setting.
+"""
+
+import collections
+import logging
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from rest_framework import status
+from rest_framework.response import Response
+
+from pera_be import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceUnavailable(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        # whole seconds, as the Retry-After header wants
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def unavailable_response(error):
+    return Response(
+        {"error": str(error)},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+class CircuitBreaker:
+    """
+    Opens when at least `failure_ratio` of the last `window` calls (and at
+    least `min_calls` of them) failed, then rejects calls for `cooldown`
+    seconds. After that a single probe call is let through: it closes the
+    breaker if it succeeds and reopens it if it fails.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_ratio, min_calls, window, cooldown):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.trips = 0
+        self._outcomes = collections.deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Raises ServiceUnavailable if the call must not go through."""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    raise ServiceUnavailable(f"{self.name} is unavailable.", remaining)
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise ServiceUnavailable(
+                        f"{self.name} is unavailable.", self.cooldown
+                    )
+                self._probing = True
+
+    def cancel(self):
+        """For a call that passed `check` but was never made."""
+        with self._lock:
+            self._probing = False
+
+    def record(self, failed):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if failed:
+                    self._open()
+                else:
+                    self.state = self.CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= self.min_calls and sum(
+                self._outcomes
+            ) >= self.failure_ratio * len(self._outcomes):
+                self._open()
+
+    def _open(self):
+        logger.warning("Circuit breaker for %s opened", self.name)
+        self.state = self.OPEN
+        self.trips += 1
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+
+class Ticket:
+    """An admitted call. Release it exactly once when the call is over."""
+
+    def __init__(self, limiter, cluster_slot):
+        self._limiter = limiter
+        self._cluster_slot = cluster_slot
+        self._started_at = time.monotonic()
+        self._released = False
+
+    def release(self, ok=True):
+        if not self._released:
+            self._released = True
+            self._limiter._free(self._cluster_slot)
+            self._limiter._record(ok, time.monotonic() - self._started_at)
+
+    def cancel(self):
+        """
+        Releases the ticket of a call abandoned part way, e.g. because the
+        client went away, without counting it for or against the service.
+        """
+        if not self._released:
+            self._released = True
+            self._limiter._free(self._cluster_slot)
+            if self._limiter.breaker:
+                self._limiter.breaker.cancel()
+
+    def close(self):
+        """Releases a ticket used for several calls, see `call`."""
+        if not self._released:
+            self._released = True
+            self._limiter._free(self._cluster_slot)
+
+    @contextmanager
+    def guard(self, expected=()):
+        """
+        Releases the ticket once the body is done. Exceptions in `expected`
+        are the caller's own errors (e.g. unrecognizable audio) and don't count
+        as failures of the service. Anything that isn't an Exception, like the
+        GeneratorExit of a stream closed early, cancels the call instead.
+        """
+        ok = False
+        try:
+            yield
+            ok = True
+        except expected:
+            ok = True
+            raise
+        except Exception:
+            raise
+        except BaseException:
+            self.cancel()
+            raise
+        finally:
+            self.release(ok)
+
+    @contextmanager
+    def call(self, expected=()):
+        """
+        Runs the body as one of several calls made one after another under
+        this ticket, counting it for the breaker like `guard` does but
+        keeping the slot for the next one. `close` the ticket after the last.
+        """
+        started = time.monotonic()
+        ok = None
+        try:
+            yield
+            ok = True
+        except expected:
+            ok = True
+            raise
+        except Exception:
+            ok = False
+            raise
+        finally:
+            # None for a cancelled call, which isn't counted
+            if ok is not None:
+                self._limiter._record(ok, time.monotonic() - started)
+
+
+class Limiter:
+    def __init__(
+        self,
+        name,
+        local,
+        cluster=0,
+        slow_call=None,
+        max_wait=5.0,
+        max_queue=16,
+        breaker=None,
+    ):
+        self.name = name
+        self.local = local
+        self.cluster = cluster
+        self.slow_call = slow_call
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.breaker = breaker
+        self._slots = threading.BoundedSemaphore(local)
+        # advisory lock keys are (namespace, slot) pairs of 32-bit integers
+        self._lock_namespace = zlib.crc32(f"admission:{name}".encode()) & 0x7FFFFFFF
+        self._held_cluster_slots = set()
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def acquire(self):
+        """
+        Waits for a free slot and returns a Ticket, or raises ServiceUnavailable.
+        """
+        if self.breaker:
+            self.breaker.check()
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                if self.breaker:
+                    self.breaker.cancel()
+                raise ServiceUnavailable(f"{self.name} is busy.", self.max_wait)
+            self.waiting += 1
+
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        admitted = False
+        cluster_slot = None
+        try:
+            admitted = self._slots.acquire(timeout=self.max_wait)
+            if admitted and self.cluster > 0 and connection.vendor == "postgresql":
+                try:
+                    cluster_slot = self._acquire_cluster_slot(deadline)
+                finally:
+                    if cluster_slot is None:
+                        self._slots.release()
+                        admitted = False
+        finally:
+            waited = time.monotonic() - started
+            with self._lock:
+                self.waiting -= 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+                if admitted:
+                    self.admitted += 1
+                    self.active += 1
+                else:
+                    self.rejected += 1
+            if not admitted and self.breaker:
+                self.breaker.cancel()
+
+        if not admitted:
+            raise ServiceUnavailable(f"{self.name} is busy.", self.max_wait)
+        return Ticket(self, cluster_slot)
+
+    @contextmanager
+    def admit(self, expected=()):
+        """Runs the body as an admitted call, see Ticket.guard."""
+        with self.acquire().guard(expected):
+            yield
+
+    def try_acquire(self):
+        """
+        A Ticket if a slot is free right now and the breaker is closed, else
+        None, without waiting or counting a rejection. For concurrency a
+        caller can do without, like more clips of a batch at once.
+        """
+        if self.breaker and self.breaker.state != self.breaker.CLOSED:
+            return None
+        if not self._slots.acquire(blocking=False):
+            return None
+        cluster_slot = None
+        if self.cluster > 0 and connection.vendor == "postgresql":
+            cluster_slot = self._try_cluster_slot()
+            if cluster_slot is None:
+                self._slots.release()
+                return None
+        with self._lock:
+            self.admitted += 1
+            self.active += 1
+        return Ticket(self, cluster_slot)
+
+    def _free(self, cluster_slot):
+        if cluster_slot is not None:
+            self._release_cluster_slot(cluster_slot)
+        self._slots.release()
+        with self._lock:
+            self.active -= 1
+
+    def _record(self, ok, elapsed):
+        failed = not ok or (self.slow_call is not None and elapsed > self.slow_call)
+        if not ok:
+            with self._lock:
+                self.failed += 1
+        if self.breaker:
+            self.breaker.record(failed)
+
+    def _acquire_cluster_slot(self, deadline):
+        """
+        Takes one of `cluster` advisory locks, retrying with backoff until
+        `deadline`. Session-level locks are released by Postgres if the
+        process dies, so a crashed worker can't leak a slot.
+        """
+        delay = 0.02
+        while True:
+            slot = self._try_cluster_slot()
+            remaining = deadline - time.monotonic()
+            if slot is not None or remaining <= 0:
+                return slot
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.5)
+
+    def _try_cluster_slot(self):
+        with self._lock:
+            # Advisory locks are reentrant within a session, so slots this
+            # process already holds (possibly on this same connection) are
+            # skipped explicitly
+            held = list(self._held_cluster_slots)
+        with connection.cursor() as cursor:
+            # starting at a different slot each time spreads processes out,
+            # and LIMIT 1 stops at the first lock taken
+            cursor.execute(
+                "SELECT slot FROM ("
+                "  SELECT ((g + %s) %% %s)::int AS slot FROM generate_series(0, %s - 1) g"
+                ") slots WHERE NOT slot = ANY(%s::int[])"
+                " AND pg_try_advisory_lock(%s, slot) LIMIT 1",
+                [
+                    random.randrange(self.cluster),
+                    self.cluster,
+                    self.cluster,
+                    held,
+                    self._lock_namespace,
+                ],
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._held_cluster_slots.add(row[0])
+        return row[0]
+
+    def _release_cluster_slot(self, slot):
+        with self._lock:
+            self._held_cluster_slots.discard(slot)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_advisory_unlock(%s, %s)", [self._lock_namespace, slot]
+                )
+        except Exception:
+            # the lock went away with the connection
+            logger.exception("Could not release %s cluster slot %s", self.name, slot)
+
+    def stats(self):
+        return {
+            "queue_depth": self.waiting,
+            "active": self.active,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "wait_seconds_total": round(self.wait_seconds, 3),
+            "wait_seconds_max": round(self.max_wait_seconds, 3),
+            "breaker": self.breaker.state if self.breaker else None,
+            "breaker_trips": self.breaker.trips if self.breaker else 0,
+        }
+
+
+_limiters = {}
+_limiters_pid = None
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """Limiters are per process, a forked worker starts with fresh ones."""
+    global _limiters, _limiters_pid
+    with _limiters_lock:
+        if _limiters_pid != os.getpid():
+            _limiters, _limiters_pid = {}, os.getpid()
+        if name not in _limiters:
+            limits = settings.ADMISSION_LIMITS[name]
+            _limiters[name] = Limiter(
+                name,
+                local=limits["local"],
+                cluster=limits.get("cluster", 0),
+                slow_call=limits.get("slow_call"),
+                max_wait=settings.ADMISSION_MAX_WAIT,
+                max_queue=settings.ADMISSION_MAX_QUEUE,
+                breaker=CircuitBreaker(
+                    name,
+                    failure_ratio=settings.CIRCUIT_BREAKER_FAILURE_RATIO,
+                    min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+                    window=settings.CIRCUIT_BREAKER_WINDOW,
+                    cooldown=settings.CIRCUIT_BREAKER_COOLDOWN,
+                ),
+            )
+        return _limiters[name]
+
+
+metrics.register(
+    "admission", lambda: {name: limiter.stats() for name, limiter in _limiters.items()}
+)
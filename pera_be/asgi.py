@@ -2,6 +2,9 @@
 ASGI config for pera_be project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django, with streamed request bodies for the views that want
+them (see pera_be/streaming.py), WebSocket connections are routed by path to the
+consumers listed in each app's ``routing.websocket_urlpatterns``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -9,8 +12,27 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+
+from pera_be.streaming import StreamingASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "pera_be.settings")
 
-application = get_asgi_application()
+# as get_asgi_application() does
+django.setup(set_prefix=False)
+django_application = StreamingASGIHandler()
+
+# Consumers import models, so apps have to be loaded first
+from speech_processing.routing import websocket_urlpatterns  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] != "websocket":
+        return await django_application(scope, receive, send)
+
+    consumer = websocket_urlpatterns.get(scope["path"])
+    if consumer is None:
+        await receive()
+        await send({"type": "websocket.close", "code": 4404})
+        return
+    await consumer(scope, receive, send)
@@ -0,0 +1,30 @@
+"""
+Process-local counters for sizing pools, caches and limits.
+
+Modules register a callable returning a JSON-serializable dict, and
+``api/metrics/`` returns all of them for the worker process that served the
+request (behind gunicorn, each worker has its own numbers).
+"""
+
+import os
+
+from knox.auth import TokenAuthentication
+from rest_framework import permissions, response, views
+
+_providers = {}
+
+
+def register(name, provider):
+    _providers[name] = provider
+
+
+def snapshot():
+    return {name: provider() for name, provider in _providers.items()}
+
+
+class MetricsView(views.APIView):
+    authentication_classes = (TokenAuthentication,)
+    permission_classes = (permissions.IsAdminUser,)
+
+    def get(self, request):
+        return response.Response({"pid": os.getpid(), **snapshot()}, status=200)
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 
 import sentry_sdk
 
@@ -184,3 +184,122 @@ SPECTACULAR_SETTINGS = {
     "VERSION": "0.1.0",
     "SERVE_INCLUDE_SCHEMA": False,
 }
+
+# Speech assessment backend, see speech_processing/services/backends/. Use
+# speech_processing.services.backends.fake.FakeBackend to run without Azure.
+SPEECH_ASSESSMENT_BACKEND = config(
+    "SPEECH_ASSESSMENT_BACKEND",
+    default="speech_processing.services.backends.azure.AzureBackend",
+)
+SPEECH_KEY = config("SPEECH_KEY", default="")
+SPEECH_REGION = config("SPEECH_REGION", default="")
+# Mean seconds the fake backend takes per assessment, the fraction of
+# assessments it can't recognize, and the fraction it fails as if the service
+# timed out
+SPEECH_FAKE_LATENCY = config("SPEECH_FAKE_LATENCY", default=1.0, cast=float)
+SPEECH_FAKE_ERROR_RATE = config("SPEECH_FAKE_ERROR_RATE", default=0.0, cast=float)
+SPEECH_FAKE_FAILURE_RATE = config("SPEECH_FAKE_FAILURE_RATE", default=0.0, cast=float)
+
+# Concurrency limits on calls to Azure Speech and Cohere, see pera_be/admission.py.
+# "local" is per worker process, "cluster" across all processes (0 for none),
+# and calls slower than "slow_call" seconds count as failures for the breaker.
+ADMISSION_LIMITS = {
+    "speech": {
+        "local": config("SPEECH_CONCURRENCY", default=4, cast=int),
+        "cluster": config("SPEECH_CLUSTER_CONCURRENCY", default=40, cast=int),
+        "slow_call": config("SPEECH_SLOW_CALL_SECONDS", default=60, cast=float),
+    },
+    "cohere": {
+        "local": config("COHERE_CONCURRENCY", default=2, cast=int),
+        "cluster": config("COHERE_CLUSTER_CONCURRENCY", default=8, cast=int),
+        "slow_call": config("COHERE_SLOW_CALL_SECONDS", default=30, cast=float),
+    },
+}
+# Seconds a call waits for a free slot, and how many may wait per process,
+# before getting a 503
+ADMISSION_MAX_WAIT = config("ADMISSION_MAX_WAIT", default=5, cast=float)
+ADMISSION_MAX_QUEUE = config("ADMISSION_MAX_QUEUE", default=16, cast=int)
+CIRCUIT_BREAKER_FAILURE_RATIO = 0.5
+CIRCUIT_BREAKER_MIN_CALLS = 10
+CIRCUIT_BREAKER_WINDOW = 50
+CIRCUIT_BREAKER_COOLDOWN = config("CIRCUIT_BREAKER_COOLDOWN", default=30, cast=int)
+# Hard timeout on a single Cohere request, in seconds
+COHERE_TIMEOUT = config("COHERE_TIMEOUT", default=45, cast=float)
+COHERE_CONNECT_TIMEOUT = config("COHERE_CONNECT_TIMEOUT", default=5, cast=float)
+# Kept-alive connections to Cohere per worker process, and seconds an idle one
+# is kept, see texts/services/cohere.py
+COHERE_POOL_SIZE = config("COHERE_POOL_SIZE", default=4, cast=int)
+COHERE_KEEPALIVE = config("COHERE_KEEPALIVE", default=60, cast=float)
+# Retries of failed connections, 429s and 5xxs, with jittered exponential
+# backoff from COHERE_RETRY_BASE_DELAY up to COHERE_RETRY_MAX_DELAY seconds
+COHERE_MAX_RETRIES = config("COHERE_MAX_RETRIES", default=2, cast=int)
+COHERE_RETRY_BASE_DELAY = 0.5
+COHERE_RETRY_MAX_DELAY = 4.0
+
+# Generated passages kept per (description, difficulty) and served in turn,
+# see texts/services/passage_cache.py. 0 disables the cache.
+GENERATED_PASSAGE_VARIANTS = config("GENERATED_PASSAGE_VARIANTS", default=3, cast=int)
+GENERATED_PASSAGE_CACHE_TTL = config(
+    "GENERATED_PASSAGE_CACHE_TTL", default=30 * 24 * 3600, cast=int
+)
+GENERATED_PASSAGE_CACHE_MAX_ENTRIES = config(
+    "GENERATED_PASSAGE_CACHE_MAX_ENTRIES", default=10000, cast=int
+)
+# Preset topics whose passages are generated ahead of time, for every
+# difficulty, by the refill_passage_pool command. A bucket with fewer than
+# PASSAGE_POOL_LOW_WATER passages is refilled to PASSAGE_POOL_HIGH_WATER.
+PASSAGE_POOL_TOPICS = config(
+    "PASSAGE_POOL_TOPICS",
+    default="ordering coffee,a job interview,travelling by train,"
+    "a visit to the doctor,shopping for groceries",
+    cast=Csv(),
+)
+PASSAGE_POOL_LOW_WATER = config("PASSAGE_POOL_LOW_WATER", default=2, cast=int)
+PASSAGE_POOL_HIGH_WATER = config("PASSAGE_POOL_HIGH_WATER", default=5, cast=int)
+
+# Pre-connected Azure speech recognizers kept per worker process, see
+# speech_processing/services/recognizers.py. 0 disables the pool.
+SPEECH_RECOGNIZER_POOL_SIZE = config("SPEECH_RECOGNIZER_POOL_SIZE", default=2, cast=int)
+# Seconds before an idle pre-connected recognizer is considered stale
+SPEECH_RECOGNIZER_MAX_AGE = config("SPEECH_RECOGNIZER_MAX_AGE", default=60, cast=int)
+
+# Decode, resample to 16 kHz mono and trim silence locally before sending WAV
+# uploads to Azure, see speech_processing/services/audio.py
+SPEECH_AUDIO_PREPROCESSING = config(
+    "SPEECH_AUDIO_PREPROCESSING", default=False, cast=bool
+)
+
+# Seconds a live assessment WebSocket may go without a message, and the
+# longest it may record, before it is closed and its assessment slot freed
+LIVE_ASSESSMENT_IDLE_TIMEOUT = config(
+    "LIVE_ASSESSMENT_IDLE_TIMEOUT", default=15, cast=float
+)
+LIVE_ASSESSMENT_MAX_SECONDS = config(
+    "LIVE_ASSESSMENT_MAX_SECONDS", default=300, cast=float
+)
+
+# Clips of batch assessment requests assessed at once per worker process, at
+# most, as the speech admission limits allow, and the most clips one request
+# may carry
+ASSESSMENT_BATCH_WORKERS = config("ASSESSMENT_BATCH_WORKERS", default=8, cast=int)
+ASSESSMENT_BATCH_MAX_ITEMS = config("ASSESSMENT_BATCH_MAX_ITEMS", default=20, cast=int)
+
+# Reuse of assessment results for identical submissions, see
+# speech_processing/services/result_cache.py
+ASSESSMENT_CACHE_TTL = config("ASSESSMENT_CACHE_TTL", default=7 * 24 * 3600, cast=int)
+ASSESSMENT_CACHE_MAX_ENTRIES = config(
+    "ASSESSMENT_CACHE_MAX_ENTRIES", default=50000, cast=int
+)
+
+# Uploaded assessment audio, stored once per distinct content under its
+# SHA-256 so it can be played back and assessed again without another upload,
+# see speech_processing/services/audio_store.py
+ASSESSMENT_AUDIO_ROOT = config(
+    "ASSESSMENT_AUDIO_ROOT", default=str(BASE_DIR / "assessment_audio")
+)
+
+# Languages whose sentence tokenizers are loaded at startup rather than on
+# first use, see texts/services/tokenizers.py
+SENTENCE_TOKENIZER_PRELOAD = config(
+    "SENTENCE_TOKENIZER_PRELOAD", default="en", cast=Csv()
+)
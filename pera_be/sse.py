@@ -0,0 +1,73 @@
+"""
+Server-Sent Events responses.
+
+The events come from a synchronous iterator, which is run in a thread of its
+own and handed over to the event loop one event at a time: under ASGI, Django
+would otherwise read a synchronous streaming response to the end before
+sending any of it.
+"""
+
+import asyncio
+import json
+import threading
+
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+
+_DONE = object()
+
+
+def event(name, data):
+    """One event, with `data` as JSON."""
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def _put(loop, queue, item):
+    try:
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+    except RuntimeError:
+        # the loop closed, the client is gone
+        pass
+
+
+async def _relay(events):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stopped = threading.Event()
+
+    def produce():
+        try:
+            for chunk in events:
+                if stopped.is_set():
+                    break
+                _put(loop, queue, chunk)
+        except Exception as e:
+            _put(loop, queue, e)
+        finally:
+            if hasattr(events, "close"):
+                events.close()
+            # executor threads outlive requests, so their connections are
+            # closed here
+            close_old_connections()
+            _put(loop, queue, _DONE)
+
+    loop.run_in_executor(None, produce)
+    try:
+        while (chunk := await queue.get()) is not _DONE:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        stopped.set()
+
+
+def response(events):
+    """
+    A text/event-stream response of the byte strings the synchronous
+    iterable `events` yields, each sent as soon as it is produced.
+    """
+    return StreamingHttpResponse(
+        _relay(events),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
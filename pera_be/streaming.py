@@ -0,0 +1,154 @@
+"""
+Streamed request bodies under ASGI.
+
+Django's ASGIHandler reads the whole request body into a temporary file
+before the view runs, so an upload handler would only see the audio once it
+had all arrived. For requests whose view asks for it (see
+`wants_streamed_body`), StreamingASGIHandler instead hands the view a body
+that is fed from the connection as it arrives: the view's thread blocks on
+the next chunk while the event loop receives it. At most MAX_PENDING_CHUNKS
+received chunks wait for the view, so a slow reader slows the upload down
+rather than being buffered for.
+"""
+
+import asyncio
+
+from django.core.exceptions import RequestAborted
+from django.core.handlers.asgi import ASGIHandler
+from django.http import QueryDict
+from django.urls import Resolver404, resolve
+
+MAX_PENDING_CHUNKS = 16
+
+_END = object()
+_ABORTED = object()
+
+
+class StreamedBody:
+    """A file-like request body read, from the view's thread, as it arrives."""
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._chunks = asyncio.Queue(maxsize=MAX_PENDING_CHUNKS)
+        self._buffer = b""
+        self._ended = False
+        self._aborted = False
+
+    async def put(self, chunk):
+        await self._chunks.put(chunk)
+
+    def _fill(self):
+        if self._aborted:
+            raise RequestAborted()
+        chunk = asyncio.run_coroutine_threadsafe(
+            self._chunks.get(), self._loop
+        ).result()
+        if chunk is _ABORTED:
+            self._aborted = True
+            raise RequestAborted()
+        if chunk is _END:
+            self._ended = True
+        else:
+            self._buffer += chunk
+
+    def read(self, size=-1):
+        while not self._ended and (size < 0 or len(self._buffer) < size):
+            self._fill()
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        while not self._ended and b"\n" not in self._buffer:
+            if 0 <= size <= len(self._buffer):
+                break
+            self._fill()
+        end = self._buffer.find(b"\n") + 1 or len(self._buffer)
+        if size >= 0:
+            end = min(end, size)
+        data, self._buffer = self._buffer[:end], self._buffer[end:]
+        return data
+
+    def close(self):
+        self._buffer = b""
+
+
+class _BodyPump:
+    """
+    Takes the place of `receive` for a streamed request: one task receives
+    every message, feeding the body and then watching for a disconnect.
+    """
+
+    def __init__(self, receive):
+        self._receive = receive
+        self._task = None
+
+    def start(self):
+        body = StreamedBody(asyncio.get_running_loop())
+        self._task = asyncio.create_task(self._pump(body))
+        return body
+
+    async def _pump(self, body):
+        more_body = True
+        while True:
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                if more_body:
+                    await body.put(_ABORTED)
+                raise RequestAborted()
+            if more_body and message["type"] == "http.request":
+                if message.get("body"):
+                    await body.put(message["body"])
+                more_body = message.get("more_body", False)
+                if not more_body:
+                    await body.put(_END)
+
+    async def disconnected(self):
+        await self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+
+def _wants_streamed_body(scope):
+    path = scope["path"].removeprefix(scope.get("root_path", ""))
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return False
+    wants = getattr(
+        getattr(match.func, "view_class", None), "wants_streamed_body", None
+    )
+    return bool(
+        wants
+        and scope.get("method") in ("POST", "PUT")
+        and wants(QueryDict(scope.get("query_string", b"").decode("latin-1")))
+    )
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    ASGIHandler that streams the bodies of requests whose view class has a
+    `wants_streamed_body(query_params)` returning True.
+    """
+
+    async def handle(self, scope, receive, send):
+        if not _wants_streamed_body(scope):
+            return await super().handle(scope, receive, send)
+        pump = _BodyPump(receive)
+        try:
+            await super().handle(scope, pump, send)
+        finally:
+            pump.stop()
+
+    async def read_body(self, receive):
+        if isinstance(receive, _BodyPump):
+            return receive.start()
+        return await super().read_body(receive)
+
+    async def listen_for_disconnect(self, receive):
+        if isinstance(receive, _BodyPump):
+            return await receive.disconnected()
+        return await super().listen_for_disconnect(receive)
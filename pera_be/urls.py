@@ -23,12 +23,15 @@ from drf_spectacular.views import (
     SpectacularRedocView,
 )
 
+from .metrics import MetricsView
+
 urlpatterns = [
     path("hello_world/", include("hello_world.urls")),
     path("accounts/", include("accounts.urls")),
     path("speech-processing/", include("speech_processing.urls")),
     path("texts/", include("texts.urls")),
     path("admin/", admin.site.urls),
+    path("api/metrics/", MetricsView.as_view(), name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
         "api/docs/swagger/",
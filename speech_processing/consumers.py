@@ -0,0 +1,263 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from knox.auth import TokenAuthentication
+from rest_framework import exceptions
+
+from pera_be import admission
+from speech_processing.services import assessment
+
+
+@sync_to_async
+def _authenticate(token):
+    try:
+        user, _ = TokenAuthentication().authenticate_credentials(token.encode())
+    except exceptions.AuthenticationFailed:
+        return None
+    return getattr(user, "userprofile", None)
+
+
+@sync_to_async
+def _admit():
+    return admission.get_limiter("speech").acquire()
+
+
+_owns_sentence = sync_to_async(assessment.owns_sentence)
+
+
+@sync_to_async
+def _save_feedback(user_profile, sentence_id, reference_text, result):
+    with transaction.atomic():
+        feedback = assessment.save_feedback(
+            user_profile, sentence_id, reference_text, result
+        )
+        if sentence_id:
+            assessment.complete_sentence(user_profile, sentence_id)
+    return feedback
+
+
+class _SessionDropped(Exception):
+    """
+    The recording is given up on, with the code to close the socket with:
+    4408 if the client stopped sending audio or has been recording for too
+    long, 4400 if it sent a text frame that isn't a JSON object.
+    """
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+class LiveAssessmentConsumer:
+    """
+    Pronunciation assessment of audio as it is being recorded.
+
+    Connect to ws/speech-processing/live-assessment/?token=<knox token>&text=<reference text>
+    (optionally &sentence_id=<id>, &format=pcm for 16 kHz 16-bit mono PCM
+    instead of a compressed container like WebM/Opus, and &granularity=,
+    &prosody= and &fields= as for scripted-assessment). Send the microphone
+    chunks as binary frames, then the text frame {"type": "end"} when recording
+    stops. The server sends {"type": "interim", "text": ...} hypotheses and a
+    {"type": "segment", ...} for each recognized utterance while audio is still
+    coming in, then {"type": "final", ...} (same fields as scripted-assessment)
+    or {"type": "error", "error": ...}, and closes the socket. If too many
+    assessments are running it sends an error with "retry_after" (seconds) right
+    away and closes with code 1013. A sentence_id that isn't one of the user's
+    sentences closes the socket with 4404 before it is accepted. A recording
+    that sends nothing for LIVE_ASSESSMENT_IDLE_TIMEOUT seconds, or goes on for
+    longer than LIVE_ASSESSMENT_MAX_SECONDS, is dropped with an error and code
+    4408, so it doesn't hold on to an assessment slot. A text frame that isn't
+    a JSON object gets an error and code 4400.
+    """
+
+    async def __call__(self, scope, receive, send):
+        # gives this connection its own thread for database work, as Django
+        # does per request, so waiting for admission doesn't block others
+        async with ThreadSensitiveContext():
+            await self._handle(scope, receive, send)
+            await sync_to_async(close_old_connections)()
+
+    async def _handle(self, scope, receive, send):
+        if (await receive())["type"] != "websocket.connect":
+            return
+        query = {
+            key: values[-1]
+            for key, values in parse_qs(scope["query_string"].decode()).items()
+        }
+
+        user_profile = await _authenticate(query.get("token", ""))
+        if user_profile is None:
+            await send({"type": "websocket.close", "code": 4401})
+            return
+        reference_text = query.get("text", "")
+        try:
+            options = assessment.AssessmentOptions.from_params(query)
+            fields = assessment.response_fields(query.get("fields"))
+        except ValueError:
+            reference_text = ""
+        if not reference_text:
+            await send({"type": "websocket.close", "code": 4400})
+            return
+        # checked before anything is paid for, as the HTTP views do
+        sentence_id = query.get("sentence_id") or None
+        if sentence_id is not None:
+            if not sentence_id.isdigit() or not await _owns_sentence(
+                user_profile, int(sentence_id)
+            ):
+                await send({"type": "websocket.close", "code": 4404})
+                return
+            sentence_id = int(sentence_id)
+        await send({"type": "websocket.accept"})
+
+        try:
+            ticket = await _admit()
+        except admission.ServiceUnavailable as e:
+            error = {"type": "error", "error": str(e), "retry_after": e.retry_after}
+            await send({"type": "websocket.send", "text": json.dumps(error)})
+            await send({"type": "websocket.close", "code": 1013})
+            return
+        ok = False
+        try:
+            ok, close_code, final = await self._assess(
+                receive,
+                send,
+                user_profile,
+                sentence_id,
+                reference_text,
+                query,
+                options,
+                fields,
+            )
+        finally:
+            await sync_to_async(ticket.release)(ok)
+
+        if close_code is not None:
+            await send({"type": "websocket.send", "text": json.dumps(final)})
+            await send({"type": "websocket.close", "code": close_code})
+
+    async def _assess(
+        self,
+        receive,
+        send,
+        user_profile,
+        sentence_id,
+        reference_text,
+        query,
+        options,
+        fields,
+    ):
+        """
+        Returns whether the service call went fine, the code to close the
+        socket with (None if the client went away) and the final message for
+        it.
+        """
+        loop = asyncio.get_running_loop()
+        outbox = asyncio.Queue()
+
+        def push(message):
+            loop.call_soon_threadsafe(outbox.put_nowait, message)
+
+        stream, session = await asyncio.to_thread(
+            assessment.start_live_assessment,
+            reference_text,
+            on_recognizing=lambda text: push({"type": "interim", "text": text}),
+            on_recognized=lambda segment: push(
+                {
+                    "type": "segment",
+                    "DisplayText": segment["DisplayText"],
+                    "PronunciationAssessment": segment["NBest"][0].get(
+                        "PronunciationAssessment"
+                    ),
+                }
+            ),
+            raw_pcm=query.get("format") == "pcm",
+            options=options,
+        )
+        sender = asyncio.create_task(self._send_messages(outbox, send))
+
+        finishing = False
+        try:
+            try:
+                connected = await self._receive_audio(receive, stream)
+            except _SessionDropped as e:
+                await outbox.put(None)
+                await sender
+                return True, e.code, {"type": "error", "error": str(e)}
+            stream.close()
+            finishing = True
+            ok = True
+            try:
+                result = await asyncio.to_thread(session.finish)
+            except assessment.SpeechNotRecognizedError as e:
+                final = {"type": "error", "error": str(e)}
+            except assessment.AssessmentTimeoutError as e:
+                ok = False
+                final = {"type": "error", "error": str(e)}
+            else:
+                feedback = await _save_feedback(
+                    user_profile, sentence_id, reference_text, result
+                )
+                final = {
+                    "type": "final",
+                    **assessment.feedback_response_data(feedback, fields),
+                }
+
+            if connected:
+                # interim and segment messages go out before the final one
+                await outbox.put(None)
+                await sender
+            return ok, 1000 if connected else None, final
+        finally:
+            # however the recording ended, Azure stops listening
+            if not finishing:
+                stream.close()
+                await asyncio.to_thread(session.cancel)
+            sender.cancel()
+
+    async def _receive_audio(self, receive, stream):
+        """
+        Returns False if the client went away before ending the recording, and
+        raises _SessionDropped if it went quiet, ran past the time limit or
+        sent something other than audio and JSON objects.
+        """
+        loop = asyncio.get_running_loop()
+        idle_timeout = settings.LIVE_ASSESSMENT_IDLE_TIMEOUT
+        deadline = loop.time() + settings.LIVE_ASSESSMENT_MAX_SECONDS
+        while True:
+            timeout = max(0.0, min(idle_timeout, deadline - loop.time()))
+            try:
+                message = await asyncio.wait_for(receive(), timeout)
+            except TimeoutError:
+                if loop.time() >= deadline:
+                    raise _SessionDropped(
+                        "Recording is longer than "
+                        f"{settings.LIVE_ASSESSMENT_MAX_SECONDS:g} seconds.",
+                        4408,
+                    ) from None
+                raise _SessionDropped(
+                    f"No audio for {idle_timeout:g} seconds.", 4408
+                ) from None
+            if message["type"] == "websocket.disconnect":
+                return False
+            if message.get("bytes"):
+                stream.write(message["bytes"])
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    control = None
+                if not isinstance(control, dict):
+                    raise _SessionDropped(
+                        'Text frames must be JSON objects like {"type": "end"}.',
+                        4400,
+                    )
+                if control.get("type") == "end":
+                    return True
+
+    async def _send_messages(self, outbox, send):
+        while (message := await outbox.get()) is not None:
+            await send({"type": "websocket.send", "text": json.dumps(message)})
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from speech_processing.models import Error, Feedback
+from speech_processing.services import assessment
+
+
+class Command(BaseCommand):
+    help = "Creates the Error rows of existing Feedback that has none yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        pending = (
+            Feedback.objects.filter(
+                ~Exists(Error.objects.filter(feedback=OuterRef("pk")))
+            )
+            .only("feedback_id", "user_id", "json_data")
+            .order_by("feedback_id")
+        )
+        last_id = 0
+        feedback_count = error_count = 0
+        while True:
+            # keyset pagination, so each batch is an index range scan
+            batch = list(
+                pending.filter(feedback_id__gt=last_id)[: options["batch_size"]]
+            )
+            if not batch:
+                break
+            rows = []
+            for feedback in batch:
+                try:
+                    json_result = assessment.feedback_json(feedback)
+                    rows.extend(assessment.error_rows(feedback, json_result))
+                except (ValueError, KeyError, IndexError, TypeError):
+                    self.stderr.write(
+                        f"Skipped feedback #{feedback.feedback_id}: unreadable json_data"
+                    )
+            with transaction.atomic():
+                Error.objects.bulk_create(rows)
+            last_id = batch[-1].feedback_id
+            feedback_count += len(batch)
+            error_count += len(rows)
+        self.stdout.write(
+            f"Created {error_count} error rows for {feedback_count} feedbacks."
+        )
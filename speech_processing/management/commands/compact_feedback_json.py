@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.db.models import F, Func
+
+from speech_processing.models import Feedback, FeedbackPayload
+from speech_processing.services import assessment
+
+
+class Command(BaseCommand):
+    help = (
+        "Converts Feedback.json_data stored as a raw JSON string into the slim "
+        "format, moving the complete result into FeedbackPayload."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        pending = (
+            Feedback.objects.annotate(
+                json_type=Func(
+                    F("json_data"),
+                    function="jsonb_typeof",
+                    output_field=models.TextField(),
+                )
+            )
+            .filter(json_type="string")
+            .only("feedback_id", "json_data")
+            .order_by("feedback_id")
+        )
+        last_id = 0
+        converted = 0
+        while True:
+            # keyset pagination, so each batch is an index range scan
+            batch = list(
+                pending.filter(feedback_id__gt=last_id)[: options["batch_size"]]
+            )
+            if not batch:
+                break
+            payloads = []
+            for feedback in batch:
+                try:
+                    json_result = json.loads(feedback.json_data)
+                    feedback.json_data = assessment.slim_json_result(json_result)
+                except (ValueError, KeyError, IndexError, TypeError):
+                    self.stderr.write(
+                        f"Skipped feedback #{feedback.feedback_id}: unreadable json_data"
+                    )
+                    continue
+                payloads.append(
+                    FeedbackPayload(
+                        feedback=feedback,
+                        data=assessment.compress_payload(json_result),
+                    )
+                )
+            with transaction.atomic():
+                FeedbackPayload.objects.bulk_create(payloads, ignore_conflicts=True)
+                Feedback.objects.bulk_update(
+                    [payload.feedback for payload in payloads], ["json_data"]
+                )
+            last_id = batch[-1].feedback_id
+            converted += len(payloads)
+        self.stdout.write(f"Converted {converted} feedbacks.")
@@ -0,0 +1,28 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from speech_processing.services.jobs import AssessmentWorkerPool
+
+
+class Command(BaseCommand):
+    help = "Runs a fixed-size pool of workers for queued pronunciation assessments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds an idle worker waits before checking the queue again.",
+        )
+
+    def handle(self, *args, **options):
+        pool = AssessmentWorkerPool(
+            options["workers"], poll_interval=options["poll_interval"]
+        )
+        signal.signal(signal.SIGTERM, lambda *_: pool.stop())
+        signal.signal(signal.SIGINT, lambda *_: pool.stop())
+        pool.start()
+        self.stdout.write(f"Started {options['workers']} assessment workers.")
+        pool.join()
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("speech_processing", "0005_assessmentjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AssessmentCacheEntry",
+            fields=[
+                (
+                    "cache_key",
+                    models.CharField(max_length=64, primary_key=True, serialize=False),
+                ),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_hit_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "feedback",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="speech_processing.feedback",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["created_at"], name="speech_proc_created_03589d_idx"
+                    ),
+                    models.Index(
+                        fields=["last_hit_at"], name="speech_proc_last_hi_c61834_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0002_rename_user_id_event_user"),
+        ("speech_processing", "0006_assessmentcacheentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="error",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="accounts.userprofile",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="error",
+            index=models.Index(
+                fields=["user", "phoneme"], name="speech_proc_user_id_71582c_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("speech_processing", "0007_error_user"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedbackPayload",
+            fields=[
+                (
+                    "feedback",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="payload",
+                        serialize=False,
+                        to="speech_processing.feedback",
+                    ),
+                ),
+                ("data", models.BinaryField()),
+            ],
+        ),
+    ]
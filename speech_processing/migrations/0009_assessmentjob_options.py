@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("speech_processing", "0008_feedbackpayload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="assessmentjob",
+            name="granularity",
+            field=models.CharField(default="Phoneme", max_length=10),
+        ),
+        migrations.AddField(
+            model_name="assessmentjob",
+            name="prosody",
+            field=models.BooleanField(default=True),
+        ),
+    ]
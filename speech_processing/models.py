@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 
 import texts.models
@@ -18,6 +20,8 @@ class Feedback(models.Model):
     fluency_score = models.FloatField()
     completeness_score = models.FloatField()
     pron_score = models.FloatField()
+    # The JsonResult without fields nothing reads, see assessment.slim_json_result.
+    # The full result is kept compressed in FeedbackPayload.
     json_data = models.JSONField(null=True)
     timestamp = models.DateTimeField(null=True, auto_now=True)
     created_at = models.DateTimeField(null=True, auto_now=True)
@@ -26,9 +30,36 @@ class Feedback(models.Model):
         return f"Feedback #{self.feedback_id}, on sentence #{self.sentence_id}, displaying {self.display_text}"
 
 
+class FeedbackPayload(models.Model):
+    """The complete JsonResult of a Feedback, zlib-compressed, read on demand."""
+
+    feedback = models.OneToOneField(
+        Feedback, on_delete=models.CASCADE, primary_key=True, related_name="payload"
+    )
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"Payload of feedback #{self.feedback_id}"
+
+
 class Error(models.Model):
+    """
+    One phoneme of an assessed word (or the word itself, for omitted and
+    inserted words, which have no phonemes), taken from Feedback.json_data so
+    phoneme statistics can be queried in SQL. `error_text` is the word,
+    `error_type` Azure's word-level ErrorType.
+    """
+
     error_id = models.BigAutoField(primary_key=True)
     feedback = models.ForeignKey(Feedback, on_delete=models.CASCADE, null=True)
+    # Same as feedback.user, kept here so per-user queries need no join. The
+    # (user, phoneme) index below covers lookups by user alone.
+    user = models.ForeignKey(
+        accounts.models.UserProfile,
+        on_delete=models.CASCADE,
+        null=True,
+        db_index=False,
+    )
     phoneme = models.TextField()
     syllable = models.TextField()
     accuracy_score = models.FloatField()
@@ -36,5 +67,100 @@ class Error(models.Model):
     error_text = models.TextField()
     created_at = models.DateTimeField(null=True, auto_now=True)
 
+    class Meta:
+        # feedback_id is indexed as a foreign key already
+        indexes = [models.Index(fields=["user", "phoneme"])]
+
     def __str__(self):
         return f"Error #{self.error_id}, on feedback #{self.feedback_id}, of type {self.error_type}"
+
+
+class AssessmentJob(models.Model):
+    """
+    A queued pronunciation assessment. The table doubles as the work queue:
+    workers claim PENDING rows with SELECT ... FOR UPDATE SKIP LOCKED, so all
+    that's needed to run them is Postgres (see `run_assessment_workers`).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING"
+        RUNNING = "RUNNING"
+        DONE = "DONE"
+        FAILED = "FAILED"
+
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        accounts.models.UserProfile, on_delete=models.CASCADE, null=True
+    )
+    sentence = models.ForeignKey(
+        texts.models.Sentence, on_delete=models.SET_NULL, null=True
+    )
+    reference_text = models.TextField()
+    # AssessmentOptions
+    granularity = models.CharField(max_length=10, default="Phoneme")
+    prosody = models.BooleanField(default=True)
+    # cleared once the job finishes, the audio is only needed until then
+    audio = models.BinaryField()
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING
+    )
+    feedback = models.ForeignKey(Feedback, on_delete=models.SET_NULL, null=True)
+    error = models.TextField(blank=True, default="")
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True)
+    finished_at = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"Assessment job {self.job_id}, for user {self.user_id}, {self.status}"
+
+
+class AssessmentCacheEntry(models.Model):
+    """
+    Maps a hash of (audio, reference text, assessment settings), or of a
+    client's Idempotency-Key, to the Feedback it produced, so repeated
+    submissions don't pay for another recognition.
+    See speech_processing/services/result_cache.py.
+    """
+
+    cache_key = models.CharField(max_length=64, primary_key=True)
+    feedback = models.ForeignKey(Feedback, on_delete=models.CASCADE)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["last_hit_at"]),
+        ]
+
+    def __str__(self):
+        return f"Cache entry {self.cache_key}, for feedback #{self.feedback_id}"
+
+
+class AudioUpload(models.Model):
+    """
+    A user's uploaded assessment audio. The file itself is stored once under
+    its SHA-256 however many users uploaded it, see
+    speech_processing/services/audio_store.py; these rows say who may use it.
+    """
+
+    user = models.ForeignKey(accounts.models.UserProfile, on_delete=models.CASCADE)
+    sha256 = models.CharField(max_length=64)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "sha256"], name="unique_audio_upload_per_user"
+            )
+        ]
+
+    def __str__(self):
+        return f"Audio {self.sha256}, uploaded by user {self.user_id}"
@@ -0,0 +1,5 @@
+from .consumers import LiveAssessmentConsumer
+
+websocket_urlpatterns = {
+    "/ws/speech-processing/live-assessment/": LiveAssessmentConsumer(),
+}
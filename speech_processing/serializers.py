@@ -6,12 +6,65 @@ class PronunciationCheckSerializer(serializers.Serializer):
     text = serializers.CharField()
 
 
+class WordScoreSerializer(serializers.Serializer):
+    Word = serializers.CharField()
+    AccuracyScore = serializers.FloatField()
+    ErrorType = serializers.CharField()
+
+
 class PronunciationAssessmentResponseSerializer(serializers.Serializer):
     AccuracyScore = serializers.FloatField()
     FluencyScore = serializers.FloatField()
     PronunciationScore = serializers.FloatField()
-    JsonResult = serializers.JSONField()
+    Words = WordScoreSerializer(many=True, required=False)
+    JsonResult = serializers.JSONField(required=False)
+    audio_sha256 = serializers.CharField(
+        required=False,
+        help_text="The stored audio, to assess again with audio/<sha256>/assessment/.",
+    )
 
 
 class ErrorResponseSerializer(serializers.Serializer):
     error = serializers.CharField()
+
+
+class AssessmentJobResponseSerializer(serializers.Serializer):
+    job_id = serializers.UUIDField()
+    status = serializers.CharField()
+    error = serializers.CharField(required=False)
+    result = PronunciationAssessmentResponseSerializer(required=False)
+
+
+class SentenceAssessmentSerializer(serializers.Serializer):
+    sentence_id = serializers.IntegerField()
+    feedback_id = serializers.IntegerField()
+    AccuracyScore = serializers.FloatField()
+    FluencyScore = serializers.FloatField()
+    CompletenessScore = serializers.FloatField()
+    PronunciationScore = serializers.FloatField()
+
+
+class PassageAssessmentResponseSerializer(serializers.Serializer):
+    passage_id = serializers.IntegerField()
+    AccuracyScore = serializers.FloatField()
+    FluencyScore = serializers.FloatField()
+    CompletenessScore = serializers.FloatField()
+    PronunciationScore = serializers.FloatField()
+    sentences = SentenceAssessmentSerializer(many=True)
+
+
+class BatchAssessmentItemSerializer(serializers.Serializer):
+    index = serializers.IntegerField()
+    status = serializers.IntegerField()
+    error = serializers.CharField(required=False)
+    retry_after = serializers.IntegerField(required=False)
+    feedback_id = serializers.IntegerField(required=False)
+    AccuracyScore = serializers.FloatField(required=False)
+    FluencyScore = serializers.FloatField(required=False)
+    PronunciationScore = serializers.FloatField(required=False)
+    Words = WordScoreSerializer(many=True, required=False)
+    JsonResult = serializers.JSONField(required=False)
+
+
+class BatchAssessmentResponseSerializer(serializers.Serializer):
+    results = BatchAssessmentItemSerializer(many=True)
@@ -0,0 +1,653 @@
+import difflib
+import json
+import re
+import zlib
+from dataclasses import dataclass
+
+from django.db import transaction
+
+from accounts.models import Event
+from pera_be import admission
+from speech_processing.models import Error, Feedback, FeedbackPayload
+from texts.models import Sentence
+from texts.services import progress
+from . import backends
+
+# Upper bound on a single continuous recognition session, in seconds
+RECOGNITION_TIMEOUT = 300
+
+# What counts as a word of a reference text
+WORD_RE = re.compile(r"[\w'’-]+")
+
+GRANULARITIES = ("FullText", "Word", "Phoneme")
+
+# What a response can include besides the scores: "words" is each word's score
+# and error type, "json" the whole JsonResult
+RESPONSE_FIELDS = ("scores", "words", "json")
+DEFAULT_RESPONSE_FIELDS = ("scores", "json")
+
+
+class SpeechNotRecognizedError(Exception):
+    pass
+
+
+class AssessmentTimeoutError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class AssessmentOptions:
+    """
+    How much Azure assesses. Coarser granularity and no prosody are quicker
+    to assess and give much smaller results: FullText has only the overall
+    scores, Word adds each word's, and Phoneme each phoneme's as well.
+    """
+
+    granularity: str = "Phoneme"
+    prosody: bool = True
+
+    def __post_init__(self):
+        if self.granularity not in GRANULARITIES:
+            raise ValueError(f"Granularity must be one of {', '.join(GRANULARITIES)}.")
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        From the "granularity" and "prosody" request parameters. Raises
+        ValueError if they are invalid.
+        """
+        prosody = str(params.get("prosody") or "true").lower()
+        if prosody not in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+            raise ValueError("Prosody must be true or false.")
+        return cls(
+            granularity=params.get("granularity") or cls.granularity,
+            prosody=prosody in ("1", "true", "yes", "on"),
+        )
+
+    @property
+    def key(self):
+        """These options as part of a result cache key."""
+        return (
+            f"granularity={self.granularity};prosody={'on' if self.prosody else 'off'}"
+        )
+
+
+def response_fields(value):
+    """
+    Parses a comma-separated "fields" request parameter, see RESPONSE_FIELDS.
+    Raises ValueError for unknown fields.
+    """
+    fields = tuple(field.strip() for field in (value or "").split(",") if field.strip())
+    unknown = [field for field in fields if field not in RESPONSE_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)}. "
+            f"Fields are {', '.join(RESPONSE_FIELDS)}."
+        )
+    return fields or DEFAULT_RESPONSE_FIELDS
+
+
+@dataclass
+class AssessmentResult:
+    """
+    Pronunciation assessment of a whole recording. `json_result` has the same
+    shape as Azure's JsonResult, with the words of every recognized segment
+    merged into NBest[0] and the per-segment summaries under "Segments".
+    """
+
+    result_id: str
+    json_result: dict
+
+    @property
+    def scores(self):
+        return self.json_result["NBest"][0]["PronunciationAssessment"]
+
+    @property
+    def accuracy_score(self):
+        return self.scores["AccuracyScore"]
+
+    @property
+    def fluency_score(self):
+        return self.scores["FluencyScore"]
+
+    @property
+    def completeness_score(self):
+        return self.scores["CompletenessScore"]
+
+    @property
+    def pronunciation_score(self):
+        return self.scores["PronScore"]
+
+
+def _weighted_mean(pairs):
+    total_weight = sum(weight for _, weight in pairs)
+    if not total_weight:
+        return 0.0
+    return sum(value * weight for value, weight in pairs) / total_weight
+
+
+def _error_type(word):
+    return word.get("PronunciationAssessment", {}).get("ErrorType")
+
+
+def combine_scores(words, weighted_segments, reference_word_count):
+    """
+    Follows the aggregation in Azure's continuous pronunciation assessment
+    sample: accuracy is averaged over words, fluency and prosody are weighted
+    by segment duration, completeness is counted against the reference text.
+    `weighted_segments` are (segment PronunciationAssessment, weight) pairs.
+    At FullText granularity there are no words, so accuracy and completeness
+    are weighted by segment duration as well.
+    """
+    fluency_score = _weighted_mean(
+        [(scores["FluencyScore"], weight) for scores, weight in weighted_segments]
+    )
+    if not words and any("AccuracyScore" in scores for scores, _ in weighted_segments):
+        accuracy_score = _weighted_mean(
+            [(scores["AccuracyScore"], weight) for scores, weight in weighted_segments]
+        )
+        completeness_score = _weighted_mean(
+            [
+                (scores.get("CompletenessScore", 0.0), weight)
+                for scores, weight in weighted_segments
+            ]
+        )
+    else:
+        scored_words = [w for w in words if _error_type(w) != "Insertion"]
+        accuracy_score = (
+            sum(w["PronunciationAssessment"]["AccuracyScore"] for w in scored_words)
+            / len(scored_words)
+            if scored_words
+            else 0.0
+        )
+        matched_words = [
+            w for w in words if _error_type(w) not in ("Insertion", "Omission")
+        ]
+        completeness_score = (
+            min(100.0, len(matched_words) / reference_word_count * 100)
+            if reference_word_count
+            else 0.0
+        )
+
+    scores = [accuracy_score, fluency_score, completeness_score]
+    prosody_scores = [
+        (scores["ProsodyScore"], weight)
+        for scores, weight in weighted_segments
+        if "ProsodyScore" in scores
+    ]
+    combined = {
+        "AccuracyScore": accuracy_score,
+        "FluencyScore": fluency_score,
+        "CompletenessScore": completeness_score,
+    }
+    if prosody_scores:
+        combined["ProsodyScore"] = _weighted_mean(prosody_scores)
+        scores.append(combined["ProsodyScore"])
+        # the lowest score gets the most weight, as in the Azure sample
+        weights = [0.4, 0.2, 0.2, 0.2]
+    else:
+        weights = [0.6, 0.2, 0.2]
+    combined["PronScore"] = sum(
+        score * weight for score, weight in zip(sorted(scores), weights)
+    )
+    return combined
+
+
+def _with_error_type(word, error_type):
+    return {
+        **word,
+        "PronunciationAssessment": {
+            **word.get("PronunciationAssessment", {}),
+            "ErrorType": error_type,
+        },
+    }
+
+
+def align_words(words, reference_text):
+    """
+    Aligns recognized words to the words of the reference text, as Azure's
+    continuous assessment sample does with difflib: in continuous mode the
+    service doesn't report omissions and insertions even with miscue enabled.
+    Returns the words in reference order, with an Omission entry for each
+    reference word that wasn't spoken and recognized words that match none
+    marked as Insertions. Every word but the insertions then stands for one
+    reference word.
+    """
+    spoken = [word for word in words if _error_type(word) != "Omission"]
+    reference_words = WORD_RE.findall(reference_text.lower())
+    matcher = difflib.SequenceMatcher(
+        None,
+        reference_words,
+        [word["Word"].lower() for word in spoken],
+        autojunk=False,
+    )
+    aligned = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            aligned.extend(spoken[j1:j2])
+            continue
+        for word in spoken[j1:j2]:
+            if _error_type(word) in (None, "None"):
+                word = _with_error_type(word, "Insertion")
+            aligned.append(word)
+        for reference_word in reference_words[i1:i2]:
+            aligned.append(
+                {
+                    "Word": reference_word,
+                    "PronunciationAssessment": {
+                        "AccuracyScore": 0,
+                        "ErrorType": "Omission",
+                    },
+                }
+            )
+    return aligned
+
+
+def merge_segments(segments, reference_text):
+    """
+    Combines the JsonResults of each recognized segment into a single result,
+    with the words aligned to the reference text, see `align_words`.
+    """
+    words = []
+    for segment in segments:
+        words.extend(segment["NBest"][0].get("Words", []))
+    if words:
+        words = align_words(words, reference_text)
+
+    combined = combine_scores(
+        words,
+        [(s["NBest"][0]["PronunciationAssessment"], s["Duration"]) for s in segments],
+        len(WORD_RE.findall(reference_text)),
+    )
+
+    first, last = segments[0], segments[-1]
+    display_text = " ".join(s["DisplayText"] for s in segments)
+    return {
+        "Id": first["Id"],
+        "RecognitionStatus": "Success",
+        "Offset": first["Offset"],
+        "Duration": last["Offset"] + last["Duration"] - first["Offset"],
+        "DisplayText": display_text,
+        "NBest": [
+            {
+                "Confidence": min(s["NBest"][0]["Confidence"] for s in segments),
+                "Lexical": " ".join(s["NBest"][0]["Lexical"] for s in segments),
+                "Display": display_text,
+                "PronunciationAssessment": combined,
+                "Words": words,
+            }
+        ],
+        "Segments": [
+            {
+                "Offset": s["Offset"],
+                "Duration": s["Duration"],
+                "DisplayText": s["DisplayText"],
+                "PronunciationAssessment": s["NBest"][0]["PronunciationAssessment"],
+            }
+            for s in segments
+        ],
+    }
+
+
+def split_by_sentence(json_result, sentence_texts):
+    """
+    Splits a merged JsonResult of a whole passage back into one JsonResult per
+    sentence. merge_segments aligned the words to the reference text, so every
+    word except insertions consumes one reference word of the current sentence.
+    Each sentence's time span comes from its word offsets, and fluency and
+    prosody are taken from the segments overlapping that span.
+    """
+    words = json_result["NBest"][0].get("Words", [])
+    segments = json_result.get("Segments", [])
+    word_counts = [len(WORD_RE.findall(text)) for text in sentence_texts]
+
+    sentence_words = [[] for _ in sentence_texts]
+    current, consumed = 0, 0
+    for word in words:
+        while (
+            current < len(word_counts) - 1
+            and consumed >= word_counts[current]
+            and _error_type(word) != "Insertion"
+        ):
+            current, consumed = current + 1, 0
+        sentence_words[current].append(word)
+        if _error_type(word) != "Insertion":
+            consumed += 1
+
+    results = []
+    for text, count, words in zip(sentence_texts, word_counts, sentence_words):
+        spoken = [w for w in words if w.get("Duration")]
+        if spoken:
+            start = spoken[0]["Offset"]
+            end = spoken[-1]["Offset"] + spoken[-1]["Duration"]
+        else:
+            start = end = 0
+        weighted_segments = []
+        for segment in segments:
+            overlap = min(end, segment["Offset"] + segment["Duration"]) - max(
+                start, segment["Offset"]
+            )
+            if overlap > 0:
+                weighted_segments.append((segment["PronunciationAssessment"], overlap))
+        results.append(
+            {
+                "Id": json_result["Id"],
+                "RecognitionStatus": "Success",
+                "Offset": start,
+                "Duration": end - start,
+                "DisplayText": text,
+                "NBest": [
+                    {
+                        "Display": text,
+                        "PronunciationAssessment": combine_scores(
+                            words, weighted_segments, count
+                        ),
+                        "Words": words,
+                    }
+                ],
+            }
+        )
+    return results
+
+
+def settings_key(options=None):
+    """Cache key part for the configured backend and the assessment options."""
+    options = options or AssessmentOptions()
+    return f"{backends.get_backend().settings_key};{options.key}"
+
+
+def assess_pronunciation(audio_file, reference_text, options=None):
+    """
+    Runs pronunciation assessment on `audio_file` (anything with a Django-style
+    `chunks()` method) against `reference_text` with the configured backend.
+    Raises SpeechNotRecognizedError if no speech could be recognized, and
+    admission.ServiceUnavailable if too many assessments are already running.
+    """
+    with admission.get_limiter("speech").admit(expected=(SpeechNotRecognizedError,)):
+        return assess_admitted(audio_file, reference_text, options)
+
+
+def assess_admitted(audio_file, reference_text, options=None):
+    """assess_pronunciation, for a caller already holding a speech ticket."""
+    return backends.get_backend().assess(
+        audio_file, reference_text, options or AssessmentOptions()
+    )
+
+
+def open_stream(raw_pcm=False):
+    """An audio stream of the configured backend, see AssessmentBackend."""
+    return backends.get_backend().open_stream(raw_pcm)
+
+
+def start_live_assessment(
+    reference_text,
+    on_recognizing=None,
+    on_recognized=None,
+    raw_pcm=False,
+    options=None,
+):
+    """
+    Starts assessing audio that is still being recorded. Returns the stream to
+    write audio chunks into (close it when the recording ends) and the running
+    session. `raw_pcm` selects 16 kHz 16-bit mono PCM instead of a compressed
+    container such as the browser's WebM/Opus.
+    """
+    stream = open_stream(raw_pcm)
+    session = stream.start(
+        reference_text, on_recognizing, on_recognized, options or AssessmentOptions()
+    )
+    return stream, session
+
+
+def slim_json_result(json_result):
+    """
+    What Feedback.json_data keeps of a JsonResult: the scores, words and
+    segments, without the other recognition hypotheses in NBest or the
+    lexical and ITN renderings of the text.
+    """
+    best = json_result["NBest"][0]
+    slim = {
+        key: json_result[key]
+        for key in ("Id", "Offset", "Duration", "DisplayText", "Segments")
+        if key in json_result
+    }
+    slim["NBest"] = [
+        {
+            key: best[key]
+            for key in ("Display", "PronunciationAssessment", "Words")
+            if key in best
+        }
+    ]
+    return slim
+
+
+def compress_payload(json_result):
+    return zlib.compress(json.dumps(json_result, separators=(",", ":")).encode())
+
+
+def feedback_json(feedback):
+    """
+    The slim JsonResult of a Feedback. Rows not yet converted by
+    compact_feedback_json hold the complete result as a JSON string.
+    """
+    if isinstance(feedback.json_data, str):
+        return json.loads(feedback.json_data)
+    return feedback.json_data
+
+
+def feedback_payload(feedback):
+    """The complete JsonResult of a Feedback, from FeedbackPayload."""
+    try:
+        return json.loads(zlib.decompress(feedback.payload.data))
+    except FeedbackPayload.DoesNotExist:
+        return feedback_json(feedback)
+
+
+def _syllable_at(syllables, offset):
+    for syllable in syllables:
+        if syllable["Offset"] <= offset < syllable["Offset"] + syllable["Duration"]:
+            return syllable["Syllable"]
+    return ""
+
+
+def error_rows(feedback, json_result):
+    """
+    Unsaved Error rows for a Feedback: one per phoneme of every assessed word
+    in `json_result`, and one for each word without phonemes (omissions and
+    insertions, or every word at Word granularity).
+    """
+    rows = []
+    for word in json_result["NBest"][0].get("Words", []):
+        scores = word.get("PronunciationAssessment", {})
+        common = {
+            "feedback": feedback,
+            "user_id": feedback.user_id,
+            "error_type": scores.get("ErrorType", "None"),
+            "error_text": word["Word"],
+        }
+        phonemes = word.get("Phonemes") or []
+        if not phonemes:
+            rows.append(
+                Error(
+                    phoneme="",
+                    syllable="",
+                    accuracy_score=scores.get("AccuracyScore", 0),
+                    **common,
+                )
+            )
+        for phoneme in phonemes:
+            rows.append(
+                Error(
+                    phoneme=phoneme["Phoneme"],
+                    syllable=_syllable_at(
+                        word.get("Syllables", []), phoneme.get("Offset", -1)
+                    ),
+                    accuracy_score=phoneme.get("PronunciationAssessment", {}).get(
+                        "AccuracyScore", 0
+                    ),
+                    **common,
+                )
+            )
+    return rows
+
+
+def _new_feedback(user_profile, sentence_id, display_text, result_id, json_result):
+    scores = json_result["NBest"][0]["PronunciationAssessment"]
+    return Feedback(
+        azure_id=result_id,
+        user=user_profile,
+        sentence_id=sentence_id,
+        display_text=display_text,
+        accuracy_score=scores["AccuracyScore"],
+        fluency_score=scores["FluencyScore"],
+        completeness_score=scores["CompletenessScore"],
+        pron_score=scores["PronScore"],
+        json_data=slim_json_result(json_result),
+    )
+
+
+def _insert_feedbacks(feedbacks, json_results):
+    """
+    Inserts unsaved Feedback rows with their payloads and Error rows, a single
+    INSERT per table.
+    """
+    Feedback.objects.bulk_create(feedbacks)
+    FeedbackPayload.objects.bulk_create(
+        [
+            FeedbackPayload(feedback=feedback, data=compress_payload(json_result))
+            for feedback, json_result in zip(feedbacks, json_results)
+        ]
+    )
+    Error.objects.bulk_create(
+        [
+            row
+            for feedback, json_result in zip(feedbacks, json_results)
+            for row in error_rows(feedback, json_result)
+        ]
+    )
+
+
+def save_feedback(user_profile, sentence_id, reference_text, result):
+    """
+    Stores an AssessmentResult as Feedback with its Error rows, and records the
+    practice Event.
+    """
+    feedback = _new_feedback(
+        user_profile, sentence_id, reference_text, result.result_id, result.json_result
+    )
+    # part of the caller's transaction if there is one, without a savepoint
+    with transaction.atomic(savepoint=False):
+        _insert_feedbacks([feedback], [result.json_result])
+
+        # Record an event that the user completed a practice
+        Event.objects.create(
+            user=user_profile,
+            event_type="PRACTICE_PRON",
+        )
+    return feedback
+
+
+def save_passage_feedback(user_profile, sentences, result):
+    """
+    Stores one Feedback per sentence of a read-through `result`, with a single
+    INSERT, and marks every sentence the user actually read as complete with a
+    single UPDATE. Returns the Feedback objects in sentence order.
+    """
+    sentence_results = split_by_sentence(
+        result.json_result, [sentence.text for sentence in sentences]
+    )
+    feedbacks = [
+        _new_feedback(
+            user_profile,
+            sentence.sentence_id,
+            sentence.text,
+            result.result_id,
+            sentence_result,
+        )
+        for sentence, sentence_result in zip(sentences, sentence_results)
+    ]
+
+    with transaction.atomic():
+        _insert_feedbacks(feedbacks, sentence_results)
+        Event.objects.create(user=user_profile, event_type="PRACTICE_PRON")
+        progress.complete_sentences(
+            user_profile,
+            [
+                feedback.sentence_id
+                for feedback in feedbacks
+                if feedback.completeness_score > 0
+            ],
+        )
+    return feedbacks
+
+
+def save_batch_feedback(user_profile, items):
+    """
+    Stores the Feedback of several assessed clips, `items` being
+    (sentence_id, reference_text, AssessmentResult) triples, with a practice
+    Event each, and marks their sentences complete, all in one transaction.
+    Returns the Feedback objects in item order.
+    """
+    feedbacks = [
+        _new_feedback(
+            user_profile, sentence_id, text, result.result_id, result.json_result
+        )
+        for sentence_id, text, result in items
+    ]
+    with transaction.atomic():
+        _insert_feedbacks(feedbacks, [result.json_result for _, _, result in items])
+        Event.objects.bulk_create(
+            [Event(user=user_profile, event_type="PRACTICE_PRON") for _ in feedbacks]
+        )
+        sentence_ids = {sentence_id for sentence_id, _, _ in items if sentence_id}
+        if sentence_ids:
+            progress.complete_sentences(user_profile, sentence_ids)
+    return feedbacks
+
+
+def feedback_response_data(feedback, fields=DEFAULT_RESPONSE_FIELDS):
+    """The scores of a Feedback, and the parts of its result in `fields`."""
+    data = {
+        "AccuracyScore": feedback.accuracy_score,
+        "FluencyScore": feedback.fluency_score,
+        "PronunciationScore": feedback.pron_score,
+    }
+    if "words" in fields:
+        data["Words"] = [
+            {
+                "Word": word["Word"],
+                "AccuracyScore": word.get("PronunciationAssessment", {}).get(
+                    "AccuracyScore", 0
+                ),
+                "ErrorType": _error_type(word) or "None",
+            }
+            for word in feedback_json(feedback)["NBest"][0].get("Words", [])
+        ]
+    if "json" in fields:
+        json_data = feedback.json_data
+        # a JSON string, as the API has always returned it. Sorted, since
+        # jsonb doesn't keep the key order.
+        data["JsonResult"] = (
+            json.dumps(json_data, sort_keys=True)
+            if not isinstance(json_data, str)
+            else json_data
+        )
+    return data
+
+
+def owns_sentence(user_profile, sentence_id):
+    """Whether the sentence exists and is in one of the user's passages."""
+    try:
+        return Sentence.objects.filter(
+            sentence_id=sentence_id, passage__user=user_profile
+        ).exists()
+    except ValueError:
+        return False
+
+
+def complete_sentence(user_profile, sentence_id):
+    """
+    Marks the user's sentence complete and counts it in its passage's progress.
+    Returns False if it was complete already or isn't in the user's passages.
+    """
+    return bool(progress.complete_sentences(user_profile, [sentence_id]))
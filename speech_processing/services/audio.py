@@ -0,0 +1,147 @@
+"""
+Local audio pre-processing before assessment: decode to PCM, downmix to mono,
+resample to 16 kHz and trim leading and trailing silence, so Azure gets the
+smallest input it can assess and no silence is uploaded or billed.
+
+Only WAV (integer PCM or IEEE float) is decoded here. Anything else raises
+UnsupportedAudioError and goes to Azure as is, decoded by the SDK.
+"""
+
+import struct
+
+import numpy as np
+
+TARGET_RATE = 16000
+
+# Voice activity detection: frames quieter than this, relative to the loudest
+# frame, count as silence. Frames below SILENCE_FLOOR_DBFS always do.
+FRAME_MS = 20
+SILENCE_THRESHOLD_DB = -35.0
+SILENCE_FLOOR_DBFS = -55.0
+# Silence kept around the speech so word onsets and endings aren't clipped
+PADDING_MS = 200
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class UnsupportedAudioError(Exception):
+    pass
+
+
+def decode_wav(data):
+    """
+    Returns (samples, sample_rate), samples as float32 in [-1, 1] with shape
+    (frames, channels).
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise UnsupportedAudioError("Not a WAV file.")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos : pos + 4]
+        (chunk_size,) = struct.unpack_from("<I", data, pos + 4)
+        body = memoryview(data)[pos + 8 : pos + 8 + chunk_size]
+        if chunk_id == b"fmt ":
+            if len(body) < 16:
+                raise UnsupportedAudioError("Truncated WAV format.")
+            format_tag, channels, sample_rate = struct.unpack_from("<HHI", body)
+            (bits_per_sample,) = struct.unpack_from("<H", body, 14)
+            if format_tag == _WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                (format_tag,) = struct.unpack_from("<H", body, 24)
+            fmt = (format_tag, channels, sample_rate, bits_per_sample)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise UnsupportedAudioError("WAV data before format.")
+            return _decode_samples(body, *fmt), fmt[2]
+        # chunks are padded to an even size
+        pos += 8 + chunk_size + (chunk_size & 1)
+    raise UnsupportedAudioError("WAV file without data.")
+
+
+def _decode_samples(body, format_tag, channels, sample_rate, bits_per_sample):
+    width = bits_per_sample // 8
+    if not channels or not sample_rate or not width:
+        raise UnsupportedAudioError("Invalid WAV format.")
+    body = body[: len(body) - len(body) % (width * channels)]
+
+    if format_tag == _WAVE_FORMAT_IEEE_FLOAT and bits_per_sample in (32, 64):
+        samples = np.frombuffer(body, dtype=f"<f{width}").astype(np.float32)
+    elif format_tag == _WAVE_FORMAT_PCM and bits_per_sample == 8:
+        # 8-bit WAV is unsigned
+        samples = (np.frombuffer(body, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif format_tag == _WAVE_FORMAT_PCM and bits_per_sample in (16, 32):
+        samples = np.frombuffer(body, dtype=f"<i{width}").astype(np.float32)
+        samples /= float(2 ** (bits_per_sample - 1))
+    elif format_tag == _WAVE_FORMAT_PCM and bits_per_sample == 24:
+        raw = np.frombuffer(body, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        samples = ints.astype(np.float32) / float(1 << 23)
+    else:
+        raise UnsupportedAudioError(
+            f"Unsupported WAV encoding {format_tag}, {bits_per_sample} bits."
+        )
+    return samples.reshape(-1, channels)
+
+
+def downmix(samples):
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(samples, rate, target_rate=TARGET_RATE):
+    """
+    Band-limited resampling: a windowed-sinc low-pass below the new Nyquist
+    frequency when downsampling, then linear interpolation.
+    """
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    if rate > target_rate:
+        cutoff = 0.5 * target_rate / rate
+        taps = np.arange(-32, 33)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+        samples = np.convolve(samples, kernel / kernel.sum(), mode="same")
+    duration = len(samples) / rate
+    positions = np.arange(int(duration * target_rate)) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def trim_silence(samples, rate=TARGET_RATE):
+    """
+    Energy-based voice activity detection. Returns the samples from the first
+    to the last voiced frame, with PADDING_MS of context on both sides, or an
+    empty array if no frame is voiced.
+    """
+    frame = rate * FRAME_MS // 1000
+    frames = len(samples) // frame
+    if frames == 0:
+        return samples[:0]
+    rms = np.sqrt(
+        np.mean(samples[: frames * frame].reshape(frames, frame) ** 2, axis=1)
+    )
+    level = 20 * np.log10(np.maximum(rms, 1e-10))
+    threshold = max(level.max() + SILENCE_THRESHOLD_DB, SILENCE_FLOOR_DBFS)
+    voiced = np.flatnonzero(level > threshold)
+    if len(voiced) == 0:
+        return samples[:0]
+    padding = rate * PADDING_MS // 1000
+    start = max(0, voiced[0] * frame - padding)
+    end = min(len(samples), (voiced[-1] + 1) * frame + padding)
+    return samples[start:end]
+
+
+def to_pcm16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def preprocess(data):
+    """
+    Turns an uploaded recording into trimmed 16 kHz 16-bit mono PCM bytes,
+    empty if there is no speech. Raises UnsupportedAudioError for formats that
+    can't be decoded locally.
+    """
+    samples, rate = decode_wav(data)
+    samples = trim_silence(resample(downmix(samples), rate))
+    return to_pcm16(samples)
@@ -0,0 +1,98 @@
+"""
+Content-addressed storage of uploaded assessment audio. Each distinct
+recording is written once, to ASSESSMENT_AUDIO_ROOT/<aa>/<bb>/<sha256>, and
+shared by every user who uploaded it; AudioUpload rows record who did. Uploads
+are streamed to a temporary file while being hashed, then moved into place,
+so neither the whole file nor a second pass over it is needed.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+
+from django.conf import settings
+
+from speech_processing.models import AudioUpload
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def path_for(sha256):
+    if not _SHA256_RE.match(sha256):
+        raise ValueError("Not a SHA-256 hex digest.")
+    return os.path.join(settings.ASSESSMENT_AUDIO_ROOT, sha256[:2], sha256[2:4], sha256)
+
+
+class AudioWriter:
+    """Writes audio to a temporary file and hashes it as it arrives."""
+
+    def __init__(self):
+        directory = os.path.join(settings.ASSESSMENT_AUDIO_ROOT, "tmp")
+        os.makedirs(directory, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=directory, delete=False)
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+        self.sha256 = None
+
+    def write(self, data):
+        self._file.write(data)
+        self._sha256.update(data)
+        self.size += len(data)
+
+    def commit(self):
+        """Moves the file to its content address, returns its SHA-256."""
+        self._file.close()
+        self.sha256 = self._sha256.hexdigest()
+        path = path_for(self.sha256)
+        if os.path.exists(path):
+            # stored before, by this user or another
+            os.unlink(self._file.name)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # atomic, so concurrent uploads of the same audio are harmless
+            os.replace(self._file.name, path)
+        return self.sha256
+
+    def discard(self):
+        if self.sha256 is None:
+            self._file.close()
+            try:
+                os.unlink(self._file.name)
+            except FileNotFoundError:
+                pass
+
+
+def record(user_profile, sha256, size, content_type=""):
+    """Gives the user access to stored audio, a no-op if they have it already."""
+    AudioUpload.objects.bulk_create(
+        [
+            AudioUpload(
+                user=user_profile,
+                sha256=sha256,
+                size=size,
+                content_type=content_type or "",
+            )
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def store(user_profile, audio_file):
+    """Stores an uploaded file for the user and returns its SHA-256."""
+    writer = AudioWriter()
+    try:
+        for chunk in audio_file.chunks():
+            writer.write(chunk)
+        sha256 = writer.commit()
+    finally:
+        writer.discard()
+    record(user_profile, sha256, writer.size, getattr(audio_file, "content_type", ""))
+    return sha256
+
+
+def get_upload(user_profile, sha256):
+    """The user's AudioUpload of `sha256`, or None if they never uploaded it."""
+    if not _SHA256_RE.match(sha256):
+        return None
+    return AudioUpload.objects.filter(user=user_profile, sha256=sha256).first()
@@ -0,0 +1,52 @@
+"""
+Speech assessment backends. The one used is chosen by the
+SPEECH_ASSESSMENT_BACKEND setting, the dotted path of an AssessmentBackend
+subclass:
+
+- backends.azure.AzureBackend, the Azure Speech service
+- backends.fake.FakeBackend, deterministic results without any service call,
+  for load tests and local development
+"""
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class AssessmentBackend:
+    # Everything besides audio, reference text and AssessmentOptions that
+    # changes an assessment's result. Part of the result cache key, so bump it
+    # when the config changes.
+    settings_key = ""
+
+    def assess(self, audio_file, reference_text, options):
+        """
+        Assesses `audio_file` (anything with a Django-style `chunks()` method)
+        against `reference_text` as set by `options`, an AssessmentOptions, and
+        returns an AssessmentResult. Raises SpeechNotRecognizedError if no
+        speech could be recognized.
+        """
+        raise NotImplementedError
+
+    def open_stream(self, raw_pcm=False):
+        """
+        Returns an audio stream to assess audio that is still arriving: it has
+        `write(data)` and `close()`, and `start(reference_text, on_recognizing,
+        on_recognized, options)` which returns a session with `finish()` and
+        `cancel()`
+        (see azure.ContinuousAssessment). `raw_pcm` selects 16 kHz 16-bit
+        mono PCM instead of a compressed container.
+        """
+        raise NotImplementedError
+
+
+_backend = None
+_backend_path = None
+
+
+def get_backend():
+    """The configured backend, built once per process."""
+    global _backend, _backend_path
+    if _backend_path != settings.SPEECH_ASSESSMENT_BACKEND:
+        _backend = import_string(settings.SPEECH_ASSESSMENT_BACKEND)()
+        _backend_path = settings.SPEECH_ASSESSMENT_BACKEND
+    return _backend
@@ -0,0 +1,193 @@
+"""
+Pronunciation assessment with the Azure Speech service, using continuous
+recognition so recordings with several utterances are assessed in full.
+"""
+
+import json
+import threading
+
+import azure.cognitiveservices.speech as speechsdk
+from django.conf import settings
+
+from speech_processing.services import assessment, audio, recognizers
+from . import AssessmentBackend
+
+
+def _apply_pronunciation_config(recognizer, reference_text, options):
+    pronunciation_config = speechsdk.PronunciationAssessmentConfig(
+        reference_text=reference_text,
+        granularity=getattr(
+            speechsdk.PronunciationAssessmentGranularity, options.granularity
+        ),
+        # reports mispronounced words as such, see assessment.align_words for
+        # omissions and insertions
+        enable_miscue=True,
+    )
+    if options.prosody:
+        pronunciation_config.enable_prosody_assessment()
+    pronunciation_config.apply_to(recognizer)
+
+
+class ContinuousAssessment:
+    """
+    Collects every recognized segment of a continuous recognition session of a
+    WarmRecognizer, and closes its connection once the session is over.
+    `on_recognizing` gets each interim hypothesis text and `on_recognized` each
+    segment's JsonResult as they arrive. Both are called from the SDK's threads.
+    """
+
+    def __init__(self, warm, reference_text, on_recognizing=None, on_recognized=None):
+        self._warm = warm
+        recognizer = self._recognizer = warm.recognizer
+        self._reference_text = reference_text
+        self._on_recognizing = on_recognizing
+        self._on_recognized = on_recognized
+        self._segments = []
+        self._result_ids = []
+        self._errors = []
+        self._done = threading.Event()
+
+        recognizer.recognizing.connect(self._recognizing)
+        recognizer.recognized.connect(self._recognized)
+        recognizer.canceled.connect(self._canceled)
+        recognizer.session_stopped.connect(lambda evt: self._done.set())
+
+    def _recognizing(self, evt):
+        if self._on_recognizing:
+            self._on_recognizing(evt.result.text)
+
+    def _recognized(self, evt):
+        if evt.result.reason != speechsdk.ResultReason.RecognizedSpeech:
+            return
+        segment = json.loads(
+            evt.result.properties.get(
+                speechsdk.PropertyId.SpeechServiceResponse_JsonResult
+            )
+        )
+        self._result_ids.append(evt.result.result_id)
+        self._segments.append(segment)
+        if self._on_recognized:
+            self._on_recognized(segment)
+
+    def _canceled(self, evt):
+        if evt.cancellation_details.reason == speechsdk.CancellationReason.Error:
+            self._errors.append(evt.cancellation_details.error_details)
+        self._done.set()
+
+    def start(self):
+        self._recognizer.start_continuous_recognition()
+
+    def cancel(self):
+        try:
+            self._recognizer.stop_continuous_recognition()
+        finally:
+            self._warm.close()
+
+    def finish(self, timeout=assessment.RECOGNITION_TIMEOUT):
+        """
+        Blocks until the audio stream is exhausted, then returns the merged
+        AssessmentResult. Raises SpeechNotRecognizedError if Azure could not
+        recognize any speech, and AssessmentTimeoutError if the stream isn't
+        done within `timeout` seconds.
+        """
+        finished = self._done.wait(timeout)
+        try:
+            self._recognizer.stop_continuous_recognition()
+        finally:
+            self._warm.close()
+        if not finished:
+            raise assessment.AssessmentTimeoutError("Speech assessment timed out.")
+
+        if self._errors and not self._segments:
+            raise assessment.SpeechNotRecognizedError(self._errors[0])
+        if not self._segments:
+            raise assessment.SpeechNotRecognizedError(
+                "Speech not recognized or an error occurred."
+            )
+        return assessment.AssessmentResult(
+            result_id=self._result_ids[0],
+            json_result=assessment.merge_segments(self._segments, self._reference_text),
+        )
+
+
+def start_assessment(
+    warm, reference_text, on_recognizing=None, on_recognized=None, options=None
+):
+    """
+    Starts assessing the audio of a WarmRecognizer (see recognizers.acquire)
+    against `reference_text`, returns the running ContinuousAssessment.
+    """
+    _apply_pronunciation_config(
+        warm.recognizer, reference_text, options or assessment.AssessmentOptions()
+    )
+    session = ContinuousAssessment(
+        warm,
+        reference_text,
+        on_recognizing=on_recognizing,
+        on_recognized=on_recognized,
+    )
+    session.start()
+    return session
+
+
+class AzureAudioStream:
+    """A push stream into a WarmRecognizer, see AssessmentBackend.open_stream."""
+
+    def __init__(self, warm):
+        self.warm = warm
+
+    def write(self, data):
+        self.warm.stream.write(data)
+
+    def close(self):
+        self.warm.stream.close()
+
+    def start(
+        self, reference_text, on_recognizing=None, on_recognized=None, options=None
+    ):
+        return start_assessment(
+            self.warm, reference_text, on_recognizing, on_recognized, options
+        )
+
+
+class AzureBackend(AssessmentBackend):
+    @property
+    def settings_key(self):
+        # preprocessed uploads are what Azure hears, so they may score differently
+        if settings.SPEECH_AUDIO_PREPROCESSING:
+            return "azure;preprocessed"
+        return "azure"
+
+    def assess(self, audio_file, reference_text, options):
+        if settings.SPEECH_AUDIO_PREPROCESSING:
+            pcm = _preprocess(audio_file)
+            if pcm is not None:
+                if not pcm:
+                    raise assessment.SpeechNotRecognizedError("No speech detected.")
+                stream = self.open_stream(raw_pcm=True)
+                session = stream.start(reference_text, options=options)
+                stream.write(pcm)
+                stream.close()
+                return session.finish()
+
+        warm = recognizers.acquire(recognizers.PULL)
+        warm.reader.set_file(audio_file)
+        return start_assessment(warm, reference_text, options=options).finish()
+
+    def open_stream(self, raw_pcm=False):
+        return AzureAudioStream(
+            recognizers.acquire(recognizers.PUSH_PCM if raw_pcm else recognizers.PUSH)
+        )
+
+
+def _preprocess(audio_file):
+    """Trimmed 16 kHz PCM of `audio_file`, or None if it can't be decoded here."""
+    audio_file.seek(0)
+    is_wav = audio_file.read(4) == b"RIFF"
+    audio_file.seek(0)
+    if not is_wav:
+        return None
+    try:
+        return audio.preprocess(b"".join(audio_file.chunks()))
+    except audio.UnsupportedAudioError:
+        return None
@@ -0,0 +1,247 @@
+"""
+Offline stand-in for the Azure backend, for load testing the assessment
+endpoints and working without a Speech subscription. Results have the shape
+of Azure's JsonResult and depend only on the audio and the reference text, so
+the same submission always gets the same scores. Latency and failures are
+random: SPEECH_FAKE_LATENCY sets the mean latency, SPEECH_FAKE_ERROR_RATE the
+fraction of assessments failing with a recognition error, and
+SPEECH_FAKE_FAILURE_RATE the fraction failing as if the service timed out.
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from speech_processing.services import assessment
+from . import AssessmentBackend
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _word_entry(rng, word, offset):
+    """One NBest word; offsets are in 100-nanosecond ticks, as in Azure's."""
+    if rng.random() < 0.03:
+        return {
+            "Word": word.lower(),
+            "Offset": 0,
+            "Duration": 0,
+            "PronunciationAssessment": {"AccuracyScore": 0, "ErrorType": "Omission"},
+        }, offset
+
+    accuracy = max(0.0, 100 - rng.expovariate(1 / 12))
+    phonemes = [c for c in word.lower() if c.isalpha()] or [word.lower()]
+    phoneme_duration = rng.randint(600_000, 1_200_000)
+    entry = {
+        "Word": word.lower(),
+        "Offset": offset,
+        "Duration": phoneme_duration * len(phonemes),
+        "PronunciationAssessment": {
+            "AccuracyScore": round(accuracy),
+            "ErrorType": "Mispronunciation" if accuracy < 60 else "None",
+        },
+        "Phonemes": [
+            {
+                "Phoneme": phoneme,
+                "Offset": offset + i * phoneme_duration,
+                "Duration": phoneme_duration,
+                "PronunciationAssessment": {
+                    "AccuracyScore": round(
+                        min(100.0, max(0.0, accuracy + rng.uniform(-15, 15)))
+                    )
+                },
+            }
+            for i, phoneme in enumerate(phonemes)
+        ],
+    }
+    pause = rng.randint(500_000, 2_500_000)
+    return entry, offset + entry["Duration"] + pause
+
+
+def _segment(rng, sentence, offset, options):
+    words = []
+    start = offset
+    for word in assessment.WORD_RE.findall(sentence):
+        entry, offset = _word_entry(rng, word, offset)
+        words.append(entry)
+    segment_scores = {
+        "FluencyScore": round(rng.uniform(60, 100)),
+        "ProsodyScore": round(rng.uniform(55, 100), 1),
+    }
+    if not options.prosody:
+        del segment_scores["ProsodyScore"]
+    scores = assessment.combine_scores(
+        words, [(segment_scores, 1)], len(assessment.WORD_RE.findall(sentence))
+    )
+    # coarser granularities leave out what Azure wouldn't report
+    if options.granularity == "FullText":
+        words = []
+    elif options.granularity == "Word":
+        for word in words:
+            word.pop("Phonemes", None)
+    return {
+        "Id": f"{rng.getrandbits(128):032x}",
+        "RecognitionStatus": "Success",
+        "Offset": start,
+        "Duration": offset - start,
+        "DisplayText": sentence,
+        "NBest": [
+            {
+                "Confidence": round(rng.uniform(0.85, 0.99), 4),
+                "Lexical": " ".join(
+                    w.lower() for w in assessment.WORD_RE.findall(sentence)
+                ),
+                "Display": sentence,
+                "PronunciationAssessment": scores,
+                "Words": words,
+            }
+        ],
+    }, offset
+
+
+def fake_segments(audio_sha256, reference_text, options=None):
+    """
+    One JsonResult per sentence of `reference_text`, seeded by the audio.
+    `options` decide what is reported, as they would with Azure.
+    """
+    options = options or assessment.AssessmentOptions()
+    rng = random.Random(f"{audio_sha256}\0{reference_text}")
+    segments = []
+    offset = rng.randint(2_000_000, 8_000_000)
+    for sentence in _SENTENCE_RE.split(reference_text.strip()):
+        if not assessment.WORD_RE.search(sentence):
+            continue
+        segment, offset = _segment(rng, sentence, offset, options)
+        segments.append(segment)
+        offset += rng.randint(3_000_000, 8_000_000)
+    return segments
+
+
+class FakeSession:
+    """A finished-on-demand counterpart of azure.ContinuousAssessment."""
+
+    def __init__(
+        self, backend, stream, reference_text, on_recognizing, on_recognized, options
+    ):
+        self._backend = backend
+        self._stream = stream
+        self._reference_text = reference_text
+        self._options = options
+        self._on_recognizing = on_recognizing
+        self._on_recognized = on_recognized
+        self._canceled = False
+
+    def cancel(self):
+        self._canceled = True
+
+    def finish(self, timeout=assessment.RECOGNITION_TIMEOUT):
+        if not self._stream.closed.wait(timeout):
+            raise assessment.AssessmentTimeoutError("Speech assessment timed out.")
+        if self._canceled or not self._stream.size:
+            raise assessment.SpeechNotRecognizedError(
+                "Speech not recognized or an error occurred."
+            )
+        return self._backend.result(
+            self._stream.sha256.hexdigest(),
+            self._reference_text,
+            self._options,
+            self._on_recognizing,
+            self._on_recognized,
+        )
+
+
+class FakeAudioStream:
+    def __init__(self, backend):
+        self._backend = backend
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.closed = threading.Event()
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+
+    def close(self):
+        self.closed.set()
+
+    def start(
+        self, reference_text, on_recognizing=None, on_recognized=None, options=None
+    ):
+        return FakeSession(
+            self._backend,
+            self,
+            reference_text,
+            on_recognizing,
+            on_recognized,
+            options or assessment.AssessmentOptions(),
+        )
+
+
+class FakeBackend(AssessmentBackend):
+    settings_key = "fake"
+
+    @property
+    def latency(self):
+        return settings.SPEECH_FAKE_LATENCY
+
+    @property
+    def error_rate(self):
+        return settings.SPEECH_FAKE_ERROR_RATE
+
+    @property
+    def failure_rate(self):
+        return settings.SPEECH_FAKE_FAILURE_RATE
+
+    def assess(self, audio_file, reference_text, options):
+        digest = hashlib.sha256()
+        size = 0
+        for chunk in audio_file.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        if not size:
+            raise assessment.SpeechNotRecognizedError(
+                "Speech not recognized or an error occurred."
+            )
+        return self.result(digest.hexdigest(), reference_text, options)
+
+    def open_stream(self, raw_pcm=False):
+        return FakeAudioStream(self)
+
+    def result(
+        self,
+        audio_sha256,
+        reference_text,
+        options,
+        on_recognizing=None,
+        on_recognized=None,
+    ):
+        """
+        Waits out the simulated latency (0.5 to 1.5 times the configured mean),
+        fails at the configured rates, and otherwise returns the
+        AssessmentResult. Recognition errors are the user's (400s), service
+        failures count against the speech circuit breaker (504s).
+        """
+        if self.latency > 0:
+            time.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if random.random() < self.failure_rate:
+            raise assessment.AssessmentTimeoutError("Simulated service failure.")
+        if random.random() < self.error_rate:
+            raise assessment.SpeechNotRecognizedError("Simulated recognition error.")
+
+        segments = fake_segments(audio_sha256, reference_text, options)
+        if not segments:
+            raise assessment.SpeechNotRecognizedError(
+                "Speech not recognized or an error occurred."
+            )
+        for segment in segments:
+            if on_recognizing:
+                on_recognizing(segment["NBest"][0]["Lexical"])
+            if on_recognized:
+                on_recognized(segment)
+        return assessment.AssessmentResult(
+            result_id=segments[0]["Id"],
+            json_result=assessment.merge_segments(segments, reference_text),
+        )
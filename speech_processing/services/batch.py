@@ -0,0 +1,90 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from pera_be import admission
+from . import assessment
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    One bounded thread pool per process for the clips of batch requests. The
+    Azure SDK releases the GIL while waiting on the service, so threads are
+    enough here.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASSESSMENT_BATCH_WORKERS,
+                thread_name_prefix="batch-assessment",
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _run_lane(ticket, pending, clips, outcomes, options):
+    """Assesses clips from `pending` one after another under `ticket`."""
+    try:
+        while True:
+            try:
+                i = pending.get_nowait()
+            except queue.Empty:
+                return
+            audio_file, reference_text = clips[i]
+            try:
+                with ticket.call(expected=(assessment.SpeechNotRecognizedError,)):
+                    outcomes[i] = assessment.assess_admitted(
+                        audio_file, reference_text, options
+                    )
+            except Exception as e:
+                outcomes[i] = e
+    finally:
+        # pool threads outlive requests, so their connections are closed here
+        close_old_connections()
+
+
+def assess_all(clips, options=None):
+    """
+    Assesses (audio_file, reference_text) pairs concurrently, as many at a
+    time as the speech limiter has free slots for, up to
+    ASSESSMENT_BATCH_WORKERS. Each slot is a lane that works through the
+    clips in turn, so a batch larger than the limits is slower rather than
+    answered with 503s. Returns, in order, each clip's AssessmentResult or the
+    exception it raised. Raises admission.ServiceUnavailable if not even one
+    slot frees up in time.
+    """
+    if not clips:
+        return []
+    limiter = admission.get_limiter("speech")
+    tickets = [limiter.acquire()]
+    try:
+        while len(tickets) < min(len(clips), settings.ASSESSMENT_BATCH_WORKERS):
+            ticket = limiter.try_acquire()
+            if ticket is None:
+                break
+            tickets.append(ticket)
+        pending = queue.SimpleQueue()
+        for i in range(len(clips)):
+            pending.put(i)
+        outcomes = [None] * len(clips)
+        lanes = [
+            get_executor().submit(_run_lane, ticket, pending, clips, outcomes, options)
+            for ticket in tickets
+        ]
+        for lane in lanes:
+            lane.result()
+    finally:
+        # here rather than in the lanes: cluster slots are held by this
+        # thread's database connection
+        for ticket in tickets:
+            ticket.close()
+    return outcomes
@@ -0,0 +1,174 @@
+import datetime
+import hashlib
+import logging
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from pera_be import admission
+from speech_processing.models import AssessmentJob
+from . import assessment, result_cache
+
+logger = logging.getLogger(__name__)
+
+# Seconds on top of the longest a job can legitimately run for, waiting for
+# admission and then for recognition, before a RUNNING job is taken for one
+# whose worker died and is handed out again
+STALE_JOB_MARGIN = 60
+MAX_ATTEMPTS = 3
+
+
+def stale_job_timeout():
+    return datetime.timedelta(
+        seconds=settings.ADMISSION_MAX_WAIT
+        + assessment.RECOGNITION_TIMEOUT
+        + STALE_JOB_MARGIN
+    )
+
+
+def enqueue_assessment(
+    user_profile, audio_file, reference_text, sentence_id=None, options=None
+):
+    options = options or assessment.AssessmentOptions()
+    return AssessmentJob.objects.create(
+        user=user_profile,
+        sentence_id=sentence_id,
+        reference_text=reference_text,
+        granularity=options.granularity,
+        prosody=options.prosody,
+        audio=b"".join(audio_file.chunks()),
+    )
+
+
+def claim_next_job():
+    """
+    Atomically takes the oldest runnable job off the queue and marks it RUNNING.
+    Concurrent workers skip rows locked by each other instead of waiting on them.
+    Stale jobs that have used up their attempts are marked FAILED on the way.
+    """
+    now = timezone.now()
+    stale = Q(
+        status=AssessmentJob.Status.RUNNING, started_at__lt=now - stale_job_timeout()
+    )
+    runnable = Q(status=AssessmentJob.Status.PENDING) | (
+        stale & Q(attempts__lt=MAX_ATTEMPTS)
+    )
+    AssessmentJob.objects.filter(stale, attempts__gte=MAX_ATTEMPTS).update(
+        status=AssessmentJob.Status.FAILED,
+        error="The assessment did not finish.",
+        audio=b"",
+        finished_at=now,
+    )
+    with transaction.atomic():
+        job = (
+            AssessmentJob.objects.select_for_update(skip_locked=True)
+            .filter(runnable)
+            .order_by("created_at")
+            .first()
+        )
+        if job is None:
+            return None
+        AssessmentJob.objects.filter(job_id=job.job_id).update(
+            status=AssessmentJob.Status.RUNNING,
+            started_at=now,
+            attempts=F("attempts") + 1,
+        )
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    """
+    Assesses a claimed job and records the outcome. Raises
+    admission.ServiceUnavailable, with the job back in the queue, if the
+    speech service is at its limits.
+    """
+    options = assessment.AssessmentOptions(job.granularity, job.prosody)
+    try:
+        result = assessment.assess_pronunciation(
+            ContentFile(bytes(job.audio)), job.reference_text, options
+        )
+        with transaction.atomic():
+            feedback = assessment.save_feedback(
+                job.user, job.sentence_id, job.reference_text, result
+            )
+            if job.sentence_id:
+                assessment.complete_sentence(job.user, job.sentence_id)
+            result_cache.put(
+                [
+                    result_cache.content_key(
+                        hashlib.sha256(job.audio).hexdigest(),
+                        job.reference_text,
+                        assessment.settings_key(options),
+                    )
+                ],
+                feedback,
+            )
+    except admission.ServiceUnavailable:
+        # not the job's fault, put it back for later without using up an attempt
+        AssessmentJob.objects.filter(job_id=job.job_id).update(
+            status=AssessmentJob.Status.PENDING,
+            started_at=None,
+            attempts=F("attempts") - 1,
+        )
+        raise
+    except Exception as e:
+        if not isinstance(e, assessment.SpeechNotRecognizedError):
+            logger.exception("Assessment job %s failed", job.job_id)
+        job.status = AssessmentJob.Status.FAILED
+        job.error = str(e)
+    else:
+        job.status = AssessmentJob.Status.DONE
+        job.feedback = feedback
+    job.audio = b""
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "feedback", "audio", "finished_at"])
+
+
+class AssessmentWorkerPool:
+    """
+    Fixed-size pool of threads draining the AssessmentJob queue. The Azure SDK
+    releases the GIL while waiting on the service, so threads are enough here.
+    """
+
+    def __init__(self, size, poll_interval=1.0):
+        self.size = size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.size):
+            thread = threading.Thread(
+                target=self._work, name=f"assessment-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self):
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                job = claim_next_job()
+            except Exception:
+                logger.exception("Could not claim an assessment job")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            try:
+                run_job(job)
+            except admission.ServiceUnavailable as e:
+                self._stop.wait(e.retry_after)
+        close_old_connections()
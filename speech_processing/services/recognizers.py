@@ -0,0 +1,246 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import azure.cognitiveservices.speech as speechsdk
+from django.conf import settings
+
+from pera_be import metrics
+
+logger = logging.getLogger(__name__)
+
+# Kinds of audio input a recognizer can be built for
+PULL = "pull"  # pulls from an uploaded file, see RequestFileReaderCallback
+PUSH = "push"  # audio is written in as it arrives, any compressed container
+PUSH_PCM = "push_pcm"  # same, but 16 kHz 16-bit mono PCM
+
+
+class RequestFileReaderCallback(speechsdk.audio.PullAudioInputStreamCallback):
+    """
+    Feeds an uploaded file to the SDK. The file can be set after the recognizer
+    is built, as long as it's before recognition starts.
+    """
+
+    def __init__(self, request_file=None, chunk_size=65536):
+        super().__init__()
+        self._chunk_size = chunk_size
+        self._chunks = iter(())
+        self._latest = []
+        self._latest_ind = 0
+        if request_file is not None:
+            self.set_file(request_file)
+
+    def set_file(self, request_file):
+        self._chunks = request_file.chunks(chunk_size=self._chunk_size)
+
+    def read(self, buffer):
+        if self._latest_ind >= len(self._latest):
+            try:
+                # a memoryview so that slicing below doesn't copy the chunk
+                self._latest = memoryview(self._chunks.__next__())
+                self._latest_ind = 0
+            except StopIteration:
+                return 0
+            if len(self._latest) == 0:
+                return 0
+        sz = min(len(self._latest) - self._latest_ind, buffer.nbytes)
+        buffer[:sz] = self._latest[self._latest_ind : self._latest_ind + sz]
+        self._latest_ind += sz
+        return sz
+
+
+_speech_config = None
+
+
+def get_speech_config():
+    """One SpeechConfig per process, recognizers copy what they need from it."""
+    global _speech_config
+    if _speech_config is None:
+        _speech_config = speechsdk.SpeechConfig(
+            subscription=settings.SPEECH_KEY, region=settings.SPEECH_REGION
+        )
+    return _speech_config
+
+
+class WarmRecognizer:
+    """
+    A SpeechRecognizer with its input stream, built ahead of the request that
+    will use it. Recognizers are bound to their stream, so each one is used
+    for a single assessment.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.reader = None
+        if kind == PULL:
+            self.reader = RequestFileReaderCallback()
+            self.stream = speechsdk.audio.PullAudioInputStream(
+                stream_format=speechsdk.audio.AudioStreamFormat(
+                    compressed_stream_format=speechsdk.AudioStreamContainerFormat.ANY
+                ),
+                pull_stream_callback=self.reader,
+            )
+        elif kind == PUSH:
+            self.stream = speechsdk.audio.PushAudioInputStream(
+                stream_format=speechsdk.audio.AudioStreamFormat(
+                    compressed_stream_format=speechsdk.AudioStreamContainerFormat.ANY
+                )
+            )
+        else:
+            self.stream = speechsdk.audio.PushAudioInputStream(
+                stream_format=speechsdk.audio.AudioStreamFormat(
+                    samples_per_second=16000, bits_per_sample=16, channels=1
+                )
+            )
+        self.recognizer = speechsdk.SpeechRecognizer(
+            speech_config=get_speech_config(),
+            audio_config=speechsdk.audio.AudioConfig(stream=self.stream),
+        )
+        self.created_at = time.monotonic()
+        self._disconnected = False
+        self.connection = speechsdk.Connection.from_recognizer(self.recognizer)
+        self.connection.disconnected.connect(self._on_disconnected)
+
+    def _on_disconnected(self, evt):
+        self._disconnected = True
+
+    def preconnect(self):
+        """Opens the service connection now, instead of on first recognition."""
+        self.connection.open(for_continuous_recognition=True)
+
+    def is_healthy(self, max_age):
+        return not self._disconnected and time.monotonic() - self.created_at < max_age
+
+    def close(self):
+        self.connection.close()
+
+
+class RecognizerPool:
+    """
+    Keeps up to `size` pre-connected recognizers of one kind, so an assessment
+    can skip building the recognizer and the service handshake. Recognizers
+    that are older than `max_age` seconds (the service drops idle connections)
+    or were disconnected are evicted. From the first acquire on, a background
+    thread tops the pool up after every acquire and, every quarter of
+    `max_age`, replaces the recognizers that would go stale before its next
+    round, so the pool stays warm however rarely assessments come in.
+    """
+
+    def __init__(self, kind, size, max_age):
+        self.kind = kind
+        self.size = size
+        self.max_age = max_age
+        self.refresh_interval = max_age / 4
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def acquire(self):
+        evicted = []
+        warm = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.popleft()
+                if candidate.is_healthy(self.max_age):
+                    warm = candidate
+                    break
+                evicted.append(candidate)
+            self.evictions += len(evicted)
+            if warm is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        for candidate in evicted:
+            candidate.close()
+        self.refill()
+        return warm or WarmRecognizer(self.kind)
+
+    def refill(self):
+        """Wakes the pool's background thread, starting it the first time."""
+        with self._lock:
+            self._wake.set()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._maintain,
+                    name=f"recognizer-pool-{self.kind}",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _maintain(self):
+        while True:
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            try:
+                self._refresh()
+            except Exception:
+                logger.exception("Could not pre-connect a %s recognizer", self.kind)
+
+    def _refresh(self):
+        """
+        Evicts the idle recognizers that are unhealthy or would be by the next
+        round, and tops the pool back up to `size`.
+        """
+        with self._lock:
+            stale = [
+                warm
+                for warm in self._idle
+                if not warm.is_healthy(self.max_age - self.refresh_interval)
+            ]
+            for warm in stale:
+                self._idle.remove(warm)
+            self.evictions += len(stale)
+        for warm in stale:
+            warm.close()
+        while len(self._idle) < self.size:
+            warm = WarmRecognizer(self.kind)
+            warm.preconnect()
+            with self._lock:
+                self._idle.append(warm)
+
+    def stats(self):
+        return {
+            "idle": len(self._idle),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_pool(kind):
+    """Pools are per process, a forked worker starts with empty ones."""
+    global _pools, _pools_pid
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            _pools, _pools_pid = {}, os.getpid()
+        if kind not in _pools:
+            _pools[kind] = RecognizerPool(
+                kind,
+                settings.SPEECH_RECOGNIZER_POOL_SIZE,
+                settings.SPEECH_RECOGNIZER_MAX_AGE,
+            )
+        return _pools[kind]
+
+
+def acquire(kind):
+    """Returns a WarmRecognizer, pre-connected if the pool had one ready."""
+    if settings.SPEECH_RECOGNIZER_POOL_SIZE <= 0:
+        return WarmRecognizer(kind)
+    return get_pool(kind).acquire()
+
+
+metrics.register(
+    "speech_recognizer_pools",
+    lambda: {kind: pool.stats() for kind, pool in _pools.items()},
+)
@@ -0,0 +1,133 @@
+import datetime
+import hashlib
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import Event
+from pera_be import metrics
+from speech_processing.models import (
+    AssessmentCacheEntry,
+    Error,
+    Feedback,
+    FeedbackPayload,
+)
+from . import assessment
+
+# Roughly one write in this many also prunes expired and excess entries
+PRUNE_EVERY = 50
+
+_stats = {"hits": 0, "misses": 0}
+metrics.register("assessment_result_cache", lambda: dict(_stats))
+
+
+def content_key(audio_sha256, reference_text, assessment_settings):
+    """Cache key of an assessment of given audio, text and settings."""
+    return hashlib.sha256(
+        "\0".join(
+            ["content", audio_sha256, reference_text, assessment_settings]
+        ).encode()
+    ).hexdigest()
+
+
+def idempotency_key(user_profile, key):
+    """Cache key of a client's Idempotency-Key, scoped to the user."""
+    return hashlib.sha256(
+        "\0".join(["idempotency", str(user_profile.pk), key]).encode()
+    ).hexdigest()
+
+
+def get(cache_key):
+    """Returns the cached Feedback for `cache_key`, or None."""
+    now = timezone.now()
+    entry = (
+        AssessmentCacheEntry.objects.select_related("feedback")
+        .filter(
+            cache_key=cache_key,
+            created_at__gte=now
+            - datetime.timedelta(seconds=settings.ASSESSMENT_CACHE_TTL),
+        )
+        .first()
+    )
+    if entry is None:
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    AssessmentCacheEntry.objects.filter(cache_key=cache_key).update(
+        hits=F("hits") + 1, last_hit_at=now
+    )
+    return entry.feedback
+
+
+def put(cache_keys, feedback):
+    """Points every key in `cache_keys` at `feedback`, with a single upsert."""
+    if not cache_keys:
+        return
+    AssessmentCacheEntry.objects.bulk_create(
+        [
+            AssessmentCacheEntry(cache_key=cache_key, feedback=feedback)
+            for cache_key in cache_keys
+        ],
+        update_conflicts=True,
+        unique_fields=["cache_key"],
+        update_fields=["feedback", "created_at", "last_hit_at"],
+    )
+    if random.randrange(PRUNE_EVERY) == 0:
+        prune()
+
+
+def prune():
+    """
+    Drops entries past the TTL, then the least recently hit entries beyond
+    ASSESSMENT_CACHE_MAX_ENTRIES. Returns how many were deleted.
+    """
+    deleted, _ = AssessmentCacheEntry.objects.filter(
+        created_at__lt=timezone.now()
+        - datetime.timedelta(seconds=settings.ASSESSMENT_CACHE_TTL)
+    ).delete()
+    max_entries = settings.ASSESSMENT_CACHE_MAX_ENTRIES
+    cutoff = list(
+        AssessmentCacheEntry.objects.order_by("-last_hit_at").values_list(
+            "last_hit_at", flat=True
+        )[max_entries : max_entries + 1]
+    )
+    if cutoff:
+        excess, _ = AssessmentCacheEntry.objects.filter(
+            last_hit_at__lte=cutoff[0]
+        ).delete()
+        deleted += excess
+    return deleted
+
+
+def copy_for_user(feedback, user_profile, sentence_id):
+    """
+    A cached result reused by a different user (or for a different sentence)
+    still becomes that user's own Feedback, without calling Azure again.
+    """
+    if feedback.user_id == user_profile.pk and feedback.sentence_id == (
+        int(sentence_id) if sentence_id else None
+    ):
+        return feedback
+    with transaction.atomic(savepoint=False):
+        Event.objects.create(user=user_profile, event_type="PRACTICE_PRON")
+        copy = Feedback.objects.create(
+            azure_id=feedback.azure_id,
+            user=user_profile,
+            sentence_id=sentence_id,
+            display_text=feedback.display_text,
+            accuracy_score=feedback.accuracy_score,
+            fluency_score=feedback.fluency_score,
+            completeness_score=feedback.completeness_score,
+            pron_score=feedback.pron_score,
+            json_data=feedback.json_data,
+        )
+        payload = FeedbackPayload.objects.filter(feedback=feedback).first()
+        if payload is not None:
+            FeedbackPayload.objects.create(feedback=copy, data=payload.data)
+        Error.objects.bulk_create(
+            assessment.error_rows(copy, assessment.feedback_json(feedback))
+        )
+    return copy
@@ -1,3 +1,1560 @@
-# from django.test import TestCase
+import asyncio
+import datetime
+import hashlib
+import io
+import json
+import os
+import struct
+import tempfile
+import time
+import wave
+from io import StringIO
+from unittest.mock import MagicMock, patch
+from urllib.parse import urlencode
 
-# Create your tests here.
+import numpy as np
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+from django.utils import timezone
+from drf_spectacular.generators import SchemaGenerator
+from knox.models import AuthToken
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+
+from accounts.models import Event, UserProfile
+from pera_be import admission
+from pera_be.asgi import application
+from speech_processing.models import (
+    AssessmentCacheEntry,
+    AssessmentJob,
+    AudioUpload,
+    Error,
+    Feedback,
+)
+from speech_processing.services import (
+    audio,
+    audio_store,
+    jobs,
+    recognizers,
+    result_cache,
+)
+from speech_processing.services.backends import azure, fake
+from speech_processing.services.assessment import (
+    AssessmentResult,
+    RECOGNITION_TIMEOUT,
+    AssessmentTimeoutError,
+    SpeechNotRecognizedError,
+    assess_pronunciation,
+    feedback_payload,
+    merge_segments,
+    save_feedback,
+    split_by_sentence,
+)
+from texts.models import Passage, Sentence
+
+User = get_user_model()
+
+
+def make_json_result(text="Hello world.", accuracy=90.0):
+    words = [
+        {
+            "Word": word,
+            "Offset": 1000000 + i * 5000000,
+            "Duration": 4000000,
+            "PronunciationAssessment": {
+                "AccuracyScore": accuracy,
+                "ErrorType": "None",
+            },
+            "Phonemes": [
+                {
+                    "Phoneme": word[0].lower(),
+                    "Offset": 1000000 + i * 5000000,
+                    "Duration": 4000000,
+                    "PronunciationAssessment": {"AccuracyScore": accuracy},
+                }
+            ],
+        }
+        for i, word in enumerate(text.strip(".").split())
+    ]
+    return {
+        "Id": "0d4f3e6c8f1b4f0c9b2b5e0a1c2d3e4f",
+        "RecognitionStatus": "Success",
+        "Offset": 1000000,
+        "Duration": 5000000 * len(words),
+        "DisplayText": text,
+        "NBest": [
+            {
+                "Confidence": 0.98,
+                "Lexical": text.lower().strip("."),
+                "Display": text,
+                "PronunciationAssessment": {
+                    "AccuracyScore": accuracy,
+                    "FluencyScore": 80.0,
+                    "CompletenessScore": 100.0,
+                    "PronScore": 85.0,
+                    "ProsodyScore": 75.0,
+                },
+                "Words": words,
+            }
+        ],
+    }
+
+
+def make_assessment_result(text="Hello world.", accuracy=90.0):
+    return AssessmentResult(
+        result_id="0d4f3e6c8f1b4f0c9b2b5e0a1c2d3e4f",
+        json_result=merge_segments([make_json_result(text, accuracy)], text),
+    )
+
+
+class AssessmentTestMixin:
+    def setUp(self):
+        audio_root = tempfile.TemporaryDirectory()
+        self.addCleanup(audio_root.cleanup)
+        audio_settings = override_settings(ASSESSMENT_AUDIO_ROOT=audio_root.name)
+        audio_settings.enable()
+        self.addCleanup(audio_settings.disable)
+        self.user = User.objects.create_user(
+            email="speaker@example.com", password="testpass"
+        )
+        self.user_profile = UserProfile.objects.create(
+            auth_user=self.user,
+            default_settings={},
+            base_language="es",
+        )
+        self.passage = Passage.objects.create(
+            user=self.user_profile,
+            title="Test Passage",
+            language="en",
+            difficulty="Custom",
+        )
+        self.sentence = Sentence.objects.create(
+            passage=self.passage, text="Hello world.", completion_status=False
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def audio(self):
+        return SimpleUploadedFile("a.wav", b"RIFF" + b"\0" * 2048, "audio/wav")
+
+
+class AssessmentTestCase(AssessmentTestMixin, APITestCase):
+    pass
+
+
+class PronunciationAssessmentViewTests(AssessmentTestCase):
+    url = reverse("scripted-assessment")
+
+    def test_schema_documents_post(self):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        post = schema["paths"][self.url]["post"]
+        self.assertIn("requestBody", post)
+        self.assertLessEqual({"200", "202", "400", "503"}, set(post["responses"]))
+
+    @patch("speech_processing.services.assessment.assess_pronunciation")
+    def test_sync_assessment_stores_feedback(self, assess):
+        assess.return_value = make_assessment_result()
+        response = self.client.post(
+            self.url,
+            {
+                "audio": self.audio(),
+                "text": "Hello world.",
+                "sentence_id": self.sentence.sentence_id,
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["AccuracyScore"], 90.0)
+        feedback = Feedback.objects.get()
+        self.assertEqual(feedback.sentence_id, self.sentence.sentence_id)
+        self.assertEqual(
+            list(
+                Error.objects.filter(feedback=feedback).values_list(
+                    "user_id", "error_text", "phoneme", "accuracy_score"
+                )
+            ),
+            [
+                (self.user_profile.pk, "Hello", "h", 90.0),
+                (self.user_profile.pk, "world", "w", 90.0),
+            ],
+        )
+        self.assertEqual(Event.objects.filter(user=self.user_profile).count(), 1)
+        self.sentence.refresh_from_db()
+        self.assertTrue(self.sentence.completion_status)
+        self.passage.refresh_from_db()
+        self.assertEqual(self.passage.completed_count, 1)
+
+    @patch("speech_processing.services.result_cache.random.randrange", lambda n: 1)
+    @patch("speech_processing.services.assessment.assess_pronunciation")
+    def test_sync_write_path_round_trips(self, assess):
+        assess.return_value = make_assessment_result()
+        # ownership check, audio upload, cache lookup, then one transaction:
+        # savepoint, feedback, payload, errors, event, cache upsert, sentence
+        # lock, sentence update, passage progress update, release
+        with self.assertNumQueries(13):
+            response = self.client.post(
+                self.url,
+                {
+                    "audio": self.audio(),
+                    "text": "Hello world.",
+                    "sentence_id": self.sentence.sentence_id,
+                },
+                format="multipart",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AssessmentCacheEntry.objects.count(), 1)
+
+    @patch("speech_processing.services.assessment.assess_pronunciation")
+    def test_other_users_sentence_not_found(self, assess):
+        other = UserProfile.objects.create(
+            auth_user=User.objects.create_user(
+                email="other@example.com", password="testpass"
+            ),
+            default_settings={},
+            base_language="es",
+        )
+        sentence = Sentence.objects.create(
+            passage=Passage.objects.create(
+                user=other, title="Other", language="en", difficulty="Custom"
+            ),
+            text="Hello world.",
+            completion_status=False,
+        )
+        response = self.client.post(
+            self.url,
+            {
+                "audio": self.audio(),
+                "text": "Hello world.",
+                "sentence_id": sentence.sentence_id,
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 404)
+        assess.assert_not_called()
+        self.assertFalse(Feedback.objects.exists())
+        sentence.refresh_from_db()
+        self.assertFalse(sentence.completion_status)
+
+    @patch("speech_processing.uploadhandlers.assessment.open_stream")
+    def test_streamed_upload_is_assessed_while_arriving(self, open_stream):
+        stream = open_stream.return_value
+        writes_when_started = []
+
+        def start(reference_text, options):
+            writes_when_started.append(stream.write.call_count)
+            session = MagicMock()
+            session.finish.return_value = make_assessment_result()
+            return session
+
+        stream.start.side_effect = start
+        audio = b"RIFF" + bytes(range(256)) * 600
+        response = self.client.post(
+            self.url + "?" + urlencode({"stream": "true", "text": "Hello world."}),
+            {"audio": SimpleUploadedFile("a.wav", audio, "audio/wav")},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(writes_when_started, [0])
+        self.assertEqual(stream.start.call_args.args[0], "Hello world.")
+        written = [c.args[0] for c in stream.write.call_args_list]
+        self.assertGreater(len(written), 1)
+        self.assertEqual(b"".join(written), audio)
+        stream.close.assert_called_once()
+        self.assertEqual(Feedback.objects.get().display_text, "Hello world.")
+
+    def test_missing_audio(self):
+        response = self.client.post(
+            self.url, {"text": "Hello world."}, format="multipart"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    SPEECH_ASSESSMENT_BACKEND="speech_processing.services.backends.fake.FakeBackend",
+    SPEECH_FAKE_LATENCY=0,
+    SPEECH_FAKE_ERROR_RATE=0,
+    SPEECH_FAKE_FAILURE_RATE=0,
+)
+class FakeBackendTests(AssessmentTestCase):
+    url = reverse("scripted-assessment")
+    text = "Hello world. Good morning to you."
+
+    def test_results_depend_only_on_input(self):
+        first = fake.fake_segments("a" * 64, self.text)
+        self.assertEqual(first, fake.fake_segments("a" * 64, self.text))
+        self.assertNotEqual(first, fake.fake_segments("b" * 64, self.text))
+        self.assertEqual(
+            [s["DisplayText"] for s in first], ["Hello world.", "Good morning to you."]
+        )
+
+    def test_assessment_endpoint(self):
+        response = self.client.post(
+            self.url,
+            {"audio": self.audio(), "text": self.text},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        json_data = Feedback.objects.get().json_data
+        self.assertEqual(len(json_data["NBest"][0]["Words"]), 6)
+        self.assertEqual(len(json_data["Segments"]), 2)
+        for score in ("AccuracyScore", "FluencyScore", "PronunciationScore"):
+            self.assertTrue(0 <= response.data[score] <= 100)
+
+    def test_streamed_upload(self):
+        response = self.client.post(
+            self.url + "?" + urlencode({"stream": "true", "text": self.text}),
+            {"audio": self.audio()},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Feedback.objects.get().display_text, self.text)
+
+    def test_simulated_service_failures(self):
+        limiter = admission.get_limiter("speech")
+        failed = limiter.stats()["failed"]
+        with self.settings(SPEECH_FAKE_FAILURE_RATE=1):
+            response = self.client.post(
+                self.url, {"audio": self.audio(), "text": self.text}, format="multipart"
+            )
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(limiter.stats()["failed"], failed + 1)
+        self.assertFalse(Feedback.objects.exists())
+
+    def test_lighter_assessment_modes(self):
+        full = self.client.post(
+            self.url, {"audio": self.audio(), "text": self.text}, format="multipart"
+        )
+        response = self.client.post(
+            self.url + "?fields=scores",
+            {
+                "audio": self.audio(),
+                "text": self.text,
+                "granularity": "FullText",
+                "prosody": "false",
+            },
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(response.data),
+            {"AccuracyScore", "FluencyScore", "PronunciationScore", "audio_sha256"},
+        )
+        # assessed again rather than served from the cached full assessment
+        self.assertEqual(Feedback.objects.count(), 2)
+        feedback = Feedback.objects.latest("feedback_id")
+        self.assertEqual(feedback.json_data["NBest"][0]["Words"], [])
+        self.assertNotIn(
+            "ProsodyScore", feedback.json_data["NBest"][0]["PronunciationAssessment"]
+        )
+        self.assertFalse(Error.objects.filter(feedback=feedback).exists())
+
+        response = self.client.post(
+            self.url + "?fields=words",
+            {"audio": self.audio(), "text": self.text, "granularity": "Word"},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("JsonResult", response.data)
+        self.assertEqual(
+            [word["Word"] for word in response.data["Words"]],
+            ["hello", "world", "good", "morning", "to", "you"],
+        )
+        feedback = Feedback.objects.latest("feedback_id")
+        self.assertTrue(
+            all("Phonemes" not in w for w in feedback.json_data["NBest"][0]["Words"])
+        )
+        self.assertEqual(
+            set(
+                Error.objects.filter(feedback=feedback).values_list(
+                    "phoneme", flat=True
+                )
+            ),
+            {""},
+        )
+        self.assertLess(
+            len(json.dumps(feedback.json_data)), len(full.data["JsonResult"])
+        )
+
+    def test_invalid_options(self):
+        for query, data in (
+            ("", {"granularity": "Syllable"}),
+            ("", {"prosody": "maybe"}),
+            ("?fields=everything", {}),
+        ):
+            response = self.client.post(
+                self.url + query,
+                {"audio": self.audio(), "text": self.text, **data},
+                format="multipart",
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Feedback.objects.exists())
+
+    @override_settings(SPEECH_FAKE_ERROR_RATE=1)
+    def test_simulated_errors(self):
+        response = self.client.post(
+            self.url,
+            {"audio": self.audio(), "text": self.text},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Feedback.objects.exists())
+
+
+class AdmissionTests(AssessmentTestCase):
+    url = reverse("scripted-assessment")
+
+    def test_full_limiter_rejects_after_deadline(self):
+        limiter = admission.Limiter("speech", local=1, max_wait=0.05)
+        ticket = limiter.acquire()
+        with self.assertRaises(admission.ServiceUnavailable) as raised:
+            limiter.acquire()
+        self.assertEqual(raised.exception.retry_after, 1)
+        ticket.release()
+        limiter.acquire().release()
+        self.assertEqual(limiter.stats()["rejected"], 1)
+        self.assertEqual(limiter.stats()["admitted"], 2)
+
+    def test_cluster_slots_are_shared(self):
+        limiter = admission.Limiter("speech", local=5, cluster=1, max_wait=0.05)
+        ticket = limiter.acquire()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM pg_locks WHERE locktype = 'advisory'")
+            self.assertEqual(cursor.fetchone()[0], 1)
+        with self.assertRaises(admission.ServiceUnavailable):
+            limiter.acquire()
+        ticket.release()
+        limiter.acquire().release()
+
+    def test_breaker_opens_on_failures_and_probes(self):
+        breaker = admission.CircuitBreaker(
+            "speech", failure_ratio=0.5, min_calls=2, window=10, cooldown=60
+        )
+        limiter = admission.Limiter("speech", local=2, breaker=breaker)
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                with limiter.admit():
+                    raise RuntimeError("Azure unavailable")
+        with self.assertRaises(admission.ServiceUnavailable) as raised:
+            limiter.acquire()
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+        breaker.cooldown = 0
+        with limiter.admit():
+            pass
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_caller_errors_do_not_trip_the_breaker(self):
+        breaker = admission.CircuitBreaker(
+            "speech", failure_ratio=0.5, min_calls=1, window=10, cooldown=60
+        )
+        limiter = admission.Limiter("speech", local=1, breaker=breaker)
+        with self.assertRaises(SpeechNotRecognizedError):
+            with limiter.admit(expected=(SpeechNotRecognizedError,)):
+                raise SpeechNotRecognizedError("No speech detected.")
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    @patch("speech_processing.services.assessment.admission.get_limiter")
+    def test_busy_service_answers_503(self, get_limiter):
+        get_limiter.return_value = admission.Limiter("speech", local=0, max_wait=0)
+        response = self.client.post(
+            self.url,
+            {"audio": self.audio(), "text": "Hello world."},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertFalse(Feedback.objects.exists())
+
+
+@patch("speech_processing.services.assessment.assess_pronunciation")
+class ResultCacheTests(AssessmentTestCase):
+    url = reverse("scripted-assessment")
+
+    def post(self, audio=b"RIFF-same-audio", **extra):
+        return self.client.post(
+            self.url,
+            {
+                "audio": SimpleUploadedFile("a.wav", audio, "audio/wav"),
+                "text": "Hello world.",
+            },
+            format="multipart",
+            **extra,
+        )
+
+    def test_identical_submission_is_served_from_cache(self, assess):
+        assess.return_value = make_assessment_result()
+        first = self.post()
+        second = self.post()
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        assess.assert_called_once()
+        self.assertEqual(Feedback.objects.count(), 1)
+
+        self.post(audio=b"RIFF-other-audio")
+        self.assertEqual(assess.call_count, 2)
+
+    def test_idempotency_key_replays_first_result(self, assess):
+        assess.return_value = make_assessment_result()
+        self.post(HTTP_IDEMPOTENCY_KEY="retry-1")
+        response = self.post(audio=b"RIFF-changed", HTTP_IDEMPOTENCY_KEY="retry-1")
+        self.assertEqual(response.status_code, 200)
+        assess.assert_called_once()
+
+    def test_other_user_gets_own_feedback(self, assess):
+        assess.return_value = make_assessment_result()
+        self.post()
+        other = User.objects.create_user(email="other@example.com", password="x")
+        other_profile = UserProfile.objects.create(
+            auth_user=other, default_settings={}, base_language="en"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.post()
+        self.assertEqual(response.status_code, 200)
+        assess.assert_called_once()
+        self.assertEqual(Feedback.objects.filter(user=other_profile).count(), 1)
+        self.assertEqual(Event.objects.filter(user=other_profile).count(), 1)
+
+    @override_settings(ASSESSMENT_CACHE_MAX_ENTRIES=1)
+    # no pruning along the way
+    @patch("speech_processing.services.result_cache.random.randrange", lambda n: 1)
+    def test_prune_keeps_most_recent_entries(self, assess):
+        assess.return_value = make_assessment_result()
+        self.post(audio=b"RIFF-1")
+        self.post(audio=b"RIFF-2")
+        self.assertEqual(AssessmentCacheEntry.objects.count(), 2)
+        self.assertEqual(result_cache.prune(), 1)
+        self.post(audio=b"RIFF-2")
+        self.assertEqual(assess.call_count, 2)
+
+
+async def _read_stream(response):
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+class AudioStoreTests(AssessmentTestCase):
+    url = reverse("scripted-assessment")
+
+    def setUp(self):
+        super().setUp()
+        self.content = b"RIFF" + bytes(range(256)) * 40
+        self.sha256 = hashlib.sha256(self.content).hexdigest()
+
+    def upload(self, client=None):
+        return (client or self.client).post(
+            self.url,
+            {
+                "audio": SimpleUploadedFile("a.wav", self.content, "audio/wav"),
+                "text": "Hello world.",
+            },
+            format="multipart",
+        )
+
+    @patch("speech_processing.services.assessment.assess_pronunciation")
+    def test_audio_is_stored_once_per_content(self, assess):
+        assess.return_value = make_assessment_result()
+        response = self.upload()
+        self.assertEqual(response.data["audio_sha256"], self.sha256)
+        other = User.objects.create_user(email="other@example.com", password="x")
+        UserProfile.objects.create(
+            auth_user=other, default_settings={}, base_language="es"
+        )
+        client = APIClient()
+        client.force_authenticate(user=other)
+        self.upload(client)
+
+        self.assertEqual(AudioUpload.objects.filter(sha256=self.sha256).count(), 2)
+        with open(audio_store.path_for(self.sha256), "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        stored = [
+            name
+            for _, _, names in os.walk(settings.ASSESSMENT_AUDIO_ROOT)
+            for name in names
+        ]
+        self.assertEqual(stored, [self.sha256])
+
+    @patch("speech_processing.services.assessment.assess_pronunciation")
+    def test_rescore_without_upload(self, assess):
+        assess.return_value = make_assessment_result()
+        self.upload()
+        assess.return_value = make_assessment_result("Hello there.", accuracy=70.0)
+        url = reverse("audio-assessment", args=[self.sha256])
+        response = self.client.post(
+            url, {"text": "Hello there.", "granularity": "Word"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["AccuracyScore"], 70.0)
+        audio_file, text, options = assess.call_args.args
+        self.assertEqual(text, "Hello there.")
+        self.assertEqual(options.granularity, "Word")
+        self.assertEqual(Feedback.objects.count(), 2)
+
+        # the same assessment again is served from the cache
+        self.client.post(
+            url, {"text": "Hello there.", "granularity": "Word"}, format="json"
+        )
+        self.assertEqual(assess.call_count, 2)
+
+    def test_other_users_audio_not_found(self):
+        audio_store.store(
+            UserProfile.objects.create(
+                auth_user=User.objects.create_user(
+                    email="other@example.com", password="x"
+                ),
+                default_settings={},
+                base_language="es",
+            ),
+            SimpleUploadedFile("a.wav", self.content),
+        )
+        for response in (
+            self.client.get(reverse("assessment-audio", args=[self.sha256])),
+            self.client.post(
+                reverse("audio-assessment", args=[self.sha256]),
+                {"text": "Hello world."},
+                format="json",
+            ),
+        ):
+            self.assertEqual(response.status_code, 404)
+
+    def test_range_requests(self):
+        audio_store.store(
+            self.user_profile, SimpleUploadedFile("a.wav", self.content, "audio/wav")
+        )
+        url = reverse("assessment-audio", args=[self.sha256])
+        size = len(self.content)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "audio/wav")
+        self.assertEqual(async_to_sync(_read_stream)(response), self.content)
+
+        for header, start, end in (
+            ("bytes=0-99", 0, 99),
+            ("bytes=100-", 100, size - 1),
+            ("bytes=-50", size - 50, size - 1),
+        ):
+            response = self.client.get(url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/{size}")
+            self.assertEqual(
+                async_to_sync(_read_stream)(response), self.content[start : end + 1]
+            )
+
+        response = self.client.get(url, HTTP_RANGE=f"bytes={size}-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], f"bytes */{size}")
+
+
+class MergeSegmentsTests(TestCase):
+    def test_single_segment_keeps_scores(self):
+        merged = merge_segments([make_json_result("Hello world.")], "Hello world.")
+        scores = merged["NBest"][0]["PronunciationAssessment"]
+        self.assertEqual(scores["AccuracyScore"], 90.0)
+        self.assertEqual(scores["FluencyScore"], 80.0)
+        self.assertEqual(scores["CompletenessScore"], 100.0)
+        self.assertEqual(len(merged["Segments"]), 1)
+
+    def test_segments_are_combined(self):
+        first = make_json_result("Hello world.", accuracy=100.0)
+        second = make_json_result("Good morning to you.", accuracy=50.0)
+        second["Offset"] = first["Offset"] + first["Duration"]
+        second["NBest"][0]["PronunciationAssessment"]["FluencyScore"] = 40.0
+
+        merged = merge_segments(
+            [first, second], "Hello world. Good morning to you. Goodbye."
+        )
+        best = merged["NBest"][0]
+        scores = best["PronunciationAssessment"]
+        self.assertEqual(merged["DisplayText"], "Hello world. Good morning to you.")
+        # the unspoken "Goodbye" is found by aligning to the reference text
+        self.assertEqual(len(best["Words"]), 7)
+        self.assertEqual(
+            best["Words"][-1]["PronunciationAssessment"]["ErrorType"], "Omission"
+        )
+        self.assertEqual(len(merged["Segments"]), 2)
+        # words are averaged, so the longer second segment counts more, and
+        # the omission scores 0
+        self.assertAlmostEqual(scores["AccuracyScore"], (2 * 100 + 4 * 50) / 7)
+        # fluency is weighted by duration: 2 and 4 words long
+        self.assertAlmostEqual(scores["FluencyScore"], (2 * 80 + 4 * 40) / 6)
+        self.assertAlmostEqual(scores["CompletenessScore"], 6 / 7 * 100)
+        self.assertEqual(
+            merged["Duration"],
+            second["Offset"] + second["Duration"] - first["Offset"],
+        )
+
+
+def make_wav(samples, rate=44100):
+    """16-bit WAV of float samples shaped (frames, channels)."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def make_speech_like(rate=44100):
+    """One second of silence, half a second of tone, one second of silence."""
+    silence = np.zeros(rate, dtype=np.float32)
+    t = np.arange(rate // 2) / rate
+    tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    mono = np.concatenate([silence, tone, silence])
+    return np.stack([mono, mono], axis=1)
+
+
+class AudioPreprocessingTests(TestCase):
+    def test_decode_wav(self):
+        samples, rate = audio.decode_wav(make_wav(make_speech_like()))
+        self.assertEqual(rate, 44100)
+        self.assertEqual(samples.shape, (110250, 2))
+        self.assertAlmostEqual(float(np.abs(samples).max()), 0.5, places=3)
+
+    def test_rejects_other_formats(self):
+        with self.assertRaises(audio.UnsupportedAudioError):
+            audio.decode_wav(b"\x1aE\xdf\xa3 webm data")
+
+    def test_rejects_malformed_headers(self):
+        wav = bytearray(make_wav(make_speech_like()))
+        # bits per sample
+        wav[34:36] = b"\0\0"
+        truncated = (
+            b"RIFF\x24\0\0\0WAVE"
+            + b"fmt \x08\0\0\0"
+            + struct.pack("<HHI", 1, 1, 16000)
+            + b"data\x04\0\0\0\0\0\0\0"
+        )
+        for data in (bytes(wav), truncated):
+            with self.assertRaises(audio.UnsupportedAudioError):
+                audio.decode_wav(data)
+            # and goes to Azure as is
+            self.assertIsNone(azure._preprocess(SimpleUploadedFile("audio.wav", data)))
+
+    def test_resample_to_16khz(self):
+        samples = audio.resample(np.zeros(44100, dtype=np.float32), 44100)
+        self.assertEqual(len(samples), 16000)
+
+    def test_preprocess_trims_silence(self):
+        pcm = audio.preprocess(make_wav(make_speech_like()))
+        seconds = len(pcm) / 2 / audio.TARGET_RATE
+        # the tone plus PADDING_MS on both sides, give or take a frame
+        self.assertAlmostEqual(seconds, 0.5 + 2 * audio.PADDING_MS / 1000, delta=0.05)
+
+    def test_silence_only_is_empty(self):
+        silence = np.zeros((44100, 1), dtype=np.float32)
+        self.assertEqual(audio.preprocess(make_wav(silence)), b"")
+
+    @override_settings(SPEECH_AUDIO_PREPROCESSING=True)
+    @patch("speech_processing.services.backends.azure.recognizers.acquire")
+    def test_silent_upload_skips_azure(self, acquire):
+        silence = np.zeros((44100, 1), dtype=np.float32)
+        with self.assertRaises(SpeechNotRecognizedError):
+            assess_pronunciation(
+                SimpleUploadedFile("audio.wav", make_wav(silence)), "Hello."
+            )
+        acquire.assert_not_called()
+
+    def test_preprocessing_is_part_of_the_cache_key(self):
+        backend = azure.AzureBackend()
+        with self.settings(SPEECH_AUDIO_PREPROCESSING=False):
+            raw = backend.settings_key
+        with self.settings(SPEECH_AUDIO_PREPROCESSING=True):
+            preprocessed = backend.settings_key
+        self.assertNotEqual(raw, preprocessed)
+
+
+class BatchAssessmentTests(AssessmentTestCase):
+    url = reverse("batch-assessment")
+
+    def post(self, texts, sentence_ids=None):
+        data = {"audio": [self.audio() for _ in texts], "text": texts}
+        if sentence_ids is not None:
+            data["sentence_id"] = sentence_ids
+        return self.client.post(self.url, data, format="multipart")
+
+    @patch("speech_processing.services.assessment.assess_admitted")
+    def test_clips_are_assessed_concurrently(self, assess):
+        def slow_assess(audio_file, reference_text, options):
+            time.sleep(0.3)
+            return make_assessment_result(reference_text)
+
+        assess.side_effect = slow_assess
+        started = time.monotonic()
+        response = self.post(
+            ["Hello world.", "Good morning.", "Goodbye."],
+            [self.sentence.sentence_id, "", ""],
+        )
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["status"] for r in response.data["results"]], [200] * 3)
+        self.assertEqual(
+            list(Feedback.objects.order_by("feedback_id").values_list("display_text")),
+            [("Hello world.",), ("Good morning.",), ("Goodbye.",)],
+        )
+        self.assertEqual(Event.objects.filter(user=self.user_profile).count(), 3)
+        self.sentence.refresh_from_db()
+        self.assertTrue(self.sentence.completion_status)
+
+    @patch("speech_processing.services.assessment.assess_admitted")
+    def test_results_per_clip(self, assess):
+        def assess_clip(audio_file, reference_text, options):
+            if reference_text == "Mumble.":
+                raise SpeechNotRecognizedError("No speech detected.")
+            return make_assessment_result(reference_text)
+
+        assess.side_effect = assess_clip
+        response = self.post(
+            ["Hello world.", "Mumble.", "Goodbye."], ["", "", "999999"]
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual([r["status"] for r in results], [200, 400, 404])
+        self.assertEqual(results[1]["error"], "No speech detected.")
+        self.assertEqual(Feedback.objects.get().feedback_id, results[0]["feedback_id"])
+        self.assertEqual(assess.call_count, 2)
+
+    @patch("speech_processing.services.assessment.assess_admitted")
+    def test_clips_share_the_speech_limits(self, assess):
+        limiter = admission.Limiter("speech", local=2, max_wait=0.5)
+        running = []
+        most_running = []
+
+        def slow_assess(audio_file, reference_text, options):
+            running.append(reference_text)
+            most_running.append(len(running))
+            time.sleep(0.05)
+            running.remove(reference_text)
+            return make_assessment_result(reference_text)
+
+        assess.side_effect = slow_assess
+        texts = [f"Clip {i}." for i in range(8)]
+        with patch(
+            "speech_processing.services.batch.admission.get_limiter",
+            return_value=limiter,
+        ):
+            response = self.post(texts)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([r["status"] for r in response.data["results"]], [200] * 8)
+            self.assertEqual(max(most_running), 2)
+            self.assertEqual((limiter.active, limiter.rejected), (0, 0))
+
+            # with every slot taken, the whole batch waits and then gets a 503
+            held = [limiter.acquire(), limiter.acquire()]
+            response = self.post(texts)
+            self.assertEqual(response.status_code, 503)
+            for ticket in held:
+                ticket.release()
+
+    def test_mismatched_parts(self):
+        response = self.client.post(
+            self.url,
+            {"audio": [self.audio(), self.audio()], "text": ["Hello world."]},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class PassageAssessmentTests(AssessmentTestCase):
+    url = reverse("passage-assessment")
+
+    def setUp(self):
+        super().setUp()
+        self.second = Sentence.objects.create(
+            passage=self.passage, text="Good morning to you.", completion_status=False
+        )
+        self.third = Sentence.objects.create(
+            passage=self.passage, text="Goodbye.", completion_status=False
+        )
+
+    def passage_result(self):
+        first = make_json_result("Hello world.", accuracy=100.0)
+        second = make_json_result("Good morning to you.", accuracy=50.0)
+        second["Offset"] = first["Offset"] + first["Duration"]
+        for word in second["NBest"][0]["Words"]:
+            word["Offset"] += second["Offset"]
+        # an inserted word doesn't belong to the reference text
+        first["NBest"][0]["Words"].append(
+            {
+                "Word": "um",
+                "Offset": 9000000,
+                "Duration": 100000,
+                "PronunciationAssessment": {
+                    "AccuracyScore": 0,
+                    "ErrorType": "Insertion",
+                },
+            }
+        )
+        omitted = {
+            "Word": "goodbye",
+            "Offset": 0,
+            "Duration": 0,
+            "PronunciationAssessment": {"AccuracyScore": 0, "ErrorType": "Omission"},
+        }
+        second["NBest"][0]["Words"].append(omitted)
+        return AssessmentResult(
+            result_id="0d4f3e6c8f1b4f0c9b2b5e0a1c2d3e4f",
+            json_result=merge_segments(
+                [first, second], "Hello world. Good morning to you. Goodbye."
+            ),
+        )
+
+    def test_split_by_sentence(self):
+        results = split_by_sentence(
+            self.passage_result().json_result,
+            ["Hello world.", "Good morning to you.", "Goodbye."],
+        )
+        self.assertEqual(
+            [[w["Word"] for w in r["NBest"][0]["Words"]] for r in results],
+            [
+                ["Hello", "world", "um"],
+                ["Good", "morning", "to", "you"],
+                ["goodbye"],
+            ],
+        )
+        first, second, third = (
+            r["NBest"][0]["PronunciationAssessment"] for r in results
+        )
+        self.assertEqual(first["AccuracyScore"], 100.0)
+        self.assertEqual(second["AccuracyScore"], 50.0)
+        self.assertEqual(second["FluencyScore"], 80.0)
+        self.assertEqual(third["CompletenessScore"], 0.0)
+
+    def test_miscues_keep_words_in_their_sentences(self):
+        # "world" skipped and "well" added: without aligning, every later word
+        # would shift into the wrong sentence
+        first = make_json_result("Hello well.")
+        second = make_json_result("Good morning to you.")
+        second["Offset"] = first["Offset"] + first["Duration"]
+        for word in second["NBest"][0]["Words"]:
+            word["Offset"] += second["Offset"]
+        merged = merge_segments([first, second], "Hello world. Good morning to you.")
+        results = split_by_sentence(merged, ["Hello world.", "Good morning to you."])
+        self.assertEqual(
+            [
+                [
+                    (w["Word"], w["PronunciationAssessment"]["ErrorType"])
+                    for w in r["NBest"][0]["Words"]
+                ]
+                for r in results
+            ],
+            [
+                [("Hello", "None"), ("well", "Insertion"), ("world", "Omission")],
+                [
+                    ("Good", "None"),
+                    ("morning", "None"),
+                    ("to", "None"),
+                    ("you", "None"),
+                ],
+            ],
+        )
+        first_scores, second_scores = (
+            r["NBest"][0]["PronunciationAssessment"] for r in results
+        )
+        self.assertEqual(first_scores["CompletenessScore"], 50.0)
+        self.assertEqual(first_scores["AccuracyScore"], 45.0)
+        self.assertEqual(second_scores["CompletenessScore"], 100.0)
+
+    @patch("speech_processing.services.assessment.assess_pronunciation")
+    def test_read_through_writes_feedback_per_sentence(self, assess):
+        assess.return_value = self.passage_result()
+        response = self.client.post(
+            self.url,
+            {"audio": self.audio(), "passage_id": self.passage.passage_id},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        assess.assert_called_once()
+        self.assertEqual(
+            assess.call_args.args[1], "Hello world. Good morning to you. Goodbye."
+        )
+        self.assertEqual(
+            [s["sentence_id"] for s in response.data["sentences"]],
+            [
+                self.sentence.sentence_id,
+                self.second.sentence_id,
+                self.third.sentence_id,
+            ],
+        )
+        self.assertEqual(Feedback.objects.count(), 3)
+        self.assertEqual(
+            dict(
+                Error.objects.values_list("feedback__sentence_id").annotate(
+                    Count("error_id")
+                )
+            ),
+            # one row per phoneme, plus one for the inserted and omitted words
+            {
+                self.sentence.sentence_id: 3,
+                self.second.sentence_id: 4,
+                self.third.sentence_id: 1,
+            },
+        )
+        self.assertEqual(
+            dict(Sentence.objects.values_list("sentence_id", "completion_status")),
+            {
+                self.sentence.sentence_id: True,
+                self.second.sentence_id: True,
+                self.third.sentence_id: False,
+            },
+        )
+
+    def test_other_users_passage_not_found(self):
+        other_passage = Passage.objects.create(
+            title="Other", language="en", difficulty="Custom"
+        )
+        response = self.client.post(
+            self.url,
+            {"audio": self.audio(), "passage_id": other_passage.passage_id},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class FeedbackStorageTests(AssessmentTestCase):
+    def test_feedback_keeps_slim_result_and_compressed_payload(self):
+        result = make_assessment_result()
+        save_feedback(self.user_profile, None, "Hello world.", result)
+        feedback = Feedback.objects.get()
+        # loaded with the row, reading it costs no query of its own
+        with self.assertNumQueries(0):
+            self.assertNotIn("Lexical", feedback.json_data["NBest"][0])
+        self.assertEqual(
+            feedback.json_data["NBest"][0]["Words"],
+            result.json_result["NBest"][0]["Words"],
+        )
+        self.assertEqual(feedback_payload(feedback), result.json_result)
+
+    def test_compacts_raw_json_strings(self):
+        json_result = make_json_result()
+        feedback = Feedback.objects.create(
+            azure_id="0d4f3e6c8f1b4f0c9b2b5e0a1c2d3e4f",
+            user=self.user_profile,
+            display_text="Hello world.",
+            accuracy_score=90.0,
+            fluency_score=80.0,
+            completeness_score=100.0,
+            pron_score=85.0,
+            json_data=json.dumps(json_result),
+        )
+        out = StringIO()
+        call_command("compact_feedback_json", stdout=out)
+        self.assertIn("Converted 1 feedbacks.", out.getvalue())
+        feedback.refresh_from_db()
+        self.assertEqual(feedback.json_data["DisplayText"], "Hello world.")
+        self.assertNotIn("Confidence", feedback.json_data["NBest"][0])
+        self.assertEqual(feedback_payload(feedback), json_result)
+
+        call_command("compact_feedback_json", stdout=out)
+        self.assertIn("Converted 0 feedbacks.", out.getvalue())
+
+
+class BackfillErrorsTests(AssessmentTestCase):
+    def test_backfills_feedback_without_errors(self):
+        for text in ("Hello world.", "Good morning to you."):
+            Feedback.objects.create(
+                azure_id="0d4f3e6c8f1b4f0c9b2b5e0a1c2d3e4f",
+                user=self.user_profile,
+                display_text=text,
+                accuracy_score=90.0,
+                fluency_score=80.0,
+                completeness_score=100.0,
+                pron_score=85.0,
+                json_data=json.dumps(make_json_result(text)),
+            )
+        out = StringIO()
+        call_command("backfill_errors", batch_size=1, stdout=out)
+        self.assertIn("Created 6 error rows for 2 feedbacks.", out.getvalue())
+        self.assertEqual(
+            Error.objects.filter(user=self.user_profile, phoneme="g").count(), 1
+        )
+
+        call_command("backfill_errors", stdout=out)
+        self.assertEqual(Error.objects.count(), 6)
+
+
+class AssessmentJobTests(AssessmentTestCase):
+    url = reverse("scripted-assessment")
+
+    @patch("speech_processing.services.assessment.assess_pronunciation")
+    def test_async_assessment_is_queued(self, assess):
+        response = self.client.post(
+            self.url,
+            {"audio": self.audio(), "text": "Hello world.", "async": "true"},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "PENDING")
+        assess.assert_not_called()
+        self.assertFalse(Feedback.objects.exists())
+
+        job_url = reverse("assessment-job", kwargs={"job_id": response.data["job_id"]})
+        self.assertEqual(self.client.get(job_url).data["status"], "PENDING")
+
+    @patch("speech_processing.services.assessment.assess_pronunciation")
+    def test_worker_runs_job(self, assess):
+        assess.return_value = make_assessment_result()
+        job = jobs.enqueue_assessment(
+            self.user_profile,
+            self.audio(),
+            "Hello world.",
+            self.sentence.sentence_id,
+        )
+
+        claimed = jobs.claim_next_job()
+        self.assertEqual(claimed.job_id, job.job_id)
+        self.assertEqual(claimed.status, AssessmentJob.Status.RUNNING)
+        self.assertIsNone(jobs.claim_next_job())
+        jobs.run_job(claimed)
+
+        response = self.client.get(
+            reverse("assessment-job", kwargs={"job_id": job.job_id})
+        )
+        self.assertEqual(response.data["status"], "DONE")
+        self.assertEqual(response.data["result"]["AccuracyScore"], 90.0)
+        self.sentence.refresh_from_db()
+        self.assertTrue(self.sentence.completion_status)
+        job.refresh_from_db()
+        self.assertEqual(bytes(job.audio), b"")
+
+    @patch("speech_processing.services.assessment.assess_pronunciation")
+    def test_failed_job_reports_error(self, assess):
+        assess.side_effect = Exception("Azure unavailable")
+        job = jobs.enqueue_assessment(self.user_profile, self.audio(), "Hello world.")
+        jobs.run_job(jobs.claim_next_job())
+
+        response = self.client.get(
+            reverse("assessment-job", kwargs={"job_id": job.job_id})
+        )
+        self.assertEqual(response.data["status"], "FAILED")
+        self.assertEqual(response.data["error"], "Azure unavailable")
+
+    def test_running_job_is_not_reclaimed_while_it_may_still_finish(self):
+        job = jobs.enqueue_assessment(self.user_profile, self.audio(), "Hello world.")
+        # waited for admission and then almost the whole recognition timeout
+        started = timezone.now() - datetime.timedelta(
+            seconds=settings.ADMISSION_MAX_WAIT + RECOGNITION_TIMEOUT
+        )
+        AssessmentJob.objects.filter(job_id=job.job_id).update(
+            status=AssessmentJob.Status.RUNNING, started_at=started, attempts=1
+        )
+        self.assertIsNone(jobs.claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual(job.status, AssessmentJob.Status.RUNNING)
+        self.assertEqual(job.attempts, 1)
+
+    def test_stale_job_fails_after_last_attempt(self):
+        job = jobs.enqueue_assessment(self.user_profile, self.audio(), "Hello world.")
+        stale = (
+            timezone.now() - jobs.stale_job_timeout() - datetime.timedelta(seconds=1)
+        )
+        AssessmentJob.objects.filter(job_id=job.job_id).update(
+            status=AssessmentJob.Status.RUNNING,
+            started_at=stale,
+            attempts=jobs.MAX_ATTEMPTS - 1,
+        )
+        # the worker died again, once more is allowed
+        self.assertEqual(jobs.claim_next_job().job_id, job.job_id)
+        AssessmentJob.objects.filter(job_id=job.job_id).update(started_at=stale)
+
+        self.assertIsNone(jobs.claim_next_job())
+        response = self.client.get(
+            reverse("assessment-job", kwargs={"job_id": job.job_id})
+        )
+        self.assertEqual(response.data["status"], "FAILED")
+        self.assertEqual(response.data["error"], "The assessment did not finish.")
+
+    def test_other_users_job_not_found(self):
+        other = User.objects.create_user(email="other@example.com", password="x")
+        other_profile = UserProfile.objects.create(
+            auth_user=other, default_settings={}, base_language="en"
+        )
+        job = jobs.enqueue_assessment(other_profile, self.audio(), "Hello world.")
+        response = self.client.get(
+            reverse("assessment-job", kwargs={"job_id": job.job_id})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class FakeLiveSession:
+    def __init__(self, on_recognizing, on_recognized):
+        self.on_recognizing = on_recognizing
+        self.on_recognized = on_recognized
+        self.canceled = False
+
+    def cancel(self):
+        self.canceled = True
+
+    def finish(self):
+        self.on_recognized(make_json_result())
+        return make_assessment_result()
+
+
+# The consumer does its database work on a thread of its own, with its own
+# connection, so test data has to be committed
+class LiveAssessmentConsumerTests(AssessmentTestMixin, APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        _, self.token = AuthToken.objects.create(self.user)
+        self.stream = MagicMock()
+
+    def start_live_assessment(
+        self, reference_text, on_recognizing, on_recognized, **kwargs
+    ):
+        on_recognizing("hello")
+        return self.stream, FakeLiveSession(on_recognizing, on_recognized)
+
+    def communicator(self, query):
+        return ApplicationCommunicator(
+            application,
+            {
+                "type": "websocket",
+                "path": "/ws/speech-processing/live-assessment/",
+                "query_string": urlencode(query).encode(),
+            },
+        )
+
+    @async_to_sync
+    async def run_session(self, query, frames):
+        communicator = self.communicator(query)
+        await communicator.send_input({"type": "websocket.connect"})
+        accepted = await communicator.receive_output()
+        if accepted["type"] != "websocket.accept":
+            return accepted, []
+        for frame in frames:
+            await communicator.send_input({"type": "websocket.receive", **frame})
+        messages = []
+        while (message := await communicator.receive_output())["type"] != (
+            "websocket.close"
+        ):
+            messages.append(json.loads(message["text"]))
+        return message, messages
+
+    def test_streams_interim_and_final_results(self):
+        with patch(
+            "speech_processing.consumers.assessment.start_live_assessment",
+            self.start_live_assessment,
+        ):
+            closed, messages = self.run_session(
+                {
+                    "token": self.token,
+                    "text": "Hello world.",
+                    "sentence_id": self.sentence.sentence_id,
+                },
+                [
+                    {"bytes": b"chunk-1"},
+                    {"bytes": b"chunk-2"},
+                    {"text": json.dumps({"type": "end"})},
+                ],
+            )
+        self.assertEqual(closed["code"], 1000)
+        self.assertEqual([m["type"] for m in messages], ["interim", "segment", "final"])
+        self.assertEqual(messages[-1]["AccuracyScore"], 90.0)
+        self.assertEqual(
+            [c.args[0] for c in self.stream.write.call_args_list],
+            [b"chunk-1", b"chunk-2"],
+        )
+        self.stream.close.assert_called_once()
+        self.assertEqual(Feedback.objects.get().sentence_id, self.sentence.sentence_id)
+
+    def test_rejects_invalid_token(self):
+        closed, _ = self.run_session({"token": "nope", "text": "Hello world."}, [])
+        self.assertEqual(closed["code"], 4401)
+
+    def test_rejects_sentences_not_the_users(self):
+        other_user = User.objects.create_user(
+            email="other@example.com", password="otherpass"
+        )
+        other_passage = Passage.objects.create(
+            user=UserProfile.objects.create(
+                auth_user=other_user, default_settings={}, base_language="es"
+            ),
+            title="Other Passage",
+            language="en",
+            difficulty="Custom",
+        )
+        other_sentence = Sentence.objects.create(
+            passage=other_passage, text="Hello world.", completion_status=False
+        )
+        with patch(
+            "speech_processing.consumers.assessment.start_live_assessment"
+        ) as start:
+            for sentence_id in [other_sentence.sentence_id, "abc", 999999]:
+                closed, _ = self.run_session(
+                    {
+                        "token": self.token,
+                        "text": "Hello world.",
+                        "sentence_id": sentence_id,
+                    },
+                    [],
+                )
+                self.assertEqual(closed["code"], 4404)
+        start.assert_not_called()
+        self.assertFalse(Feedback.objects.exists())
+
+    def test_rejects_text_frames_that_are_not_json_objects(self):
+        for frame in ["end", "[1]"]:
+            self.stream.reset_mock()
+            sessions = []
+
+            def start_live_assessment(*args, **kwargs):
+                stream, session = self.start_live_assessment(*args, **kwargs)
+                sessions.append(session)
+                return stream, session
+
+            with patch(
+                "speech_processing.consumers.assessment.start_live_assessment",
+                start_live_assessment,
+            ):
+                closed, messages = self.run_session(
+                    {"token": self.token, "text": "Hello world."},
+                    [{"bytes": b"chunk-1"}, {"text": frame}],
+                )
+            self.assertEqual(closed["code"], 4400)
+            self.assertEqual(messages[-1]["type"], "error")
+            self.stream.close.assert_called_once()
+            self.assertTrue(sessions[0].canceled)
+        self.assertFalse(Feedback.objects.exists())
+
+    def test_drops_idle_and_overlong_recordings(self):
+        sessions = []
+
+        def start_live_assessment(*args, **kwargs):
+            stream, session = self.start_live_assessment(*args, **kwargs)
+            sessions.append(session)
+            return stream, session
+
+        limiter = admission.get_limiter("speech")
+        failed = limiter.stats()["failed"]
+        with patch(
+            "speech_processing.consumers.assessment.start_live_assessment",
+            start_live_assessment,
+        ):
+            with self.settings(
+                LIVE_ASSESSMENT_IDLE_TIMEOUT=0.2, LIVE_ASSESSMENT_MAX_SECONDS=30
+            ):
+                idle = self.run_session(
+                    {"token": self.token, "text": "Hello world."},
+                    [{"bytes": b"chunk-1"}],
+                )
+            with self.settings(
+                LIVE_ASSESSMENT_IDLE_TIMEOUT=30, LIVE_ASSESSMENT_MAX_SECONDS=0.2
+            ):
+                overlong = self.run_session(
+                    {"token": self.token, "text": "Hello world."},
+                    [{"bytes": b"chunk-1"}],
+                )
+        for (closed, messages), error in [
+            (idle, "No audio for 0.2 seconds."),
+            (overlong, "Recording is longer than 0.2 seconds."),
+        ]:
+            self.assertEqual(closed["code"], 4408)
+            self.assertEqual(messages[-1], {"type": "error", "error": error})
+        self.assertTrue(all(session.canceled for session in sessions))
+        self.assertEqual(limiter.stats()["active"], 0)
+        self.assertEqual(limiter.stats()["failed"], failed)
+        self.assertFalse(Feedback.objects.exists())
+
+
+class StreamedBodyTests(AssessmentTestMixin, APITransactionTestCase):
+    """The streamed upload as served under ASGI, see pera_be/streaming.py."""
+
+    def setUp(self):
+        super().setUp()
+        _, self.token = AuthToken.objects.create(self.user)
+
+    @patch("speech_processing.uploadhandlers.assessment.open_stream")
+    def test_upload_is_assessed_while_arriving(self, open_stream):
+        stream = open_stream.return_value
+        stream.start.return_value.finish.return_value = make_assessment_result()
+        audio = b"RIFF" + bytes(range(256)) * 600
+        body = encode_multipart(
+            BOUNDARY, {"audio": SimpleUploadedFile("a.wav", audio, "audio/wav")}
+        )
+        first, rest = body[: len(body) // 2], body[len(body) // 2 :]
+
+        @async_to_sync
+        async def post():
+            communicator = ApplicationCommunicator(
+                application,
+                {
+                    "type": "http",
+                    "asgi": {"version": "3.0"},
+                    "http_version": "1.1",
+                    "method": "POST",
+                    "scheme": "http",
+                    "path": reverse("scripted-assessment"),
+                    "root_path": "",
+                    "query_string": urlencode(
+                        {"stream": "true", "text": "Hello world."}
+                    ).encode(),
+                    "headers": [
+                        (b"content-type", MULTIPART_CONTENT.encode()),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"authorization", f"Token {self.token}".encode()),
+                    ],
+                    "server": ("testserver", 80),
+                },
+            )
+            await communicator.send_input(
+                {"type": "http.request", "body": first, "more_body": True}
+            )
+            # the view has the first half of the audio before the rest is sent
+            for _ in range(500):
+                if stream.write.called:
+                    break
+                await asyncio.sleep(0.01)
+            written_early = sum(len(c.args[0]) for c in stream.write.call_args_list)
+            await communicator.send_input(
+                {"type": "http.request", "body": rest, "more_body": False}
+            )
+            start = await communicator.receive_output(timeout=10)
+            await communicator.receive_output(timeout=10)
+            # lets the handler finish, closing the view's connection
+            await communicator.send_input({"type": "http.disconnect"})
+            await communicator.wait(timeout=10)
+            return start["status"], written_early
+
+        status, written_early = post()
+        self.assertEqual(status, 200)
+        self.assertGreater(written_early, 0)
+        self.assertLess(written_early, len(audio))
+        self.assertEqual(
+            b"".join(c.args[0] for c in stream.write.call_args_list), audio
+        )
+        self.assertEqual(Feedback.objects.get().display_text, "Hello world.")
+
+
+class AudioDownloadTests(AssessmentTestMixin, APITransactionTestCase):
+    """Stored audio as served under ASGI."""
+
+    def test_ranges_are_sent_a_chunk_at_a_time(self):
+        _, token = AuthToken.objects.create(self.user)
+        content = b"RIFF" + bytes(range(256)) * 1024
+        sha256 = audio_store.store(
+            self.user_profile, SimpleUploadedFile("a.wav", content, "audio/wav")
+        )
+
+        @async_to_sync
+        async def get():
+            communicator = ApplicationCommunicator(
+                application,
+                {
+                    "type": "http",
+                    "asgi": {"version": "3.0"},
+                    "http_version": "1.1",
+                    "method": "GET",
+                    "scheme": "http",
+                    "path": reverse("assessment-audio", args=[sha256]),
+                    "root_path": "",
+                    "query_string": b"",
+                    "headers": [
+                        (b"range", b"bytes=100-"),
+                        (b"authorization", f"Token {token}".encode()),
+                    ],
+                    "server": ("testserver", 80),
+                },
+            )
+            await communicator.send_input({"type": "http.request", "body": b""})
+            start = await communicator.receive_output(timeout=10)
+            bodies = []
+            while True:
+                message = await communicator.receive_output(timeout=10)
+                bodies.append(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            await communicator.wait(timeout=10)
+            return start["status"], bodies
+
+        status, bodies = get()
+        self.assertEqual(status, 206)
+        self.assertEqual(b"".join(bodies), content[100:])
+        self.assertGreater(len(bodies), 2)
+        self.assertLessEqual(max(map(len, bodies)), 64 * 1024)
+
+
+class FakeWarmRecognizer:
+    def __init__(self, kind):
+        self.kind = kind
+        self.age = 0
+        self.closed = False
+
+    def preconnect(self):
+        pass
+
+    def is_healthy(self, max_age):
+        return self.age < max_age
+
+    def close(self):
+        self.closed = True
+
+
+@patch("speech_processing.services.recognizers.WarmRecognizer", FakeWarmRecognizer)
+@patch.object(recognizers.RecognizerPool, "refill")
+class RecognizerPoolTests(TestCase):
+    def test_hits_misses_and_evictions(self, refill):
+        pool = recognizers.RecognizerPool(recognizers.PUSH, size=2, max_age=60)
+
+        cold = pool.acquire()
+        self.assertIsInstance(cold, FakeWarmRecognizer)
+        self.assertEqual(pool.stats()["misses"], 1)
+        refill.assert_called_once()
+
+        pool._refresh()
+        self.assertEqual(pool.stats()["idle"], 2)
+        stale, fresh = pool._idle
+        stale.age = 120
+
+        self.assertIs(pool.acquire(), fresh)
+        self.assertTrue(stale.closed)
+        self.assertEqual(
+            pool.stats(), {"idle": 0, "hits": 1, "misses": 1, "evictions": 1}
+        )
+
+    def test_idle_recognizers_are_replaced_before_going_stale(self, refill):
+        pool = recognizers.RecognizerPool(recognizers.PUSH, size=2, max_age=60)
+        pool._refresh()
+        aging, fresh = pool._idle
+        # past max_age by the next round, 15 seconds from now
+        aging.age = 50
+        fresh.age = 30
+
+        pool._refresh()
+        self.assertTrue(aging.closed)
+        self.assertFalse(fresh.closed)
+        self.assertEqual(pool._idle[0], fresh)
+        self.assertEqual(pool.stats()["idle"], 2)
+        self.assertEqual(pool.stats()["evictions"], 1)
+
+    @patch("speech_processing.services.backends.azure._apply_pronunciation_config")
+    def test_used_recognizers_are_closed(self, apply_config, refill):
+        finished, canceled = MagicMock(), MagicMock()
+        with self.assertRaises(AssessmentTimeoutError):
+            azure.start_assessment(finished, "Hello.").finish(timeout=0)
+        azure.start_assessment(canceled, "Hello.").cancel()
+        for warm in (finished, canceled):
+            warm.recognizer.stop_continuous_recognition.assert_called_once()
+            warm.close.assert_called_once()
+
+    @override_settings(SPEECH_RECOGNIZER_POOL_SIZE=2)
+    def test_pool_counters_are_exposed(self, refill):
+        recognizers.acquire(recognizers.PULL)
+        admin = User.objects.create_superuser(email="admin@example.com", password="x")
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        response = client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        pools = response.data["speech_recognizer_pools"]
+        self.assertGreaterEqual(pools["pull"]["misses"], 1)
+
+        client.force_authenticate(user=User.objects.create_user(email="u@x.com"))
+        self.assertEqual(client.get(reverse("metrics")).status_code, 403)
@@ -0,0 +1,103 @@
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers
+
+from pera_be import admission
+from speech_processing.services import assessment, audio_store
+
+
+class AssessmentStreamUploadHandler(FileUploadHandler):
+    """
+    Forwards the "audio" part of a multipart upload into an assessment stream
+    while the request body is still arriving, instead of buffering the whole
+    file in memory or a temporary file first. Each chunk Django reads off the
+    socket is handed to the backend as is, so at most one chunk is held here.
+    Under ASGI, Django reads the whole body before the view runs, unless the
+    view streams it with pera_be.streaming, as PronunciationAssessmentView
+    does.
+
+    Recognition starts as soon as the reference text is known: right away if it
+    was passed to the constructor (e.g. from the query string), otherwise when
+    the view calls `finish` after the form is parsed, in which case the
+    backend buffers the audio received so far.
+
+    The audio is also written to the audio store, see `audio_sha256`. The
+    returned file has no content, so it can't be read again afterwards.
+    """
+
+    audio_field_name = "audio"
+
+    def __init__(self, request=None, reference_text=None, options=None):
+        super().__init__(request)
+        self.reference_text = reference_text
+        self.options = options
+        self.stream = None
+        self.ticket = None
+        self.session = None
+        self.audio = None
+        self._closed = False
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        if field_name != self.audio_field_name:
+            return
+        # counts against the speech limits from here until the assessment is
+        # done, raises admission.ServiceUnavailable if they're full
+        self.ticket = admission.get_limiter("speech").acquire()
+        self.stream = assessment.open_stream()
+        self.audio = audio_store.AudioWriter()
+        if self.reference_text:
+            self.start(self.reference_text)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.field_name == self.audio_field_name:
+            self.stream.write(raw_data)
+            self.audio.write(raw_data)
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.field_name != self.audio_field_name:
+            return None
+        self._close_stream()
+        self.audio.commit()
+        return UploadedFile(
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+
+    @property
+    def audio_sha256(self):
+        """SHA-256 of the stored audio, once the upload is complete."""
+        return self.audio.sha256 if self.audio else None
+
+    def start(self, reference_text):
+        if self.session is None:
+            self.reference_text = reference_text
+            self.session = self.stream.start(reference_text, options=self.options)
+
+    def finish(self, reference_text):
+        """Waits for the assessment of the uploaded audio and returns it."""
+        self.start(reference_text)
+        session, self.session = self.session, None
+        with self.ticket.guard(expected=(assessment.SpeechNotRecognizedError,)):
+            return session.finish()
+
+    def abort(self):
+        """Stops assessing, for when the request fails before `finish`."""
+        if self.stream is not None:
+            self._close_stream()
+        if self.audio is not None:
+            self.audio.discard()
+        if self.session is not None:
+            self.session.cancel()
+        if self.ticket is not None:
+            self.ticket.release()
+
+    def _close_stream(self):
+        if not self._closed:
+            self._closed = True
+            self.stream.close()
@@ -1,5 +1,12 @@
 from django.urls import path
-from .views import PronunciationAssessmentView
+from .views import (
+    PronunciationAssessmentView,
+    AssessmentJobView,
+    PassageAssessmentView,
+    BatchAssessmentView,
+    AudioView,
+    AudioAssessmentView,
+)
 
 urlpatterns = [
     path(
@@ -7,4 +14,25 @@ urlpatterns = [
         PronunciationAssessmentView.as_view(),
         name="scripted-assessment",
     ),
+    path(
+        "passage-assessment/",
+        PassageAssessmentView.as_view(),
+        name="passage-assessment",
+    ),
+    path(
+        "batch-assessment/",
+        BatchAssessmentView.as_view(),
+        name="batch-assessment",
+    ),
+    path("audio/<str:sha256>/", AudioView.as_view(), name="assessment-audio"),
+    path(
+        "audio/<str:sha256>/assessment/",
+        AudioAssessmentView.as_view(),
+        name="audio-assessment",
+    ),
+    path(
+        "assessment-jobs/<uuid:job_id>/",
+        AssessmentJobView.as_view(),
+        name="assessment-job",
+    ),
 ]
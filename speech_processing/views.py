@@ -1,48 +1,185 @@
-import azure.cognitiveservices.speech as speechsdk
+import asyncio
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.response import Response
 from .serializers import (
     PronunciationAssessmentResponseSerializer,
+    AssessmentJobResponseSerializer,
+    PassageAssessmentResponseSerializer,
+    BatchAssessmentResponseSerializer,
     ErrorResponseSerializer,
 )
-from drf_spectacular.utils import extend_schema
-from decouple import config
-from speech_processing.models import Feedback
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from speech_processing.models import AssessmentJob
+from speech_processing.services import (
+    assessment,
+    audio_store,
+    batch,
+    jobs,
+    result_cache,
+)
+from speech_processing.uploadhandlers import AssessmentStreamUploadHandler
 from accounts.decorators import require_authentication
-from accounts.models import Event
-from texts.models import Sentence
+from pera_be import admission
+from texts.models import Passage, Sentence
 
-SPEECH_KEY = config("SPEECH_KEY")
-SPEECH_REGION = config("SPEECH_REGION")
 
+def _is_true(value):
+    return str(value).lower() in ("1", "true", "yes")
 
-class RequestFileReaderCallback(speechsdk.audio.PullAudioInputStreamCallback):
-    def __init__(self, request_file, chunk_size=65536):
-        super().__init__()
-        self._chunks = request_file.chunks(chunk_size=chunk_size)
-        self._latest = []
-        self._latest_ind = 0
 
-    def read(self, buffer):
-        if self._latest_ind >= len(self._latest):
-            try:
-                self._latest = self._chunks.__next__()
-                self._latest_ind = 0
-            except StopIteration:
-                return 0
-            if len(self._latest) == 0:
-                return 0
-        sz = min(len(self._latest) - self._latest_ind, buffer.nbytes)
-        buffer[:sz] = self._latest[self._latest_ind : self._latest_ind + sz]
-        self._latest_ind += sz
-        return sz
+def _batch_error(error):
+    if isinstance(error, assessment.SpeechNotRecognizedError):
+        return {"status": 400, "error": str(error)}
+    if isinstance(error, admission.ServiceUnavailable):
+        return {"status": 503, "error": str(error), "retry_after": error.retry_after}
+    if isinstance(error, assessment.AssessmentTimeoutError):
+        return {"status": 504, "error": str(error)}
+    return {"status": 500, "error": str(error)}
+
+
+def _job_response_data(job, fields=assessment.DEFAULT_RESPONSE_FIELDS):
+    data = {"job_id": job.job_id, "status": job.status}
+    if job.status == AssessmentJob.Status.FAILED:
+        data["error"] = job.error
+    elif job.status == AssessmentJob.Status.DONE and job.feedback:
+        data["result"] = assessment.feedback_response_data(job.feedback, fields)
+    return data
+
+
+_OPTION_PROPERTIES = {
+    "granularity": {
+        "type": "string",
+        "enum": list(assessment.GRANULARITIES),
+        "description": "How detailed the assessment is, Phoneme by default. "
+        "Coarser is quicker and gives smaller results.",
+    },
+    "prosody": {
+        "type": "boolean",
+        "description": "Assess prosody, on by default.",
+    },
+}
+
+_FIELDS_PARAMETER = OpenApiParameter(
+    "fields",
+    str,
+    description="Comma-separated parts of the result to return: scores, "
+    "words (each word's score and error type), json (the whole JsonResult). "
+    "The scores are always returned. Defaults to scores,json.",
+)
+
+
+def _feedback_response(feedback, fields, audio_sha256=None):
+    data = assessment.feedback_response_data(feedback, fields)
+    if audio_sha256:
+        data["audio_sha256"] = audio_sha256
+    return Response(data, status=200)
+
+
+def _record(user_profile, feedback, sentence_id, cache_keys):
+    """Caches a new Feedback and completes its sentence."""
+    result_cache.put(cache_keys, feedback)
+    if sentence_id:
+        assessment.complete_sentence(user_profile, sentence_id)
+
+
+def _cached_feedback(user_profile, sentence_id, cache_keys):
+    """The user's own copy of the cached Feedback for cache_keys[-1], or None."""
+    cached = result_cache.get(cache_keys[-1])
+    if cached is None:
+        return None
+    with transaction.atomic():
+        feedback = result_cache.copy_for_user(cached, user_profile, sentence_id)
+        _record(user_profile, feedback, sentence_id, cache_keys)
+    return feedback
+
+
+def _save_feedback(user_profile, sentence_id, reference_text, result, cache_keys):
+    with transaction.atomic():
+        feedback = assessment.save_feedback(
+            user_profile, sentence_id, reference_text, result
+        )
+        _record(user_profile, feedback, sentence_id, cache_keys)
+    return feedback
+
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_FILE_CHUNK_SIZE = 64 * 1024
+
+
+async def _file_chunks(path, start, end):
+    """
+    Bytes `start` to `end` of the file at `path`, read in a worker thread a
+    chunk at a time. Asynchronous because under ASGI Django reads synchronous
+    streaming content to the end before sending any of it; this way only the
+    chunk being sent is in memory.
+    """
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        await asyncio.to_thread(f.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(_FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _ranged_file_response(path, content_type, range_header):
+    """
+    The file at `path`, or the single byte range asked for in `range_header`.
+    Anything but a single range gets the whole file.
+    """
+    size = os.path.getsize(path)
+    match = _RANGE_RE.match(range_header or "")
+    if not match or match.groups() == ("", ""):
+        status, start, end = 200, 0, size - 1
+    else:
+        first, last = match.groups()
+        if first:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+        else:
+            # a suffix range, the last N bytes
+            start, end = max(0, size - int(last)), size - 1
+        if start > end or start >= size:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        status = 206
+
+    response = StreamingHttpResponse(
+        _file_chunks(path, start, end), status=status, content_type=content_type
+    )
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    return response
 
 
 @require_authentication()
 class PronunciationAssessmentView(APIView):
     parser_classes = (MultiPartParser, FormParser)
 
+    @staticmethod
+    def wants_streamed_body(query_params):
+        """
+        Under ASGI, pera_be.streaming hands these requests their body as it
+        arrives instead of reading it all first.
+        """
+        return _is_true(query_params.get("stream", False))
+
     @extend_schema(
         request={
             "multipart/form-data": {
@@ -50,99 +187,497 @@ class PronunciationAssessmentView(APIView):
                 "properties": {
                     "audio": {"type": "string", "format": "binary"},
                     "text": {"type": "string"},
+                    "sentence_id": {"type": "integer"},
+                    **_OPTION_PROPERTIES,
+                    "async": {
+                        "type": "boolean",
+                        "description": "Queue the assessment and return a job "
+                        "to poll instead of waiting for the result.",
+                    },
                 },
                 "required": ["audio", "text"],
             }
         },
+        parameters=[
+            OpenApiParameter(
+                "stream",
+                bool,
+                description="Assess the audio while it is being uploaded. "
+                "Put `text` in the query string so recognition can start "
+                "before the upload finishes.",
+            ),
+            OpenApiParameter("text", str, description="Reference text, with stream."),
+            OpenApiParameter(
+                "granularity", str, description="As in the form, with stream."
+            ),
+            OpenApiParameter(
+                "prosody", bool, description="As in the form, with stream."
+            ),
+            _FIELDS_PARAMETER,
+            OpenApiParameter(
+                "Idempotency-Key",
+                str,
+                OpenApiParameter.HEADER,
+                description="Retries with the same key get the first result "
+                "back without another assessment.",
+            ),
+        ],
         responses={
             200: PronunciationAssessmentResponseSerializer,
+            202: AssessmentJobResponseSerializer,
             400: ErrorResponseSerializer,
             500: ErrorResponseSerializer,
+            503: ErrorResponseSerializer,
+            504: ErrorResponseSerializer,
         },
     )
     def post(self, request, *args, **kwargs):
+        streamed = self.wants_streamed_body(request.query_params)
+        try:
+            fields = assessment.response_fields(request.query_params.get("fields"))
+            # a streamed upload is assessed before the form is parsed, so its
+            # options come from the query string
+            options = (
+                assessment.AssessmentOptions.from_params(request.query_params)
+                if streamed
+                else None
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        upload_handler = None
+        if streamed:
+            # must be installed before anything reads the request body
+            upload_handler = AssessmentStreamUploadHandler(
+                request,
+                reference_text=request.query_params.get("text"),
+                options=options,
+            )
+            request.upload_handlers = [upload_handler]
         try:
+            user_profile = request.user.userprofile
+            # A retried submission is answered before its body is even read
+            idempotency_key = request.headers.get("Idempotency-Key")
+            cache_keys = []
+            if idempotency_key:
+                cache_keys.append(
+                    result_cache.idempotency_key(user_profile, idempotency_key)
+                )
+                feedback = result_cache.get(cache_keys[0])
+                if feedback is not None:
+                    return Response(
+                        assessment.feedback_response_data(feedback, fields), status=200
+                    )
+
             audio_file = request.FILES.get("audio")
-            reference_text = request.data.get("text", "")
-            sentence_id = request.data.get("sentence_id", None)
+            reference_text = request.data.get("text", "") or (
+                request.query_params.get("text", "") if upload_handler else ""
+            )
+            sentence_id = request.data.get("sentence_id", None) or None
 
             if not audio_file or not reference_text:
                 return Response(
                     {"error": "Audio file and reference text required."}, status=400
                 )
+            if not upload_handler:
+                try:
+                    options = assessment.AssessmentOptions.from_params(request.data)
+                except ValueError as e:
+                    return Response({"error": str(e)}, status=400)
+            # checked before paying for a recognition whose result can't be saved
+            if sentence_id and not assessment.owns_sentence(user_profile, sentence_id):
+                return Response({"error": "Sentence not found."}, status=404)
 
-            stream = speechsdk.audio.PullAudioInputStream(
-                stream_format=speechsdk.audio.AudioStreamFormat(
-                    compressed_stream_format=speechsdk.AudioStreamContainerFormat.ANY
-                ),
-                pull_stream_callback=RequestFileReaderCallback(audio_file),
-            )
+            audio_sha256 = None
+            if not upload_handler:
+                audio_sha256 = audio_store.store(user_profile, audio_file)
+                cache_keys.append(
+                    result_cache.content_key(
+                        audio_sha256, reference_text, assessment.settings_key(options)
+                    )
+                )
+                feedback = _cached_feedback(user_profile, sentence_id, cache_keys)
+                if feedback is not None:
+                    return _feedback_response(feedback, fields, audio_sha256)
+
+            if _is_true(request.data.get("async", False)):
+                if upload_handler:
+                    return Response(
+                        {"error": "Streamed uploads can't be assessed asynchronously."},
+                        status=400,
+                    )
+                job = jobs.enqueue_assessment(
+                    user_profile, audio_file, reference_text, sentence_id, options
+                )
+                return Response(_job_response_data(job), status=202)
 
-            speech_config = speechsdk.SpeechConfig(
-                subscription=SPEECH_KEY, region=SPEECH_REGION
+            try:
+                if upload_handler:
+                    result = upload_handler.finish(reference_text)
+                    audio_sha256 = upload_handler.audio_sha256
+                    audio_store.record(
+                        user_profile,
+                        audio_sha256,
+                        upload_handler.audio.size,
+                        audio_file.content_type,
+                    )
+                    cache_keys.append(
+                        result_cache.content_key(
+                            audio_sha256,
+                            reference_text,
+                            assessment.settings_key(options),
+                        )
+                    )
+                else:
+                    result = assessment.assess_pronunciation(
+                        audio_file, reference_text, options
+                    )
+            except assessment.SpeechNotRecognizedError as e:
+                return Response({"error": str(e)}, status=400)
+            except assessment.AssessmentTimeoutError as e:
+                return Response({"error": str(e)}, status=504)
+
+            feedback = _save_feedback(
+                user_profile, sentence_id, reference_text, result, cache_keys
             )
-            audio_config = speechsdk.audio.AudioConfig(stream=stream)
+            return _feedback_response(feedback, fields, audio_sha256)
+
+        except admission.ServiceUnavailable as e:
+            return admission.unavailable_response(e)
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
+        finally:
+            if upload_handler:
+                upload_handler.abort()
 
-            pronunciation_config = speechsdk.PronunciationAssessmentConfig(
-                reference_text=reference_text,
-                granularity=speechsdk.PronunciationAssessmentGranularity.Phoneme,
+
+@require_authentication()
+class AudioView(APIView):
+    """
+    Plays back stored assessment audio. Supports Range requests, so clients
+    can seek without downloading the whole recording.
+    """
+
+    @extend_schema(
+        responses={
+            (200, "application/octet-stream"): OpenApiTypes.BINARY,
+            (206, "application/octet-stream"): OpenApiTypes.BINARY,
+            404: ErrorResponseSerializer,
+            416: None,
+        },
+    )
+    def get(self, request, sha256):
+        upload = audio_store.get_upload(request.user.userprofile, sha256)
+        if upload is None:
+            return Response({"error": "Audio not found."}, status=404)
+        try:
+            return _ranged_file_response(
+                audio_store.path_for(sha256),
+                upload.content_type or "application/octet-stream",
+                request.headers.get("Range"),
             )
-            pronunciation_config.enable_prosody_assessment()
+        except FileNotFoundError:
+            return Response({"error": "Audio not found."}, status=404)
 
-            recognizer = speechsdk.SpeechRecognizer(
-                speech_config=speech_config, audio_config=audio_config
+
+@require_authentication()
+class AudioAssessmentView(APIView):
+    """
+    Assesses stored audio again, e.g. against an edited reference text or with
+    other options, without uploading it again.
+    """
+
+    @extend_schema(
+        request={
+            "application/json": {
+                "type": "object",
+                "properties": {
+                    "text": {"type": "string"},
+                    "sentence_id": {"type": "integer"},
+                    **_OPTION_PROPERTIES,
+                },
+                "required": ["text"],
+            }
+        },
+        parameters=[_FIELDS_PARAMETER],
+        responses={
+            200: PronunciationAssessmentResponseSerializer,
+            400: ErrorResponseSerializer,
+            404: ErrorResponseSerializer,
+            500: ErrorResponseSerializer,
+            503: ErrorResponseSerializer,
+            504: ErrorResponseSerializer,
+        },
+    )
+    def post(self, request, sha256):
+        user_profile = request.user.userprofile
+        reference_text = request.data.get("text", "")
+        sentence_id = request.data.get("sentence_id", None) or None
+        try:
+            fields = assessment.response_fields(request.query_params.get("fields"))
+            options = assessment.AssessmentOptions.from_params(request.data)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        if not reference_text:
+            return Response({"error": "Reference text required."}, status=400)
+        if audio_store.get_upload(user_profile, sha256) is None:
+            return Response({"error": "Audio not found."}, status=404)
+        if sentence_id and not assessment.owns_sentence(user_profile, sentence_id):
+            return Response({"error": "Sentence not found."}, status=404)
+
+        cache_keys = [
+            result_cache.content_key(
+                sha256, reference_text, assessment.settings_key(options)
             )
-            pronunciation_config.apply_to(recognizer)
-
-            # TODO: Change this to continuous recognition
-            result = recognizer.recognize_once()
-
-            # Cleanup
-            del recognizer
-
-            if result.reason == speechsdk.ResultReason.RecognizedSpeech:
-                assessment_result = speechsdk.PronunciationAssessmentResult(result)
-
-                feedback = Feedback.objects.create(
-                    azure_id=result.result_id,
-                    user=request.user.userprofile,
-                    sentence=sentence_id if sentence_id else None,
-                    display_text=reference_text,
-                    accuracy_score=assessment_result.accuracy_score,
-                    fluency_score=assessment_result.fluency_score,
-                    completeness_score=assessment_result.completeness_score,
-                    pron_score=assessment_result.pronunciation_score,
-                    json_data=result.properties.get(
-                        speechsdk.PropertyId.SpeechServiceResponse_JsonResult
-                    ),
-                )
+        ]
+        feedback = _cached_feedback(user_profile, sentence_id, cache_keys)
+        if feedback is not None:
+            return _feedback_response(feedback, fields, sha256)
 
-                # Record an event that the user completed a practice
-                Event.objects.create(
-                    user=request.user.userprofile,
-                    event_type="PRACTICE_PRON",
+        try:
+            with open(audio_store.path_for(sha256), "rb") as f:
+                result = assessment.assess_pronunciation(
+                    File(f), reference_text, options
                 )
+        except FileNotFoundError:
+            return Response({"error": "Audio not found."}, status=404)
+        except assessment.SpeechNotRecognizedError as e:
+            return Response({"error": str(e)}, status=400)
+        except assessment.AssessmentTimeoutError as e:
+            return Response({"error": str(e)}, status=504)
+        except admission.ServiceUnavailable as e:
+            return admission.unavailable_response(e)
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
 
-                # Mark the sentence as complete
-                if sentence_id:
-                    try:
-                        sentence = Sentence.objects.get(sentence_id=sentence_id)
-                        sentence.completion_status = True
-                        sentence.save()
-                    except Sentence.DoesNotExist:
-                        return Response({"error": "Sentence not found."}, status=404)
-
-                response_data = {
-                    "AccuracyScore": feedback.accuracy_score,
-                    "FluencyScore": feedback.fluency_score,
-                    "PronunciationScore": feedback.pron_score,
-                    "JsonResult": feedback.json_data,
-                }
-                return Response(response_data, status=200)
-            else:
-                return Response(
-                    {"error": "Speech not recognized or an error occurred."}, status=400
-                )
+        feedback = _save_feedback(
+            user_profile, sentence_id, reference_text, result, cache_keys
+        )
+        return _feedback_response(feedback, fields, sha256)
+
+
+@require_authentication()
+class AssessmentJobView(APIView):
+    @extend_schema(
+        parameters=[_FIELDS_PARAMETER],
+        responses={
+            200: AssessmentJobResponseSerializer,
+            400: ErrorResponseSerializer,
+            404: ErrorResponseSerializer,
+        },
+    )
+    def get(self, request, job_id):
+        try:
+            fields = assessment.response_fields(request.query_params.get("fields"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        try:
+            job = (
+                AssessmentJob.objects.select_related("feedback")
+                .defer("audio")
+                .get(job_id=job_id, user=request.user.userprofile)
+            )
+        except AssessmentJob.DoesNotExist:
+            return Response({"error": "Job not found."}, status=404)
+        return Response(_job_response_data(job, fields), status=200)
+
+
+@require_authentication()
+class PassageAssessmentView(APIView):
+    """
+    Assesses one recording of a whole passage read aloud, and splits the result
+    back into one Feedback per sentence.
+    """
+
+    parser_classes = (MultiPartParser, FormParser)
+
+    @extend_schema(
+        request={
+            "multipart/form-data": {
+                "type": "object",
+                "properties": {
+                    "audio": {"type": "string", "format": "binary"},
+                    "passage_id": {"type": "integer"},
+                },
+                "required": ["audio", "passage_id"],
+            }
+        },
+        responses={
+            200: PassageAssessmentResponseSerializer,
+            400: ErrorResponseSerializer,
+            404: ErrorResponseSerializer,
+            500: ErrorResponseSerializer,
+            503: ErrorResponseSerializer,
+            504: ErrorResponseSerializer,
+        },
+    )
+    def post(self, request, *args, **kwargs):
+        audio_file = request.FILES.get("audio")
+        passage_id = request.data.get("passage_id", None)
+        if not audio_file or not passage_id:
+            return Response(
+                {"error": "Audio file and passage id required."}, status=400
+            )
+
+        try:
+            passage = Passage.objects.get(
+                passage_id=passage_id, user=request.user.userprofile
+            )
+        except (Passage.DoesNotExist, ValueError):
+            return Response({"error": "Passage not found."}, status=404)
+        sentences = list(
+            Sentence.objects.filter(passage=passage)
+            .only("sentence_id", "text")
+            .order_by("sentence_id")
+        )
+        if not sentences:
+            return Response({"error": "Passage has no sentences."}, status=400)
 
+        try:
+            result = assessment.assess_pronunciation(
+                audio_file, " ".join(sentence.text for sentence in sentences)
+            )
+        except assessment.SpeechNotRecognizedError as e:
+            return Response({"error": str(e)}, status=400)
+        except assessment.AssessmentTimeoutError as e:
+            return Response({"error": str(e)}, status=504)
+        except admission.ServiceUnavailable as e:
+            return admission.unavailable_response(e)
         except Exception as e:
             return Response({"error": str(e)}, status=500)
+
+        feedbacks = assessment.save_passage_feedback(
+            request.user.userprofile, sentences, result
+        )
+        return Response(
+            {
+                "passage_id": passage.passage_id,
+                "AccuracyScore": result.accuracy_score,
+                "FluencyScore": result.fluency_score,
+                "CompletenessScore": result.completeness_score,
+                "PronunciationScore": result.pronunciation_score,
+                "sentences": [
+                    {
+                        "sentence_id": feedback.sentence_id,
+                        "feedback_id": feedback.feedback_id,
+                        "AccuracyScore": feedback.accuracy_score,
+                        "FluencyScore": feedback.fluency_score,
+                        "CompletenessScore": feedback.completeness_score,
+                        "PronunciationScore": feedback.pron_score,
+                    }
+                    for feedback in feedbacks
+                ],
+            },
+            status=200,
+        )
+
+
+@require_authentication()
+class BatchAssessmentView(APIView):
+    """
+    Several clips in one request, e.g. a drill's recordings. The clips are
+    assessed concurrently, so the request takes about as long as the slowest
+    one, and all results are stored in one transaction.
+    """
+
+    parser_classes = (MultiPartParser, FormParser)
+
+    @extend_schema(
+        request={
+            "multipart/form-data": {
+                "type": "object",
+                "properties": {
+                    "audio": {
+                        "type": "array",
+                        "items": {"type": "string", "format": "binary"},
+                    },
+                    "text": {"type": "array", "items": {"type": "string"}},
+                    "sentence_id": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "One per clip, empty for none, or left "
+                        "out altogether.",
+                    },
+                    **_OPTION_PROPERTIES,
+                },
+                "required": ["audio", "text"],
+            }
+        },
+        parameters=[_FIELDS_PARAMETER],
+        responses={
+            200: BatchAssessmentResponseSerializer,
+            400: ErrorResponseSerializer,
+            503: ErrorResponseSerializer,
+        },
+    )
+    def post(self, request, *args, **kwargs):
+        audio_files = request.FILES.getlist("audio")
+        texts = request.data.getlist("text")
+        sentence_ids = request.data.getlist("sentence_id") or [""] * len(texts)
+        if (
+            not audio_files
+            or not all(texts)
+            or not len(audio_files) == len(texts) == len(sentence_ids)
+        ):
+            return Response(
+                {"error": "Each clip needs an audio file and a reference text."},
+                status=400,
+            )
+        if len(audio_files) > settings.ASSESSMENT_BATCH_MAX_ITEMS:
+            return Response(
+                {
+                    "error": "At most "
+                    f"{settings.ASSESSMENT_BATCH_MAX_ITEMS} clips per request."
+                },
+                status=400,
+            )
+        try:
+            sentence_ids = [int(value) if value else None for value in sentence_ids]
+        except ValueError:
+            return Response({"error": "Invalid sentence id."}, status=400)
+        try:
+            options = assessment.AssessmentOptions.from_params(request.data)
+            fields = assessment.response_fields(request.query_params.get("fields"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        results = [None] * len(audio_files)
+        known = set(
+            Sentence.objects.filter(
+                sentence_id__in=sentence_ids, passage__user=request.user.userprofile
+            ).values_list("sentence_id", flat=True)
+        )
+        to_assess = []
+        for i, sentence_id in enumerate(sentence_ids):
+            if sentence_id is None or sentence_id in known:
+                to_assess.append(i)
+            else:
+                results[i] = {"status": 404, "error": "Sentence not found."}
+
+        try:
+            outcomes = batch.assess_all(
+                [(audio_files[i], texts[i]) for i in to_assess], options
+            )
+        except admission.ServiceUnavailable as e:
+            return admission.unavailable_response(e)
+        assessed = []
+        for i, outcome in zip(to_assess, outcomes):
+            if isinstance(outcome, Exception):
+                results[i] = _batch_error(outcome)
+            else:
+                assessed.append((i, outcome))
+
+        feedbacks = assessment.save_batch_feedback(
+            request.user.userprofile,
+            [(sentence_ids[i], texts[i], result) for i, result in assessed],
+        )
+        for (i, _), feedback in zip(assessed, feedbacks):
+            results[i] = {
+                "status": 200,
+                "feedback_id": feedback.feedback_id,
+                **assessment.feedback_response_data(feedback, fields),
+            }
+        return Response(
+            {"results": [{"index": i, **result} for i, result in enumerate(results)]},
+            status=200,
+        )
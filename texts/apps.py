@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class TextsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "texts"
+
+    def ready(self):
+        from texts.services import tokenizers
+
+        tokenizers.preload()
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from texts.models import Passage
+from texts.services import progress
+
+
+class Command(BaseCommand):
+    help = (
+        "Recounts every passage's sentences and fixes sentence_count and "
+        "completed_count where they drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        last_id = 0
+        checked = fixed = 0
+        while True:
+            # keyset pagination, so each batch is an index range scan
+            ids = list(
+                Passage.objects.filter(passage_id__gt=last_id)
+                .order_by("passage_id")
+                .values_list("passage_id", flat=True)[: options["batch_size"]]
+            )
+            if not ids:
+                break
+            fixed += progress.reconcile(
+                Passage.objects.filter(passage_id__gte=ids[0], passage_id__lte=ids[-1])
+            )
+            last_id = ids[-1]
+            checked += len(ids)
+        self.stdout.write(f"Checked {checked} passages, fixed {fixed}.")
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from texts.services import passage_pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates passages for every preset topic and difficulty whose pool "
+        "is running low."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Seconds between refills, to keep running; 0 refills once.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            added = passage_pool.refill()
+            self.stdout.write(f"Added {added} passages to the pool.")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
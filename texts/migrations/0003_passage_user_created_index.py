@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0002_rename_user_id_event_user"),
+        ("texts", "0002_rename_user_id_passage_user_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="passage",
+            index=models.Index(
+                fields=["user", "-created_at", "-passage_id"],
+                name="texts_passa_user_id_4fcfff_idx",
+            ),
+        ),
+    ]
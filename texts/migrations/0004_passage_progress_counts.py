@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-18 07:54
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_sentences(apps, schema_editor):
+    Passage = apps.get_model("texts", "Passage")
+    Sentence = apps.get_model("texts", "Sentence")
+
+    def count(**filters):
+        return Coalesce(
+            Subquery(
+                Sentence.objects.filter(passage=OuterRef("pk"), **filters)
+                .order_by()
+                .values("passage")
+                .annotate(count=Count("pk"))
+                .values("count")
+            ),
+            Value(0),
+        )
+
+    Passage.objects.update(
+        sentence_count=count(), completed_count=count(completion_status=True)
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("texts", "0003_passage_user_created_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="passage",
+            name="completed_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="passage",
+            name="sentence_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_sentences, migrations.RunPython.noop),
+    ]
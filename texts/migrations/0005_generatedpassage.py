@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("texts", "0004_passage_progress_counts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GeneratedPassage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cache_key", models.CharField(max_length=64)),
+                ("sentences", models.JSONField()),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("last_hit_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["cache_key", "last_hit_at"],
+                        name="texts_gener_cache_k_6150f8_idx",
+                    ),
+                    models.Index(
+                        fields=["created_at"], name="texts_gener_created_beaf61_idx"
+                    ),
+                    models.Index(
+                        fields=["last_hit_at"], name="texts_gener_last_hi_40b020_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("texts", "0005_generatedpassage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PooledPassage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("topic", models.CharField(max_length=255)),
+                ("difficulty", models.PositiveSmallIntegerField()),
+                ("prompt_version", models.CharField(max_length=16)),
+                ("sentences", models.JSONField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["topic", "difficulty", "prompt_version"],
+                        name="texts_poole_topic_52bbc6_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 08:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("texts", "0006_pooledpassage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sentence",
+            name="justification",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
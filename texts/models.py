@@ -12,6 +12,13 @@ class Passage(models.Model):
     title = models.CharField(max_length=255)
     difficulty = models.CharField(max_length=50)
     created_at = models.DateTimeField(null=True, auto_now=True)
+    # Kept up to date on write, see texts/services/progress.py
+    sentence_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # the order passages are listed in, see texts/pagination.py
+        indexes = [models.Index(fields=["user", "-created_at", "-passage_id"])]
 
     def __str__(self):
         return f"Passage #{self.passage_id}, by user {self.user_id}, with title '{self.title}'"
@@ -23,6 +30,56 @@ class Sentence(models.Model):
     text = models.TextField()
     completion_status = models.BooleanField(null=True)
     created_at = models.DateTimeField(null=True, auto_now=True)
+    # For generated passages, why the sentence is hard to pronounce, as
+    # Cohere explained it
+    justification = models.JSONField(default=list, blank=True)
 
     def __str__(self):
         return f"Sentence #{self.sentence_id}, from passage #{self.passage_id}, with text '{self.text}'"
+
+
+class GeneratedPassage(models.Model):
+    """
+    A passage Cohere generated for a (description, difficulty) request, kept
+    to be served again to later, similar requests.
+    See texts/services/passage_cache.py.
+    """
+
+    cache_key = models.CharField(max_length=64)
+    # [{"text": ..., "justification": [...]}, ...], as Cohere returned them
+    sentences = models.JSONField()
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_hit_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["cache_key", "last_hit_at"]),
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["last_hit_at"]),
+        ]
+
+    def __str__(self):
+        return f"Generated passage #{self.pk}, for cache key {self.cache_key}"
+
+
+class PooledPassage(models.Model):
+    """
+    A passage generated ahead of time for a preset topic and difficulty, and
+    handed out to the next request for them.
+    See texts/services/passage_pool.py.
+    """
+
+    # normalized, see passage_cache.normalize_description
+    topic = models.CharField(max_length=255)
+    difficulty = models.PositiveSmallIntegerField()
+    prompt_version = models.CharField(max_length=16)
+    # [{"text": ..., "justification": [...]}, ...], as Cohere returned them
+    sentences = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["topic", "difficulty", "prompt_version"])]
+
+    def __str__(self):
+        return f"Pooled passage #{self.pk}, on '{self.topic}' at difficulty {self.difficulty}"
@@ -0,0 +1,30 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class PassageCursorPagination(CursorPagination):
+    """
+    Keyset pagination of a user's passages, newest first, so every page costs
+    the same however deep into the library it is. The response body is the
+    page itself, as before passages were paginated; the neighbouring pages
+    are in the Link header.
+    """
+
+    ordering = ("-created_at", "-passage_id")
+    page_size = 20
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+    def get_paginated_response(self, data):
+        links = [
+            f'<{url}>; rel="{rel}"'
+            for rel, url in (
+                ("next", self.get_next_link()),
+                ("prev", self.get_previous_link()),
+            )
+            if url
+        ]
+        return Response(data, headers={"Link": ", ".join(links)} if links else None)
+
+    def get_paginated_response_schema(self, schema):
+        return schema
@@ -13,12 +13,24 @@ class ParseTextResponseSerializer(serializers.Serializer):
     sentences = serializers.ListField(child=serializers.CharField())
 
 
+class ParseDocumentRequestSerializer(serializers.Serializer):
+    file = serializers.FileField(help_text="A UTF-8 .txt or Markdown document.")
+    title = serializers.CharField(required=False, allow_blank=True)
+    language = serializers.CharField(required=False, allow_blank=True)
+
+
+class ParseDocumentResponseSerializer(serializers.Serializer):
+    passage_id = serializers.IntegerField()
+    sentence_count = serializers.IntegerField()
+
+
 class ErrorResponseSerializer(serializers.Serializer):
     error = serializers.CharField()
 
 
 class SentenceSerializer(serializers.ModelSerializer):
-    passage_id = serializers.IntegerField(source="passage.passage_id", read_only=True)
+    # the column itself, going through `passage` would load each Passage
+    passage_id = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Sentence
@@ -28,10 +40,16 @@ class SentenceSerializer(serializers.ModelSerializer):
             "text",
             "completion_status",
             "created_at",
+            "justification",
         )
 
 
 class PassageSerializer(serializers.ModelSerializer):
+    """
+    Leaves out the sentences if the context has "sentences": False, and the
+    progress counts if it has "counts": False.
+    """
+
     sentences = SentenceSerializer(many=True, read_only=True, source="sentence_set")
 
     class Meta:
@@ -43,9 +61,30 @@ class PassageSerializer(serializers.ModelSerializer):
             "difficulty",
             "created_at",
             "sentences",
+            "sentence_count",
+            "completed_count",
         )
 
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get("sentences", True):
+            del fields["sentences"]
+        if not self.context.get("counts", True):
+            del fields["sentence_count"], fields["completed_count"]
+        return fields
+
 
 class GenerateTextRequestSerializer(serializers.Serializer):
     description = serializers.CharField()
     difficulty = serializers.IntegerField(min_value=0, max_value=10)
+    save = serializers.BooleanField(
+        default=False,
+        help_text="Save the passage, with each sentence's justification, and "
+        "return it as parse-text/ would.",
+    )
+    title = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        max_length=255,
+        help_text="Title of the saved passage, the description by default.",
+    )
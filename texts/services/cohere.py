@@ -1,8 +1,17 @@
+import hashlib
 import json
+import os
+import random
+import threading
+import time
 from typing import Final
 
 import cohere as co
+import httpx
 from decouple import config
+from django.conf import settings
+
+from pera_be import admission
 
 GENERATE_PASSAGE_INSTRUCTION: Final[str] = (
     "Generate a JSON that contains an English passage between 2 and 5 sentences in "
@@ -42,13 +51,106 @@ EXAMPLE_GENERATED_PASSAGE: Final[str] = """
 """
 
 
+MODEL: Final[str] = "command-a-03-2025"
+
+# Changes whenever the prompt or model does, for caches of generated passages
+PROMPT_VERSION: Final[str] = hashlib.sha256(
+    "\0".join([MODEL, GENERATE_PASSAGE_INSTRUCTION, EXAMPLE_GENERATED_PASSAGE]).encode()
+).hexdigest()[:16]
+
+
 class CohereGenerationError(Exception):
     pass
 
 
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    One Cohere client per process, whose connections are kept alive and
+    reused across generations. A process forked from the one that built it
+    (gunicorn --preload) builds its own rather than share the parent's
+    sockets.
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client_pid != os.getpid():
+            http_client = httpx.Client(
+                timeout=httpx.Timeout(
+                    settings.COHERE_TIMEOUT, connect=settings.COHERE_CONNECT_TIMEOUT
+                ),
+                limits=httpx.Limits(
+                    max_connections=settings.COHERE_POOL_SIZE,
+                    max_keepalive_connections=settings.COHERE_POOL_SIZE,
+                    keepalive_expiry=settings.COHERE_KEEPALIVE,
+                ),
+            )
+            _client = co.ClientV2(
+                api_key=config("CO_API_KEY"),
+                timeout=settings.COHERE_TIMEOUT,
+                httpx_client=http_client,
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def _retryable(error):
+    if isinstance(error, httpx.TransportError):
+        # connection failures, resets and timeouts
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code == 429 or (status_code is not None and status_code >= 500)
+
+
+def _backoff(attempt):
+    # full jitter, so that workers which failed together don't retry together
+    time.sleep(
+        random.uniform(
+            0,
+            min(
+                settings.COHERE_RETRY_MAX_DELAY,
+                settings.COHERE_RETRY_BASE_DELAY * 2**attempt,
+            ),
+        )
+    )
+
+
+def _with_retries(call, **kwargs):
+    """
+    Calls `call(**kwargs)`, retrying transient failures up to
+    COHERE_MAX_RETRIES times with exponential backoff.
+    """
+    for attempt in range(settings.COHERE_MAX_RETRIES + 1):
+        try:
+            return call(**kwargs)
+        except Exception as e:
+            if attempt == settings.COHERE_MAX_RETRIES or not _retryable(e):
+                raise
+            _backoff(attempt)
+
+
 def generate_passage(description: str, difficulty: int) -> str:
-    client = co.ClientV2(api_key=config("CO_API_KEY"))
+    return join_sentences(generate_sentences(description, difficulty))
+
+
+def join_sentences(sentences: list[dict]) -> str:
+    return " ".join(sentence["text"].strip() for sentence in sentences)
 
+
+def generate_sentences(description: str, difficulty: int) -> list[dict]:
+    """
+    The generated passage as a list of {"text", "justification"} dicts.
+    Raises admission.ServiceUnavailable if too many generations are already
+    running or Cohere has been failing.
+    """
+    with admission.get_limiter("cohere").admit(expected=(CohereGenerationError,)):
+        return _generate_sentences(description, difficulty)
+
+
+def _chat_arguments(description: str, difficulty: int) -> dict:
     prompt = f"""
     ## Instructions
     {GENERATE_PASSAGE_INSTRUCTION}
@@ -60,8 +162,8 @@ def generate_passage(description: str, difficulty: int) -> str:
     {str(difficulty)}
     """
 
-    response = client.chat(
-        model="command-a-03-2025",
+    return dict(
+        model=MODEL,
         messages=[{"role": "user", "content": prompt}],
         response_format={
             "type": "json_object",
@@ -87,12 +189,107 @@ def generate_passage(description: str, difficulty: int) -> str:
             },
         },
         safety_mode="STRICT",
+        # retried by _with_retries, along with connection failures
+        request_options={"max_retries": 0},
+    )
+
+
+def _generate_sentences(description: str, difficulty: int) -> list[dict]:
+    response = _with_retries(
+        get_client().chat, **_chat_arguments(description, difficulty)
     )
 
     if response.finish_reason != "COMPLETE":
         raise CohereGenerationError("Failed to complete passage generation")
 
-    return " ".join(
-        sentence["text"].strip()
-        for sentence in json.loads(response.message.content[0].text)["content"]
-    )
+    return json.loads(response.message.content[0].text)["content"]
+
+
+class SentenceStreamParser:
+    """
+    Finds the sentences in the generated JSON as it streams in: each object
+    in the "content" array is returned by `feed` as soon as its closing brace
+    arrives.
+    """
+
+    # depth of the sentence objects, inside {"content": [...]}
+    SENTENCE_DEPTH: Final[int] = 3
+
+    def __init__(self):
+        self._buffer = ""
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._start = None
+
+    def feed(self, text: str) -> list[dict]:
+        self._buffer += text
+        sentences = []
+        for position in range(self._position, len(self._buffer)):
+            char = self._buffer[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if char == "{" and self._depth == self.SENTENCE_DEPTH:
+                    self._start = position
+            elif char in "}]":
+                if char == "}" and self._depth == self.SENTENCE_DEPTH:
+                    sentences.append(
+                        json.loads(self._buffer[self._start : position + 1])
+                    )
+                    self._start = None
+                self._depth -= 1
+        # keep only the sentence in progress
+        keep_from = len(self._buffer) if self._start is None else self._start
+        self._buffer = self._buffer[keep_from:]
+        self._start = None if self._start is None else 0
+        self._position = len(self._buffer)
+        return sentences
+
+
+def stream_sentences(description: str, difficulty: int):
+    """
+    Yields the sentences of a generated passage, as {"text", "justification"}
+    dicts, as soon as Cohere has finished each. Failures before the first
+    sentence are retried like generate_sentences'. Raises
+    admission.ServiceUnavailable as generate_sentences does, and
+    CohereGenerationError if the generation doesn't complete.
+    """
+    with admission.get_limiter("cohere").admit(expected=(CohereGenerationError,)):
+        for attempt in range(settings.COHERE_MAX_RETRIES + 1):
+            parser = SentenceStreamParser()
+            finish_reason = None
+            started = False
+            try:
+                for event in get_client().chat_stream(
+                    **_chat_arguments(description, difficulty)
+                ):
+                    if event.type == "content-delta":
+                        for sentence in parser.feed(
+                            event.delta.message.content.text or ""
+                        ):
+                            started = True
+                            yield sentence
+                    elif event.type == "message-end":
+                        finish_reason = event.delta.finish_reason
+                break
+            except Exception as e:
+                if (
+                    started
+                    or attempt == settings.COHERE_MAX_RETRIES
+                    or not _retryable(e)
+                ):
+                    raise
+                _backoff(attempt)
+
+        if finish_reason != "COMPLETE":
+            raise CohereGenerationError("Failed to complete passage generation")
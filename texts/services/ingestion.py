@@ -0,0 +1,129 @@
+"""
+Turning text into a Passage's Sentence rows. Sentences are inserted in
+batches of SENTENCE_BATCH_SIZE, and uploaded documents are read, tokenized
+and written paragraph by paragraph, so a long document never has to be held
+in memory whole.
+"""
+
+import re
+from itertools import islice
+
+from django.db import transaction
+
+from texts.models import Passage, Sentence
+from . import progress, tokenizers
+
+SENTENCE_BATCH_SIZE = 500
+
+# Markdown syntax that isn't part of the text read aloud
+_MARKDOWN_PREFIX_RE = re.compile(r"^\s*(?:#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+)")
+_MARKDOWN_INLINE_RE = re.compile(r"[*_`]+|!?\[([^\]]*)\]\([^)]*\)")
+_MARKDOWN_RULE_RE = re.compile(r"^\s*(?:[-*_]\s*){3,}$")
+
+
+class DocumentError(Exception):
+    pass
+
+
+def _sentence(passage, sentence):
+    if isinstance(sentence, str):
+        return Sentence(passage=passage, text=sentence, completion_status=False)
+    return Sentence(
+        passage=passage,
+        text=sentence["text"].strip(),
+        completion_status=False,
+        justification=sentence.get("justification", []),
+    )
+
+
+def insert_sentences(passage, sentences):
+    """
+    Inserts the sentences of an iterable as the passage's Sentences, one
+    INSERT per batch, and returns how many there were. Each is a text or, for
+    generated passages, a {"text", "justification"} dict. Reads only a batch
+    at a time from `sentences`, which may be a generator. Call it in a
+    transaction, so the passage's sentence_count stays in step.
+    """
+    sentences = iter(sentences)
+    count = 0
+    while batch := list(islice(sentences, SENTENCE_BATCH_SIZE)):
+        Sentence.objects.bulk_create(
+            [_sentence(passage, sentence) for sentence in batch]
+        )
+        count += len(batch)
+    progress.sentences_added(passage, count)
+    return count
+
+
+def _markdown_line(line):
+    if _MARKDOWN_RULE_RE.match(line):
+        return ""
+    line = _MARKDOWN_PREFIX_RE.sub("", line)
+    return _MARKDOWN_INLINE_RE.sub(lambda m: m.group(1) or "", line)
+
+
+def paragraphs(lines, markdown=False):
+    """
+    Joins an iterable of text lines into paragraphs, which are separated by
+    blank lines. Markdown code blocks are skipped and other markup stripped.
+    """
+    paragraph = []
+    in_code = False
+    for line in lines:
+        if markdown:
+            if line.lstrip().startswith("```"):
+                in_code = not in_code
+                continue
+            if in_code:
+                continue
+            line = _markdown_line(line)
+        line = line.strip()
+        if line:
+            paragraph.append(line)
+        elif paragraph:
+            yield " ".join(paragraph)
+            paragraph = []
+    if paragraph:
+        yield " ".join(paragraph)
+
+
+def document_lines(uploaded_file):
+    """Decoded lines of an uploaded UTF-8 file, read as they are needed."""
+    for line in uploaded_file:
+        try:
+            yield line.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise DocumentError("The document is not UTF-8 text.")
+
+
+def create_passage(user_profile, title, language, sentences, difficulty="Custom"):
+    """
+    Creates a Passage with the sentences of an iterable, as insert_sentences
+    takes them, all in one transaction. Returns the Passage and its number of sentences.
+    """
+    with transaction.atomic():
+        passage = Passage.objects.create(
+            user=user_profile, language=language, title=title, difficulty=difficulty
+        )
+        count = insert_sentences(passage, sentences)
+    return passage, count
+
+
+def ingest_document(user_profile, uploaded_file, title, language):
+    """
+    Creates a Passage from an uploaded .txt or Markdown document, tokenizing
+    it a paragraph at a time. Raises DocumentError if it isn't UTF-8 text or
+    has no sentences; nothing is stored then.
+    """
+    markdown = uploaded_file.name.lower().endswith((".md", ".markdown"))
+    tokenizer = tokenizers.get_tokenizer(language)
+    sentences = (
+        sentence
+        for paragraph in paragraphs(document_lines(uploaded_file), markdown)
+        for sentence in tokenizer.tokenize(paragraph)
+    )
+    with transaction.atomic():
+        passage, count = create_passage(user_profile, title, language, sentences)
+        if not count:
+            raise DocumentError("No sentences found.")
+    return passage, count
@@ -0,0 +1,112 @@
+"""
+A DB-backed cache in front of cohere.generate_sentences, shared by every
+worker and kept across restarts. It is keyed on the normalized description,
+the difficulty and cohere.PROMPT_VERSION, so a new prompt or model starts
+afresh. A key collects up to GENERATED_PASSAGE_VARIANTS passages, one Cohere
+call each; from then on they are served in turn, least recently served first,
+so users asking for the same thing don't all get the same passage.
+"""
+
+import datetime
+import hashlib
+import random
+import re
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from pera_be import admission, metrics
+from texts.models import GeneratedPassage
+from . import cohere
+
+# Roughly one write in this many also prunes expired and excess entries
+PRUNE_EVERY = 50
+
+_stats = {"hits": 0, "misses": 0}
+metrics.register("generated_passage_cache", lambda: dict(_stats))
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_description(description):
+    """Lower case, without punctuation and with single spaces."""
+    return " ".join(_PUNCTUATION_RE.sub(" ", description.lower()).split())
+
+
+def cache_key(description, difficulty):
+    return hashlib.sha256(
+        "\0".join(
+            [cohere.PROMPT_VERSION, normalize_description(description), str(difficulty)]
+        ).encode()
+    ).hexdigest()
+
+
+def _fresh(key):
+    return GeneratedPassage.objects.filter(
+        cache_key=key,
+        created_at__gte=timezone.now()
+        - datetime.timedelta(seconds=settings.GENERATED_PASSAGE_CACHE_TTL),
+    )
+
+
+def _serve(variant_id):
+    GeneratedPassage.objects.filter(pk=variant_id).update(
+        hits=F("hits") + 1, last_hit_at=timezone.now()
+    )
+
+
+def generate_sentences(description, difficulty):
+    """
+    Like cohere.generate_sentences, but served from the cache once the key
+    has all its variants. If Cohere is unavailable, any cached variant is
+    served instead.
+    """
+    max_variants = settings.GENERATED_PASSAGE_VARIANTS
+    if max_variants <= 0:
+        return cohere.generate_sentences(description, difficulty)
+
+    key = cache_key(description, difficulty)
+    variants = list(
+        _fresh(key)
+        .order_by("last_hit_at")
+        .values_list("pk", "sentences")[:max_variants]
+    )
+    if len(variants) < max_variants:
+        try:
+            sentences = cohere.generate_sentences(description, difficulty)
+        except admission.ServiceUnavailable:
+            if not variants:
+                raise
+        else:
+            _stats["misses"] += 1
+            GeneratedPassage.objects.create(cache_key=key, sentences=sentences)
+            if random.randrange(PRUNE_EVERY) == 0:
+                prune()
+            return sentences
+
+    _stats["hits"] += 1
+    variant_id, sentences = variants[0]
+    _serve(variant_id)
+    return sentences
+
+
+def prune():
+    """
+    Drops entries past the TTL, then the least recently served entries beyond
+    GENERATED_PASSAGE_CACHE_MAX_ENTRIES. Returns how many were deleted.
+    """
+    deleted, _ = GeneratedPassage.objects.filter(
+        created_at__lt=timezone.now()
+        - datetime.timedelta(seconds=settings.GENERATED_PASSAGE_CACHE_TTL)
+    ).delete()
+    max_entries = settings.GENERATED_PASSAGE_CACHE_MAX_ENTRIES
+    cutoff = list(
+        GeneratedPassage.objects.order_by("-last_hit_at").values_list(
+            "last_hit_at", flat=True
+        )[max_entries : max_entries + 1]
+    )
+    if cutoff:
+        excess, _ = GeneratedPassage.objects.filter(last_hit_at__lte=cutoff[0]).delete()
+        deleted += excess
+    return deleted
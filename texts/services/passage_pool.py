@@ -0,0 +1,115 @@
+"""
+A pool of passages generated ahead of time, for each of the
+PASSAGE_POOL_TOPICS at each difficulty, so a request for a preset topic is
+answered with a database read rather than a Cohere call. Each passage is
+handed out once. The refill_passage_pool command keeps every bucket above
+PASSAGE_POOL_LOW_WATER; requests for other descriptions, or for an empty
+bucket, go on to passage_cache.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from pera_be import admission, metrics
+from texts.models import PooledPassage
+from . import cohere
+from .passage_cache import normalize_description
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTIES = range(0, 11)
+
+_stats = {"hits": 0, "misses": 0}
+
+
+def topics():
+    return {normalize_description(topic) for topic in settings.PASSAGE_POOL_TOPICS}
+
+
+def _current():
+    return PooledPassage.objects.filter(prompt_version=cohere.PROMPT_VERSION)
+
+
+def depths():
+    """Passages in the pool per (topic, difficulty) bucket."""
+    return {
+        (topic, difficulty): count
+        for topic, difficulty, count in _current()
+        .values_list("topic", "difficulty")
+        .annotate(count=Count("pk"))
+        .values_list("topic", "difficulty", "count")
+    }
+
+
+metrics.register(
+    "passage_pool",
+    lambda: {
+        **_stats,
+        "depth": {
+            f"{topic}/{difficulty}": count
+            for (topic, difficulty), count in sorted(depths().items())
+        },
+    },
+)
+
+
+def take(description, difficulty):
+    """
+    Removes a pooled passage for the description's topic and difficulty and
+    returns its sentences, or None if it isn't a preset topic or the bucket is
+    empty.
+    """
+    topic = normalize_description(description)
+    if topic not in topics():
+        return None
+    with transaction.atomic():
+        # concurrent requests each take a different passage
+        passage = (
+            _current()
+            .select_for_update(skip_locked=True)
+            .filter(topic=topic, difficulty=difficulty)
+            .order_by("pk")
+            .first()
+        )
+        if passage is None:
+            _stats["misses"] += 1
+            return None
+        passage.delete()
+    _stats["hits"] += 1
+    return passage.sentences
+
+
+def refill():
+    """
+    Tops up every bucket below PASSAGE_POOL_LOW_WATER to
+    PASSAGE_POOL_HIGH_WATER, and drops passages of an older prompt. Stops
+    early if Cohere is unavailable. Returns how many passages were added.
+    """
+    PooledPassage.objects.exclude(prompt_version=cohere.PROMPT_VERSION).delete()
+    current = depths()
+    added = 0
+    for topic in sorted(topics()):
+        for difficulty in DIFFICULTIES:
+            depth = current.get((topic, difficulty), 0)
+            if depth >= settings.PASSAGE_POOL_LOW_WATER:
+                continue
+            for _ in range(settings.PASSAGE_POOL_HIGH_WATER - depth):
+                try:
+                    sentences = cohere.generate_sentences(topic, difficulty)
+                except admission.ServiceUnavailable:
+                    logger.warning("Cohere unavailable, pool refill stopped")
+                    return added
+                except cohere.CohereGenerationError:
+                    logger.warning("Generation for %s/%s failed", topic, difficulty)
+                    continue
+                PooledPassage.objects.create(
+                    topic=topic,
+                    difficulty=difficulty,
+                    prompt_version=cohere.PROMPT_VERSION,
+                    sentences=sentences,
+                )
+                added += 1
+    return added
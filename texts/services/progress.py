@@ -0,0 +1,84 @@
+"""
+Upkeep of Passage.sentence_count and Passage.completed_count, so a passage's
+progress can be shown without reading its sentences. Every write that adds
+sentences or completes one goes through here and adjusts the counters with
+F() expressions in the same transaction; `reconcile` recounts them from the
+sentences, for drift (see the reconcile_passage_counts command).
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from texts.models import Passage, Sentence
+
+
+def sentences_added(passage, count):
+    if count:
+        Passage.objects.filter(pk=passage.pk).update(
+            sentence_count=F("sentence_count") + count
+        )
+        passage.sentence_count += count
+
+
+def complete_sentences(user_profile, sentence_ids):
+    """
+    Marks the user's sentences complete, counting those that weren't in their
+    passages' completed_count. Returns how many were newly completed.
+    """
+    with transaction.atomic(savepoint=False):
+        # Locked, so a concurrent completion of the same sentence waits for
+        # this one and then finds it complete already
+        newly_completed = list(
+            Sentence.objects.select_for_update(of=("self",))
+            .filter(sentence_id__in=sentence_ids, passage__user=user_profile)
+            .exclude(completion_status=True)
+            .values_list("sentence_id", "passage_id")
+        )
+        if not newly_completed:
+            return 0
+        Sentence.objects.filter(
+            sentence_id__in=[sentence_id for sentence_id, _ in newly_completed]
+        ).update(completion_status=True)
+        per_passage = Counter(passage_id for _, passage_id in newly_completed)
+        for passage_id, count in per_passage.items():
+            Passage.objects.filter(pk=passage_id).update(
+                completed_count=F("completed_count") + count
+            )
+    return len(newly_completed)
+
+
+def _count(**filters):
+    return Coalesce(
+        Subquery(
+            Sentence.objects.filter(passage=OuterRef("pk"), **filters)
+            .order_by()
+            .values("passage")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+def reconcile(passages):
+    """
+    Recounts the sentences of the `passages` queryset and fixes the counters
+    that drifted. Returns how many passages were fixed.
+    """
+    drifted = (
+        passages.annotate(
+            actual_sentences=_count(),
+            actual_completed=_count(completion_status=True),
+        )
+        .filter(
+            ~Q(sentence_count=F("actual_sentences"))
+            | ~Q(completed_count=F("actual_completed"))
+        )
+        .values_list("pk", flat=True)
+    )
+    return Passage.objects.filter(pk__in=list(drifted)).update(
+        sentence_count=_count(), completed_count=_count(completion_status=True)
+    )
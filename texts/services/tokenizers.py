@@ -0,0 +1,96 @@
+"""
+Sentence tokenizers, one per language, built once per process and shared by
+every request and thread: tokenizing only reads the Punkt parameters.
+
+The pretrained parameters come from NLTK's punkt_tab data (see the
+Dockerfile). A language without them falls back to English, and if no data
+is installed at all, to an untrained Punkt tokenizer, which still splits on
+sentence punctuation but knows no abbreviations.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from nltk.tokenize.punkt import PunktSentenceTokenizer, PunktTokenizer
+
+logger = logging.getLogger(__name__)
+
+# ISO 639-1 codes, as clients send them, of the languages punkt_tab has
+PUNKT_LANGUAGES = {
+    "cs": "czech",
+    "da": "danish",
+    "de": "german",
+    "el": "greek",
+    "en": "english",
+    "es": "spanish",
+    "et": "estonian",
+    "fi": "finnish",
+    "fr": "french",
+    "it": "italian",
+    "ml": "malayalam",
+    "nb": "norwegian",
+    "nl": "dutch",
+    "no": "norwegian",
+    "pl": "polish",
+    "pt": "portuguese",
+    "ru": "russian",
+    "sl": "slovene",
+    "sv": "swedish",
+    "tr": "turkish",
+}
+DEFAULT_LANGUAGE = "en"
+
+_tokenizers = {}
+_lock = threading.Lock()
+
+
+def punkt_language(language):
+    """
+    The punkt_tab name of a language code like "en", "pt-BR" or "english",
+    or None if there is no pretrained model for it.
+    """
+    language = (language or "").strip().lower()
+    if language in PUNKT_LANGUAGES.values():
+        return language
+    return PUNKT_LANGUAGES.get(language.replace("_", "-").split("-")[0])
+
+
+def _load(name):
+    try:
+        return PunktTokenizer(name)
+    except LookupError:
+        return None
+
+
+def _build(name):
+    tokenizer = _load(name)
+    if tokenizer is None and name != PUNKT_LANGUAGES[DEFAULT_LANGUAGE]:
+        logger.warning("No Punkt data for %s, using English", name)
+        tokenizer = get_tokenizer(DEFAULT_LANGUAGE)
+    if tokenizer is None:
+        logger.warning("No Punkt data installed, using an untrained tokenizer")
+        tokenizer = PunktSentenceTokenizer()
+    return tokenizer
+
+
+def get_tokenizer(language):
+    """The shared sentence tokenizer for `language`, loaded on first use."""
+    name = punkt_language(language) or PUNKT_LANGUAGES[DEFAULT_LANGUAGE]
+    tokenizer = _tokenizers.get(name)
+    if tokenizer is None:
+        tokenizer = _build(name)
+        with _lock:
+            # a concurrent first use may have built one too, keep only one
+            tokenizer = _tokenizers.setdefault(name, tokenizer)
+    return tokenizer
+
+
+def preload():
+    """Loads the SENTENCE_TOKENIZER_PRELOAD languages, e.g. before forking."""
+    for language in settings.SENTENCE_TOKENIZER_PRELOAD:
+        get_tokenizer(language)
+
+
+def split_sentences(text, language=DEFAULT_LANGUAGE):
+    return get_tokenizer(language).tokenize(text)
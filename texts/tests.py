@@ -1,9 +1,31 @@
+import json
+from io import StringIO
+from types import SimpleNamespace
+from unittest import skipUnless
+
+import httpx
+from asgiref.sync import async_to_sync
+import nltk
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
-from texts.models import Passage, Sentence
-from unittest.mock import patch
+from pera_be import admission
+from texts.models import GeneratedPassage, Passage, PooledPassage, Sentence
+from unittest.mock import MagicMock, patch
 from django.contrib.auth import get_user_model
 from accounts.models import UserProfile
+from cohere.core.api_error import ApiError
+from texts.services import (
+    cohere,
+    passage_cache,
+    passage_pool,
+    progress,
+    tokenizers,
+)
 
 
 class ParseTextViewTests(APITestCase):
@@ -42,6 +64,16 @@ class ParseTextViewTests(APITestCase):
         self.assertEqual(sentences.first().text, "This is the first sentence.")
         self.assertEqual(sentences.last().text, "This is the second sentence.")
 
+    def test_sentences_are_inserted_in_one_statement(self):
+        text = " ".join(f"This is sentence number {i}." for i in range(50))
+        # savepoint, passage, sentences, sentence count, release
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                self.url, {"text": text, "language": "en"}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Sentence.objects.count(), 50)
+
     def test_invalid_input_missing_required_fields(self):
         data = {
             "title": "Test Passage",
@@ -64,7 +96,7 @@ class ParseTextViewTests(APITestCase):
             "language": "en",
         }
         with patch(
-            "texts.views.PunktSentenceTokenizer.tokenize",
+            "texts.services.tokenizers.PunktSentenceTokenizer.tokenize",
             side_effect=Exception("Test tokenization error"),
         ):
             response = self.client.post(self.url, data, format="json")
@@ -73,6 +105,105 @@ class ParseTextViewTests(APITestCase):
             self.assertIn("Test tokenization error", response.data["error"])
 
 
+class ParseDocumentViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="authed@example.com", password="testpass"
+        )
+        self.user_profile = UserProfile.objects.create(
+            auth_user=self.user, default_settings={}, base_language="en"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("parse-document")
+
+    def post(self, name, content, **data):
+        return self.client.post(
+            self.url,
+            {"file": SimpleUploadedFile(name, content), **data},
+            format="multipart",
+        )
+
+    def test_markdown_document(self):
+        content = (
+            "# A *short* story\n"
+            "\n"
+            "The cat sat on the mat. It was\n"
+            "a [sunny](https://example.com) day.\n"
+            "\n"
+            "```\n"
+            "print('not read aloud.')\n"
+            "```\n"
+            "- Then it slept.\n"
+        ).encode()
+        response = self.post("story.md", content, language="en")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["sentence_count"], 4)
+        passage = Passage.objects.get(passage_id=response.data["passage_id"])
+        self.assertEqual(passage.title, "story.md")
+        self.assertEqual(
+            list(
+                Sentence.objects.filter(passage=passage)
+                .order_by("sentence_id")
+                .values_list("text", flat=True)
+            ),
+            [
+                "A short story",
+                "The cat sat on the mat.",
+                "It was a sunny day.",
+                "Then it slept.",
+            ],
+        )
+
+    @patch("texts.services.ingestion.SENTENCE_BATCH_SIZE", 10)
+    def test_large_document_is_written_in_batches(self):
+        content = "\n\n".join(
+            f"Paragraph {i} starts here. It ends here." for i in range(25)
+        ).encode()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post("long.txt", content, title="Long")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["sentence_count"], 50)
+        self.assertEqual(Sentence.objects.count(), 50)
+        inserts = [
+            q for q in queries if q["sql"].startswith('INSERT INTO "texts_sentence"')
+        ]
+        self.assertEqual(len(inserts), 5)
+
+    def test_rejected_documents_store_nothing(self):
+        for name, content in (("empty.txt", b"\n\n  \n"), ("bin.txt", b"\xff\xfe\x00")):
+            response = self.post(name, content)
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Passage.objects.exists())
+
+
+def _punkt_installed():
+    try:
+        nltk.data.find("tokenizers/punkt_tab/english/")
+    except LookupError:
+        return False
+    return True
+
+
+class SentenceTokenizerTests(TestCase):
+    def test_tokenizers_are_shared(self):
+        english = tokenizers.get_tokenizer("en")
+        self.assertIs(tokenizers.get_tokenizer("en-US"), english)
+        self.assertIs(tokenizers.get_tokenizer("english"), english)
+        self.assertIs(tokenizers.get_tokenizer(""), english)
+
+    def test_unknown_language_falls_back_to_english(self):
+        self.assertIsNone(tokenizers.punkt_language("xx"))
+        self.assertIs(tokenizers.get_tokenizer("xx"), tokenizers.get_tokenizer("en"))
+        self.assertEqual(tokenizers.punkt_language("pt_BR"), "portuguese")
+
+    @skipUnless(_punkt_installed(), "NLTK punkt_tab data not installed")
+    def test_pretrained_model_knows_abbreviations(self):
+        self.assertEqual(
+            tokenizers.split_sentences("Dr. Smith arrived. He sat down."),
+            ["Dr. Smith arrived.", "He sat down."],
+        )
+
+
 User = get_user_model()
 
 
@@ -114,12 +245,124 @@ class GetUserPassagesViewTests(APITestCase):
         self.assertIn("Passage 1", titles)
         self.assertIn("Passage 2", titles)
 
+    def add_passages(self, count, sentences=3):
+        for i in range(count):
+            passage = Passage.objects.create(
+                user=self.user_profile,
+                title=f"P{i}",
+                language="en",
+                difficulty="1",
+                sentence_count=sentences,
+                completed_count=1,
+            )
+            Sentence.objects.bulk_create(
+                Sentence(passage=passage, text=f"S{j}.", completion_status=j == 0)
+                for j in range(sentences)
+            )
+
+    def test_query_count_does_not_grow_with_passages(self):
+        self.client.force_authenticate(user=self.user)
+        for count in (3, 30):
+            self.add_passages(count)
+            # the passages and their sentences, with counts
+            with self.assertNumQueries(2):
+                response = self.client.get(self.url, {"counts": "true", "limit": 50})
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 35)
+        counts = {
+            p["title"]: (p["sentence_count"], p["completed_count"])
+            for p in response.data
+        }
+        self.assertEqual(counts["P0"], (3, 1))
+        self.assertEqual(counts["Passage 1"], (0, 0))
+
+    def test_keyset_pages_follow_link_header(self):
+        self.client.force_authenticate(user=self.user)
+        self.add_passages(5, sentences=1)
+        response = self.client.get(self.url, {"limit": 3, "sentences": "false"})
+        seen = []
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(all("sentences" not in p for p in response.data))
+            seen.extend(p["passage_id"] for p in response.data)
+            next_links = [
+                link.split(";")[0].strip("<> ")
+                for link in response.headers.get("Link", "").split(",")
+                if 'rel="next"' in link
+            ]
+            if not next_links:
+                break
+            response = self.client.get(next_links[0])
+        expected = list(
+            Passage.objects.filter(user=self.user_profile)
+            .order_by("-created_at", "-passage_id")
+            .values_list("passage_id", flat=True)
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 7)
+
     def test_get_user_passages_unauthenticated(self):
         # Now that the view requires authentication, expect 401 instead of an empty list.
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 401)
 
 
+class PassageProgressTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="testemail@example.com", password="testpass"
+        )
+        self.user_profile = UserProfile.objects.create(
+            auth_user=self.user, default_settings={}, base_language="en"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_counts_follow_writes(self):
+        response = self.client.post(
+            reverse("parse-text"),
+            {"text": "One sentence. Two sentences. Three sentences."},
+            format="json",
+        )
+        passage = Passage.objects.get(passage_id=response.data["passage_id"])
+        self.assertEqual((passage.sentence_count, passage.completed_count), (3, 0))
+
+        first, second, _ = Sentence.objects.filter(passage=passage).order_by("pk")
+        self.assertEqual(
+            progress.complete_sentences(self.user_profile, [first.pk, second.pk]), 2
+        )
+        # completing a sentence again doesn't count it twice
+        self.assertEqual(progress.complete_sentences(self.user_profile, [first.pk]), 0)
+        passage.refresh_from_db()
+        self.assertEqual(passage.completed_count, 2)
+
+    def test_other_users_sentences_are_not_completed(self):
+        other = Passage.objects.create(title="Other", language="en", difficulty="1")
+        sentence = Sentence.objects.create(passage=other, text="Hi.")
+        self.assertEqual(
+            progress.complete_sentences(self.user_profile, [sentence.pk]), 0
+        )
+        sentence.refresh_from_db()
+        self.assertFalse(sentence.completion_status)
+
+    def test_reconcile_fixes_drift(self):
+        passage = Passage.objects.create(
+            user=self.user_profile,
+            title="Drifted",
+            language="en",
+            difficulty="1",
+            sentence_count=7,
+            completed_count=5,
+        )
+        Sentence.objects.create(passage=passage, text="A.", completion_status=True)
+        Sentence.objects.create(passage=passage, text="B.", completion_status=False)
+        Passage.objects.create(title="Empty", language="en", difficulty="1")
+        out = StringIO()
+        call_command("reconcile_passage_counts", "--batch-size", "1", stdout=out)
+        self.assertIn("Checked 2 passages, fixed 1.", out.getvalue())
+        passage.refresh_from_db()
+        self.assertEqual((passage.sentence_count, passage.completed_count), (2, 1))
+
+
 class GetPassageSentencesViewTests(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -190,3 +433,363 @@ class GetPassageSentencesViewTests(APITestCase):
         self.assertEqual(response.status_code, 404)
         self.assertIn("error", response.data)
         self.assertEqual(response.data["error"], "Passage not found.")
+
+
+def _chat_response(*sentences):
+    content = json.dumps(
+        {"content": [{"text": text, "justification": []} for text in sentences]}
+    )
+    return SimpleNamespace(
+        finish_reason="COMPLETE",
+        message=SimpleNamespace(content=[SimpleNamespace(text=content)]),
+    )
+
+
+@patch("texts.services.cohere.config", lambda name: "test-key")
+class CohereClientTests(TestCase):
+    def setUp(self):
+        cohere._client_pid = None
+        self.addCleanup(setattr, cohere, "_client_pid", None)
+
+    def test_client_is_reused_until_fork(self):
+        with patch("texts.services.cohere.co.ClientV2") as client_class:
+            first = cohere.get_client()
+            self.assertIs(cohere.get_client(), first)
+            self.assertEqual(client_class.call_count, 1)
+            self.assertIsInstance(
+                client_class.call_args.kwargs["httpx_client"], httpx.Client
+            )
+
+            with patch("texts.services.cohere.os.getpid", return_value=-1):
+                cohere.get_client()
+            self.assertEqual(client_class.call_count, 2)
+
+    @patch("texts.services.cohere.time.sleep")
+    def test_transient_failures_are_retried(self, sleep):
+        client = MagicMock()
+        client.chat.side_effect = [
+            httpx.ConnectError("refused"),
+            ApiError(status_code=503),
+            _chat_response("One. ", "Two."),
+        ]
+        with patch("texts.services.cohere.get_client", return_value=client):
+            self.assertEqual(cohere.generate_passage("a storm", 3), "One. Two.")
+        self.assertEqual(client.chat.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+
+    @patch("texts.services.cohere.time.sleep")
+    def test_client_errors_are_not_retried(self, sleep):
+        client = MagicMock()
+        client.chat.side_effect = ApiError(status_code=400)
+        with patch("texts.services.cohere.get_client", return_value=client):
+            with self.assertRaises(ApiError):
+                cohere.generate_passage("a storm", 3)
+        self.assertEqual(client.chat.call_count, 1)
+        sleep.assert_not_called()
+
+
+def _generated(*texts):
+    return [{"text": text, "justification": []} for text in texts]
+
+
+@override_settings(GENERATED_PASSAGE_VARIANTS=2)
+class PassageCacheTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="cache@example.com", password="testpass"
+        )
+        UserProfile.objects.create(
+            auth_user=self.user, default_settings={}, base_language="en"
+        )
+        self.client.force_authenticate(user=self.user)
+        patcher = patch(
+            "texts.services.passage_cache.cohere.generate_sentences",
+            side_effect=[_generated("First."), _generated("Second.")],
+        )
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+        # no pruning but where a test asks for it
+        patcher = patch("texts.services.passage_cache.random.randrange", lambda n: 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_similar_descriptions_share_a_key(self):
+        self.assertEqual(
+            passage_cache.cache_key("Ordering coffee!", 3),
+            passage_cache.cache_key("  ordering   COFFEE ", 3),
+        )
+        self.assertNotEqual(
+            passage_cache.cache_key("ordering coffee", 3),
+            passage_cache.cache_key("ordering coffee", 4),
+        )
+
+    def test_variants_are_served_in_turn(self):
+        url = reverse("generate_passage")
+        texts = [
+            self.client.post(
+                url, {"description": description, "difficulty": 3}, format="json"
+            ).data
+            for description in [
+                "ordering coffee",
+                "Ordering coffee.",
+                "ordering coffee",
+            ]
+            * 2
+        ]
+        self.assertEqual(texts, ["First.", "Second."] * 3)
+        self.assertEqual(self.generate.call_count, 2)
+        self.assertEqual(
+            sorted(GeneratedPassage.objects.values_list("hits", flat=True)), [2, 2]
+        )
+
+    def test_cached_variant_served_when_cohere_unavailable(self):
+        self.generate.side_effect = [
+            _generated("First."),
+            admission.ServiceUnavailable("busy", 1),
+            admission.ServiceUnavailable("busy", 1),
+        ]
+        self.assertEqual(
+            passage_cache.generate_sentences("a storm", 5), _generated("First.")
+        )
+        self.assertEqual(
+            passage_cache.generate_sentences("a storm", 5), _generated("First.")
+        )
+        with self.assertRaises(admission.ServiceUnavailable):
+            passage_cache.generate_sentences("a calm sea", 5)
+
+    @override_settings(GENERATED_PASSAGE_CACHE_MAX_ENTRIES=1)
+    def test_prune_keeps_most_recently_served(self):
+        passage_cache.generate_sentences("a storm", 5)
+        passage_cache.generate_sentences("a calm sea", 5)
+        self.assertEqual(passage_cache.prune(), 1)
+        self.assertEqual(
+            GeneratedPassage.objects.get().sentences, _generated("Second.")
+        )
+
+
+@override_settings(
+    PASSAGE_POOL_TOPICS=["Ordering coffee"],
+    PASSAGE_POOL_LOW_WATER=1,
+    PASSAGE_POOL_HIGH_WATER=2,
+)
+class PassagePoolTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="pool@example.com", password="testpass"
+        )
+        UserProfile.objects.create(
+            auth_user=self.user, default_settings={}, base_language="en"
+        )
+        self.client.force_authenticate(user=self.user)
+        patcher = patch(
+            "texts.services.passage_pool.cohere.generate_sentences",
+            side_effect=lambda topic, difficulty: _generated(
+                f"Pooled {topic} {difficulty}."
+            ),
+        )
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_refill_tops_up_low_buckets(self):
+        PooledPassage.objects.create(
+            topic="ordering coffee", difficulty=3, prompt_version="old", sentences=[]
+        )
+        self.assertEqual(passage_pool.refill(), 22)
+        self.assertFalse(PooledPassage.objects.filter(prompt_version="old").exists())
+        self.assertEqual(passage_pool.depths()[("ordering coffee", 3)], 2)
+
+        passage_pool.take("ordering coffee", 3)
+        self.assertEqual(passage_pool.refill(), 0)
+        passage_pool.take("ordering coffee", 3)
+        self.assertEqual(passage_pool.refill(), 2)
+
+    def test_refill_command(self):
+        out = StringIO()
+        call_command("refill_passage_pool", stdout=out)
+        self.assertEqual(out.getvalue().strip(), "Added 22 passages to the pool.")
+
+    @patch("texts.services.passage_cache.generate_sentences")
+    def test_preset_topics_served_from_pool(self, cache_generate):
+        cache_generate.return_value = _generated("Live.")
+        passage_pool.refill()
+        url = reverse("generate_passage")
+
+        texts = [
+            self.client.post(
+                url, {"description": "Ordering coffee!", "difficulty": 7}, format="json"
+            ).data
+            for _ in range(3)
+        ]
+        self.assertEqual(
+            texts, ["Pooled ordering coffee 7.", "Pooled ordering coffee 7.", "Live."]
+        )
+        self.assertEqual(cache_generate.call_count, 1)
+        self.assertEqual(passage_pool.depths().get(("ordering coffee", 7)), None)
+
+        response = self.client.post(
+            url, {"description": "a storm", "difficulty": 7}, format="json"
+        )
+        self.assertEqual(response.data, "Live.")
+
+
+def _stream_events(text, finish_reason="COMPLETE", size=7):
+    for start in range(0, len(text), size):
+        yield SimpleNamespace(
+            type="content-delta",
+            delta=SimpleNamespace(
+                message=SimpleNamespace(
+                    content=SimpleNamespace(text=text[start : start + size])
+                )
+            ),
+        )
+    yield SimpleNamespace(
+        type="message-end", delta=SimpleNamespace(finish_reason=finish_reason)
+    )
+
+
+async def _read_stream(response):
+    return b"".join([chunk async for chunk in response.streaming_content])
+
+
+class PassageStreamTests(APITestCase):
+    SENTENCES = [
+        {"text": 'She said "hi {there}".', "justification": ["Quote: \\"]},
+        {"text": "Rain starts.", "justification": ["R sound: 'rain'"]},
+    ]
+
+    def test_parser_returns_each_sentence_once_complete(self):
+        text = json.dumps({"content": self.SENTENCES}, indent=2)
+        parser = cohere.SentenceStreamParser()
+        found = []
+        for char in text:
+            sentences = parser.feed(char)
+            if sentences:
+                found.append((sentences, len(found)))
+        self.assertEqual(found, [([self.SENTENCES[0]], 0), ([self.SENTENCES[1]], 1)])
+
+    @patch("texts.services.cohere.config", lambda name: "test-key")
+    def test_stream_sentences(self):
+        client = MagicMock()
+        client.chat_stream.side_effect = [
+            httpx.ConnectError("refused"),
+            _stream_events(json.dumps({"content": self.SENTENCES})),
+        ]
+        with (
+            patch("texts.services.cohere.get_client", return_value=client),
+            patch("texts.services.cohere.time.sleep"),
+        ):
+            self.assertEqual(list(cohere.stream_sentences("rain", 2)), self.SENTENCES)
+
+            client.chat_stream.side_effect = [
+                _stream_events('{"content": [{"text": "Cut', "MAX_TOKENS")
+            ]
+            with self.assertRaises(cohere.CohereGenerationError):
+                list(cohere.stream_sentences("rain", 2))
+
+    @patch("texts.services.cohere.config", lambda name: "test-key")
+    def test_closed_stream_is_not_a_cohere_failure(self):
+        breaker = admission.CircuitBreaker(
+            "cohere", failure_ratio=0.5, min_calls=1, window=10, cooldown=60
+        )
+        limiter = admission.Limiter("cohere", local=1, breaker=breaker)
+        client = MagicMock()
+        client.chat_stream.side_effect = lambda **kwargs: _stream_events(
+            json.dumps({"content": self.SENTENCES})
+        )
+        with (
+            patch("texts.services.cohere.admission.get_limiter", return_value=limiter),
+            patch("texts.services.cohere.get_client", return_value=client),
+        ):
+            for _ in range(3):
+                # a client disconnecting after the first sentence
+                stream = cohere.stream_sentences("rain", 2)
+                self.assertEqual(next(stream), self.SENTENCES[0])
+                stream.close()
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        self.assertEqual((limiter.active, limiter.failed), (0, 0))
+        limiter.acquire().release()
+
+    def test_view_streams_sentence_events(self):
+        user = User.objects.create_user(email="sse@example.com", password="testpass")
+        UserProfile.objects.create(
+            auth_user=user, default_settings={}, base_language="en"
+        )
+        self.client.force_authenticate(user=user)
+        url = reverse("generate_passage_stream")
+
+        def sentences_then_failure(description, difficulty):
+            yield self.SENTENCES[0]
+            raise cohere.CohereGenerationError()
+
+        for stream, last_event in [
+            (lambda description, difficulty: iter(self.SENTENCES), "done"),
+            (sentences_then_failure, "error"),
+        ]:
+            with patch("texts.services.cohere.stream_sentences", stream):
+                response = self.client.post(
+                    url, {"description": "rain", "difficulty": 2}, format="json"
+                )
+                body = async_to_sync(_read_stream)(response).decode()
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            events = [
+                (
+                    event.split("\n")[0].removeprefix("event: "),
+                    json.loads(event.split("\n")[1].removeprefix("data: ")),
+                )
+                for event in body.strip().split("\n\n")
+            ]
+            self.assertEqual(events[0], ("sentence", self.SENTENCES[0]))
+            self.assertEqual(events[-1][0], last_event)
+
+        response = self.client.post(url, {"difficulty": 2}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class GenerateAndSaveTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="save@example.com", password="testpass"
+        )
+        self.user_profile = UserProfile.objects.create(
+            auth_user=self.user, default_settings={}, base_language="en"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("generate_passage")
+
+    @patch("texts.services.passage_cache.generate_sentences")
+    def test_save_keeps_cohere_sentences(self, generate):
+        generate.return_value = [
+            {"text": "Dr. Smith arrived. ", "justification": ["Abbreviation"]},
+            {"text": "Rain starts.", "justification": ["R sound: 'rain'"]},
+        ]
+        response = self.client.post(
+            self.url,
+            {"description": "A rainy day", "difficulty": 4, "save": True},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["sentences"], ["Dr. Smith arrived.", "Rain starts."]
+        )
+
+        passage = Passage.objects.get(pk=response.data["passage_id"])
+        self.assertEqual(passage.user, self.user_profile)
+        self.assertEqual(passage.title, "A rainy day")
+        self.assertEqual(passage.difficulty, "4")
+        self.assertEqual(passage.sentence_count, 2)
+        self.assertEqual(
+            list(
+                passage.sentence_set.order_by("sentence_id").values_list(
+                    "text", "justification"
+                )
+            ),
+            [
+                ("Dr. Smith arrived.", ["Abbreviation"]),
+                ("Rain starts.", ["R sound: 'rain'"]),
+            ],
+        )
+
+        response = self.client.get(
+            reverse("get_passage_sentences", kwargs={"passage_id": passage.pk})
+        )
+        self.assertEqual(response.data[0]["justification"], ["Abbreviation"])
@@ -1,13 +1,16 @@
 from django.urls import path
 from .views import (
     ParseTextView,
+    ParseDocumentView,
     GetUserPassagesView,
     GetPassageSentencesView,
     GeneratePassageView,
+    GeneratePassageStreamView,
 )
 
 urlpatterns = [
     path("parse-text/", ParseTextView.as_view(), name="parse-text"),
+    path("parse-document/", ParseDocumentView.as_view(), name="parse-document"),
     path("user-passages/", GetUserPassagesView.as_view(), name="get_user_passages"),
     path(
         "passage-sentences/<int:passage_id>/",
@@ -15,4 +18,9 @@ urlpatterns = [
         name="get_passage_sentences",
     ),
     path("generate-passage/", GeneratePassageView.as_view(), name="generate_passage"),
+    path(
+        "generate-passage/stream/",
+        GeneratePassageStreamView.as_view(),
+        name="generate_passage_stream",
+    ),
 ]
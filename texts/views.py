@@ -1,21 +1,26 @@
+from django.db.models import Prefetch
 from drf_spectacular.types import OpenApiTypes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from drf_spectacular.utils import extend_schema
-from nltk.tokenize.punkt import PunktSentenceTokenizer
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
 
 from .serializers import (
     ParseTextRequestSerializer,
     ParseTextResponseSerializer,
+    ParseDocumentRequestSerializer,
+    ParseDocumentResponseSerializer,
     ErrorResponseSerializer,
     PassageSerializer,
     SentenceSerializer,
     GenerateTextRequestSerializer,
 )
 from texts.models import Passage, Sentence
+from texts.pagination import PassageCursorPagination
 from accounts.decorators import require_authentication
-from .services import cohere
+from pera_be import admission, sse
+from .services import cohere, ingestion, passage_cache, passage_pool, tokenizers
 from .services.cohere import CohereGenerationError
 
 
@@ -44,9 +49,8 @@ class ParseTextView(APIView):
                 {"error": "No text provided."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        tokenizer = PunktSentenceTokenizer()
         try:
-            sentences = tokenizer.tokenize(text)
+            sentences = tokenizers.split_sentences(text, language)
         except Exception as e:
             return Response(
                 {"error": f"Error processing text: {str(e)}"},
@@ -64,27 +68,95 @@ class ParseTextView(APIView):
                 {"error": "UserProfile not found."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        passage = Passage.objects.create(
-            user=user_profile,
-            language=language,
-            title=title,
-            difficulty="Custom",
+        passage, _ = ingestion.create_passage(user_profile, title, language, sentences)
+
+        return Response(
+            {"passage_id": passage.passage_id, "sentences": sentences},
+            status=status.HTTP_200_OK,
         )
 
-        for sentence_text in sentences:
-            Sentence.objects.create(
-                passage=passage, text=sentence_text, completion_status=False
+
+@require_authentication()
+class ParseDocumentView(APIView):
+    """
+    Creates a passage from an uploaded .txt or Markdown document. Unlike
+    parse-text, the document is tokenized and stored a paragraph at a time,
+    so long documents don't need to fit in memory.
+    """
+
+    parser_classes = (MultiPartParser,)
+
+    @extend_schema(
+        request={"multipart/form-data": ParseDocumentRequestSerializer},
+        responses={
+            200: ParseDocumentResponseSerializer,
+            400: ErrorResponseSerializer,
+        },
+    )
+    def post(self, request):
+        serializer = ParseDocumentRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"error": "Invalid input data."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        document = serializer.validated_data["file"]
+        title = (serializer.validated_data.get("title") or document.name)[:255]
+        language = serializer.validated_data.get("language", "en")
+
+        user_profile = getattr(request.user, "userprofile", None)
+        if not user_profile:
+            return Response(
+                {"error": "UserProfile not found."}, status=status.HTTP_400_BAD_REQUEST
             )
 
+        try:
+            passage, count = ingestion.ingest_document(
+                user_profile, document, title, language
+            )
+        except ingestion.DocumentError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         return Response(
-            {"passage_id": passage.passage_id, "sentences": sentences},
+            {"passage_id": passage.passage_id, "sentence_count": count},
             status=status.HTTP_200_OK,
         )
 
 
+def _flag(request, name, default):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
 @require_authentication()
 class GetUserPassagesView(APIView):
-    @extend_schema(responses=PassageSerializer(many=True))
+    """
+    The user's passages, newest first, a page at a time: follow the
+    rel="next" URL of the Link header for the next page.
+    """
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("cursor", str, description="From the Link header."),
+            OpenApiParameter(
+                "limit",
+                int,
+                description=f"Passages per page, at most "
+                f"{PassageCursorPagination.max_page_size}.",
+            ),
+            OpenApiParameter(
+                "sentences", bool, description="Include the sentences, the default."
+            ),
+            OpenApiParameter(
+                "counts",
+                bool,
+                description="Include each passage's sentence_count and "
+                "completed_count, the default.",
+            ),
+        ],
+        responses=PassageSerializer(many=True),
+    )
     def get(self, request):
         user_profile = getattr(request.user, "userprofile", None)
         if not user_profile:
@@ -92,9 +164,39 @@ class GetUserPassagesView(APIView):
                 {"error": "UserProfile not found."}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        passages = Passage.objects.filter(user=user_profile)
-        serializer = PassageSerializer(passages, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        include_sentences = _flag(request, "sentences", True)
+        include_counts = _flag(request, "counts", True)
+        passages = Passage.objects.filter(user=user_profile).only(
+            "passage_id",
+            "title",
+            "language",
+            "difficulty",
+            "created_at",
+            "sentence_count",
+            "completed_count",
+        )
+        if include_sentences:
+            passages = passages.prefetch_related(
+                Prefetch(
+                    "sentence_set",
+                    queryset=Sentence.objects.only(
+                        "sentence_id",
+                        "passage_id",
+                        "text",
+                        "completion_status",
+                        "created_at",
+                        "justification",
+                    ).order_by("sentence_id"),
+                )
+            )
+        paginator = PassageCursorPagination()
+        page = paginator.paginate_queryset(passages, request, view=self)
+        serializer = PassageSerializer(
+            page,
+            many=True,
+            context={"sentences": include_sentences, "counts": include_counts},
+        )
+        return paginator.get_paginated_response(serializer.data)
 
 
 @require_authentication()
@@ -120,8 +222,12 @@ class GeneratePassageView(APIView):
     @extend_schema(
         request=GenerateTextRequestSerializer,
         responses={
-            200: OpenApiTypes.STR,
+            200: OpenApiResponse(
+                description="The passage text, or with `save`, the saved "
+                "passage as parse-text/ returns it."
+            ),
             400: ErrorResponseSerializer,
+            503: ErrorResponseSerializer,
         },
     )
     def post(self, request):
@@ -138,11 +244,84 @@ class GeneratePassageView(APIView):
         # TODO: sanitize user passage description
 
         try:
-            passage = cohere.generate_passage(passage_description, difficulty)
+            sentences = passage_pool.take(
+                passage_description, difficulty
+            ) or passage_cache.generate_sentences(passage_description, difficulty)
         except CohereGenerationError:
             return Response(
                 {"error": "Passage generation failed."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+        except admission.ServiceUnavailable as e:
+            return admission.unavailable_response(e)
+
+        if not serializer.validated_data["save"]:
+            return Response(cohere.join_sentences(sentences), status=status.HTTP_200_OK)
+
+        user_profile = getattr(request.user, "userprofile", None)
+        if not user_profile:
+            return Response(
+                {"error": "UserProfile not found."}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Cohere's own sentences, so they aren't tokenized again
+        passage, _ = ingestion.create_passage(
+            user_profile,
+            serializer.validated_data.get("title") or passage_description[:255],
+            "en",
+            sentences,
+            difficulty=str(difficulty),
+        )
+        return Response(
+            {
+                "passage_id": passage.passage_id,
+                "sentences": [sentence["text"].strip() for sentence in sentences],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+def _passage_events(description, difficulty):
+    try:
+        sentences = passage_pool.take(
+            description, difficulty
+        ) or cohere.stream_sentences(description, difficulty)
+        for sentence in sentences:
+            yield sse.event("sentence", sentence)
+    except CohereGenerationError:
+        yield sse.event("error", {"error": "Passage generation failed."})
+    except admission.ServiceUnavailable as e:
+        yield sse.event("error", {"error": str(e), "retry_after": e.retry_after})
+    else:
+        yield sse.event("done", {})
+
+
+@require_authentication()
+class GeneratePassageStreamView(APIView):
+    @extend_schema(
+        request=GenerateTextRequestSerializer,
+        responses={
+            (200, "text/event-stream"): OpenApiTypes.STR,
+            400: ErrorResponseSerializer,
+        },
+        description=(
+            "Generates a passage like generate-passage/, without saving it, "
+            "but streams it as Server-Sent Events: a `sentence` event with the "
+            "text and justification of each sentence as soon as it is "
+            "generated, then `done`, or `error` if generation failed."
+        ),
+    )
+    def post(self, request):
+        serializer = GenerateTextRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {"error": "Invalid passage generation request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        return Response(passage, status=status.HTTP_200_OK)
+        return sse.response(
+            _passage_events(
+                serializer.validated_data["description"],
+                serializer.validated_data["difficulty"],
+            )
+        )